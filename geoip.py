@@ -0,0 +1,549 @@
+#!/usr/bin/env python3
+"""
+GeoIP Cache for the Cowrie ETL Adapter
+Resolves attacker IPs to GEOIP_CACHE rows through an in-memory LRU with TTL
+in front of GEOIP_PREFIX, so repeated and neighbouring IPs cost no lookups.
+Locations come from a local IP-range database, with ip-api.com as an
+optional fallback, and are filled in by a background enricher so ingestion
+never waits on them.
+"""
+
+import csv
+import ipaddress
+import logging
+import queue
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+from mysql.connector import Error
+import requests
+
+from metrics import GEOIP_LOCATED, GEOIP_LOOKUPS, GEOIP_QUEUE_DEPTH, GEOIP_RESOLVE_SECONDS
+
+try:
+    import maxminddb
+except ImportError:  # Optional: only needed for .mmdb databases
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+# Neighbouring addresses inside these prefixes share one lookup
+IPV4_PREFIX_LEN = 24
+IPV6_PREFIX_LEN = 48
+
+# How long a resolved prefix is trusted before it is looked up again
+PREFIX_TTL_SECONDS = 30 * 24 * 3600
+
+# In-memory cache sizing; Unknown answers and failed lookups are retried
+# much sooner
+MEMORY_CACHE_SIZE = 50000
+MEMORY_TTL_SECONDS = 24 * 3600
+NEGATIVE_TTL_SECONDS = 10 * 60
+
+# ip-api.com's free tier allows 45 requests per minute
+HTTP_RATE_LIMIT = (45, 60)
+
+# Background enrichment: lookup threads and IPs handled per transaction
+ENRICH_WORKERS = 4
+ENRICH_BATCH_SIZE = 200
+
+UNKNOWN_GEO = {"country": "Unknown", "region": None, "city": None, "asn": None}
+
+
+def lookup_ip_api(ip_address):
+    """
+    Fetch geolocation info for an IP address using the free ip-api.com API.
+    Returns UNKNOWN_GEO when the API has no data for it, and None when the
+    lookup itself failed (timeout, rate limit), so it can be retried.
+    """
+    try:
+        response = requests.get(f"http://ip-api.com/json/{ip_address}", timeout=5)
+        if response.status_code != 200:
+            logger.warning(f"⚠️  GeoIP lookup failed for {ip_address}: HTTP {response.status_code}")
+            return None
+        data = response.json()
+        if data.get("status") == "success":
+            return {
+                "country": data.get("country", "Unknown"),
+                "region": data.get("regionName", None),
+                "city": data.get("city", None),
+                "asn": (
+                    str(data.get("as", "").split()[0].replace("AS", ""))
+                    if data.get("as")
+                    else None
+                ),
+            }
+    except Exception as e:
+        logger.warning(f"⚠️  GeoIP lookup failed for {ip_address}: {e}")
+        return None
+
+    return dict(UNKNOWN_GEO)
+
+
+class LocalGeoIPResolver:
+    """
+    Offline IP-range database. CSV files need a header row with start_ip and
+    end_ip plus any of country, region, city and asn; ranges are held in
+    sorted arrays and resolved with a binary search. Files ending in .mmdb
+    are read with the optional maxminddb package instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._reader = None
+        # version -> (range starts, range ends, index into self._locations)
+        self._ranges = {}
+        self._locations = []
+
+        if path.endswith(".mmdb"):
+            if maxminddb is None:
+                raise RuntimeError(
+                    "Reading .mmdb files requires maxminddb: pip install maxminddb"
+                )
+            self._reader = maxminddb.open_database(path)
+        else:
+            self._load_csv(path)
+
+    def _load_csv(self, path):
+        location_ids = {}
+        ranges = {4: [], 6: []}
+
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                start = ipaddress.ip_address(row["start_ip"].strip())
+                end = ipaddress.ip_address(row["end_ip"].strip())
+                # Accept "13335", "AS13335" or "AS13335 Cloudflare, Inc."
+                asn = (row.get("asn") or "").strip().upper()
+                asn = asn.split()[0].replace("AS", "") if asn else None
+                location = (
+                    (row.get("country") or "").strip() or "Unknown",
+                    (row.get("region") or "").strip() or None,
+                    (row.get("city") or "").strip() or None,
+                    asn or None,
+                )
+                location_id = location_ids.setdefault(location, len(location_ids))
+                ranges[start.version].append((int(start), int(end), location_id))
+
+        self._locations = list(location_ids)
+        for version, entries in ranges.items():
+            entries.sort()
+            # IPv4 bounds fit in 32-bit unsigned arrays; IPv6 needs Python ints
+            typecode = "I" if version == 4 else None
+            starts = [entry[0] for entry in entries]
+            ends = [entry[1] for entry in entries]
+            if typecode:
+                starts, ends = array(typecode, starts), array(typecode, ends)
+            self._ranges[version] = (
+                starts,
+                ends,
+                array("I", [entry[2] for entry in entries]),
+            )
+
+        logger.info(
+            f"🗺️  Loaded {sum(len(r) for r in ranges.values())} GeoIP ranges "
+            f"({len(self._locations)} locations) from {path}"
+        )
+
+    def lookup(self, ip_address):
+        """Return a location dict for an IP, or None if it isn't covered"""
+        try:
+            ip = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+
+        if self._reader is not None:
+            return self._lookup_mmdb(ip)
+
+        starts, ends, location_ids = self._ranges.get(ip.version, ((), (), ()))
+        value = int(ip)
+        index = bisect_right(starts, value) - 1
+        if index < 0 or value > ends[index]:
+            return None
+
+        country, region, city, asn = self._locations[location_ids[index]]
+        return {"country": country, "region": region, "city": city, "asn": asn}
+
+    def _lookup_mmdb(self, ip):
+        record = self._reader.get(str(ip))
+        if not record:
+            return None
+
+        def name(entry):
+            return (entry or {}).get("names", {}).get("en")
+
+        subdivisions = record.get("subdivisions") or [None]
+        asn = record.get("autonomous_system_number")
+        return {
+            "country": name(record.get("country")) or "Unknown",
+            "region": name(subdivisions[0]),
+            "city": name(record.get("city")),
+            "asn": str(asn) if asn else None,
+        }
+
+
+def network_prefix(ip_address):
+    """Return the CIDR prefix an IP is cached under, e.g. 203.0.113.0/24"""
+    try:
+        ip = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return ip_address
+
+    prefix_len = IPV4_PREFIX_LEN if ip.version == 4 else IPV6_PREFIX_LEN
+    return str(ipaddress.ip_network(f"{ip}/{prefix_len}", strict=False))
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after a TTL"""
+
+    def __init__(self, max_size=MEMORY_CACHE_SIZE, ttl=MEMORY_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class GeoIPCache:
+    """
+    Maps IPs to GEOIP_CACHE ids. Identical location tuples share one
+    GEOIP_CACHE row, and each network prefix is resolved at most once per
+    PREFIX_TTL_SECONDS via GEOIP_PREFIX.
+    """
+
+    def __init__(self, lookup, prefix_ttl=PREFIX_TTL_SECONDS):
+        # lookup(ip) -> {"country", "region", "city", "asn"}
+        self.lookup = lookup
+        self.prefix_ttl = prefix_ttl
+        self.memory = TTLCache()
+        self.hits = 0
+        self.misses = 0
+
+    def get_geoip_id(self, cursor, ip_address):
+        """
+        Return the GEOIP_CACHE id for an IP, resolving it only on a miss;
+        None if the lookup failed
+        """
+        geoip_id = self.cached_geoip_id(cursor, ip_address)
+        if geoip_id is None:
+            geoip_id = self.remember(cursor, ip_address, self.lookup(ip_address))
+        return geoip_id
+
+    def cached_geoip_id(self, cursor, ip_address):
+        """Return the cached GEOIP_CACHE id for an IP's prefix, or None"""
+        prefix = network_prefix(ip_address)
+
+        geoip_id = self.memory.get(prefix)
+        if geoip_id is not None:
+            self.hits += 1
+            GEOIP_LOOKUPS.inc(result="memory")
+            return geoip_id
+
+        cursor.execute(
+            """
+            SELECT geoip_id
+            FROM GEOIP_PREFIX
+            WHERE network_prefix = %s
+            AND resolved_at >= NOW() - INTERVAL %s SECOND
+            """,
+            (prefix, self.prefix_ttl),
+        )
+        row = cursor.fetchone()
+        if row:
+            self.hits += 1
+            GEOIP_LOOKUPS.inc(result="prefix")
+            self.memory.put(prefix, row[0])
+            return row[0]
+
+        self.misses += 1
+        GEOIP_LOOKUPS.inc(result="miss")
+        return None
+
+    def remember(self, cursor, ip_address, geo_info):
+        """
+        Store a resolved location for an IP's prefix and return its id.
+        A failed lookup (None) stores nothing and returns None.
+        """
+        if geo_info is None:
+            return None
+        prefix = network_prefix(ip_address)
+        geoip_id = self.store_location(cursor, geo_info)
+
+        if geo_info == UNKNOWN_GEO:
+            # Don't pin an Unknown answer to the prefix; try again later
+            self.memory.put(prefix, geoip_id, ttl=NEGATIVE_TTL_SECONDS)
+            return geoip_id
+
+        cursor.execute(
+            """
+            INSERT INTO GEOIP_PREFIX (network_prefix, geoip_id, resolved_at)
+            VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE
+                geoip_id = VALUES(geoip_id),
+                resolved_at = VALUES(resolved_at)
+            """,
+            (prefix, geoip_id),
+        )
+        self.memory.put(prefix, geoip_id)
+        return geoip_id
+
+    def store_location(self, cursor, geo_info):
+        """Insert a location tuple, or return the id of the identical row"""
+        cursor.execute(
+            """
+            INSERT INTO GEOIP_CACHE (country, region, city, asn)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE geoip_id = LAST_INSERT_ID(geoip_id)
+            """,
+            (
+                geo_info["country"],
+                geo_info["region"],
+                geo_info["city"],
+                geo_info["asn"],
+            ),
+        )
+        return cursor.lastrowid
+
+
+class RateLimiter:
+    """Thread-safe token bucket; acquire() blocks until a call is allowed"""
+
+    def __init__(self, calls, period):
+        self.capacity = calls
+        self.rate = calls / period
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeoIPEnricher:
+    """
+    Background GeoIP enrichment. Attackers are inserted with a NULL
+    geoip_id (pending); submitted IPs are resolved in batches on a worker
+    pool and written back to GEOIP_CACHE, GEOIP_PREFIX and ATTACKER.geoip_id
+    on the enricher's own connection, so ingestion never waits on a lookup.
+    """
+
+    def __init__(
+        self,
+        dest_config,
+        resolve,
+        workers=ENRICH_WORKERS,
+        batch_size=ENRICH_BATCH_SIZE,
+        on_located=None,
+    ):
+        self.dest_config = dest_config
+        # resolve(ip) -> location dict, or None if the lookup failed; called
+        # concurrently from the pool
+        self.resolve = resolve
+        # on_located(cursor, attacker_ids) runs inside each transaction that
+        # assigns locations, with the ids of the attackers it located
+        self.on_located = on_located
+        self.batch_size = batch_size
+        self.cache = GeoIPCache(resolve)
+        self.queue = queue.Queue()
+        self._queued = set()
+        # (due time, IPs) whose lookup failed; they stay pending until retried
+        self._retries = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="geoip")
+        self._stopping = threading.Event()
+        self._thread = None
+        self.conn = None
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the dispatcher thread, which first queues all pending attackers"""
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="geoip-enricher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """Finish queued work (up to timeout seconds) and stop the dispatcher"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.conn is not None and self.conn.is_connected():
+            self.conn.close()
+
+    def submit(self, ip_addresses):
+        """Queue IPs whose attackers were committed with a pending location"""
+        with self._lock:
+            for ip_address in ip_addresses:
+                if ip_address not in self._queued:
+                    self._queued.add(ip_address)
+                    self.queue.put(ip_address)
+        GEOIP_QUEUE_DEPTH.set(self.queue.qsize())
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def _connection(self):
+        if self.conn is None or not self.conn.is_connected():
+            self.conn = mysql.connector.connect(**self.dest_config)
+        return self.conn
+
+    def _run(self):
+        try:
+            cursor = self._connection().cursor()
+            cursor.execute("SELECT ip_address FROM ATTACKER WHERE geoip_id IS NULL")
+            self.submit(row[0] for row in cursor.fetchall())
+            cursor.close()
+        except Error as e:
+            logger.warning(f"⚠️  Could not load pending attackers for GeoIP enrichment: {e}")
+
+        while not (self._stopping.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._enrich(batch)
+            except Exception as e:
+                logger.error(f"❌ GeoIP enrichment failed, retrying: {e}")
+                try:
+                    self.conn.rollback()
+                except Exception:
+                    pass
+                self.cache.memory.clear()
+                with self._lock:
+                    self._queued.difference_update(batch)
+                time.sleep(1)
+                self.submit(batch)
+                if self._stopping.is_set():
+                    break
+
+    def _next_batch(self):
+        now = time.monotonic()
+        due = [ips for retry_at, ips in self._retries if retry_at <= now]
+        if due:
+            self._retries = [retry for retry in self._retries if retry[0] > now]
+            for ips in due:
+                self.submit(ips)
+        try:
+            batch = [self.queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        GEOIP_QUEUE_DEPTH.set(self.queue.qsize())
+        return batch
+
+    def _timed_resolve(self, ip_address):
+        start = time.perf_counter()
+        try:
+            return self.resolve(ip_address)
+        finally:
+            GEOIP_RESOLVE_SECONDS.observe(time.perf_counter() - start)
+
+    def _enrich(self, batch):
+        cursor = self._connection().cursor()
+
+        # Serve what we can from the prefix cache, and resolve one IP per
+        # uncached prefix on the worker pool
+        ips_by_geoip = defaultdict(list)
+        ips_by_prefix = defaultdict(list)
+        for ip_address in batch:
+            ips_by_prefix[network_prefix(ip_address)].append(ip_address)
+        for prefix, ips in list(ips_by_prefix.items()):
+            geoip_id = self.cache.cached_geoip_id(cursor, ips[0])
+            if geoip_id is not None:
+                ips_by_geoip[geoip_id].extend(ips)
+                del ips_by_prefix[prefix]
+
+        to_resolve = [ips[0] for ips in ips_by_prefix.values()]
+        failed = []
+        for ips, geo_info in zip(
+            ips_by_prefix.values(), self._pool.map(self._timed_resolve, to_resolve)
+        ):
+            geoip_id = self.cache.remember(cursor, ips[0], geo_info)
+            if geoip_id is None:
+                # Leave them pending rather than marking them Unknown for good
+                failed.extend(ips)
+            else:
+                ips_by_geoip[geoip_id].extend(ips)
+
+        located = []
+        for geoip_id, ips in ips_by_geoip.items():
+            # Lock the still-pending rows first, so exactly the attackers
+            # this transaction locates are reported to on_located
+            placeholders = ", ".join(["%s"] * len(ips))
+            cursor.execute(
+                f"""
+                SELECT attacker_id FROM ATTACKER
+                WHERE geoip_id IS NULL AND ip_address IN ({placeholders})
+                FOR UPDATE
+                """,
+                ips,
+            )
+            attacker_ids = [row[0] for row in cursor.fetchall()]
+            if not attacker_ids:
+                continue
+            placeholders = ", ".join(["%s"] * len(attacker_ids))
+            cursor.execute(
+                f"UPDATE ATTACKER SET geoip_id = %s WHERE attacker_id IN ({placeholders})",
+                [geoip_id] + attacker_ids,
+            )
+            located.extend(attacker_ids)
+
+        if located and self.on_located is not None:
+            self.on_located(cursor, located)
+        self.conn.commit()
+        cursor.close()
+        GEOIP_LOCATED.inc(len(located))
+        with self._lock:
+            self._queued.difference_update(batch)
+        if failed:
+            self._retries.append((time.monotonic() + NEGATIVE_TTL_SECONDS, failed))
+        logger.info(
+            f"🌍 Enriched {len(batch) - len(failed)} attackers ({len(to_resolve)} lookups, "
+            f"{len(failed)} to retry, {self.pending()} pending)"
+        )
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Push Ingestion for Cowrie Sensors
+Durable on-disk spool for the NDJSON event batches sensors POST to
+/api/ingest/events, and the drainer that bulk-loads them into honeypot_data
+"""
+
+import fcntl
+import gzip
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+from cowrie_etl_adapter import DATA_ERRORS, CowrieETLAdapter
+from cowrie_jsonlog import events_to_batch
+from metrics import INGEST_EVENTS, INGEST_SPOOL_DEPTH
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.path.join("var", "ingest")
+
+# Largest request body accepted, and largest batch after decompression
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+MAX_DECOMPRESSED_BYTES = 256 * 1024 * 1024
+
+# Spool files merged into one drain transaction, capped by event count
+DRAIN_MAX_FILES = 100
+DRAIN_MAX_EVENTS = 50000
+DRAIN_INTERVAL_SECONDS = 1
+
+SPOOL_SUFFIX = ".ndjson.gz"
+
+# Database the drainer writes to (same ETL account as the pull adapter)
+INGEST_DB_CONFIG = {
+    "host": "localhost",
+    "port": 3306,
+    "user": "etl_service",
+    "password": "etlpass",
+    "database": "honeypot_data",
+}
+
+
+class IngestError(ValueError):
+    """Raised for a batch that cannot be decoded"""
+
+
+def decode_batch(payload, compressed=True):
+    """
+    Decode a (gzip) NDJSON batch into a list of Cowrie event dicts. Every
+    member of a multi-member gzip body (e.g. `cat a.gz b.gz`) is decoded;
+    a body cut short is rejected, even if it ends on a line boundary.
+    """
+    if compressed:
+        data = b""
+        remaining = payload
+        while remaining:
+            try:
+                decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+                data += decompressor.decompress(
+                    remaining, MAX_DECOMPRESSED_BYTES - len(data) + 1
+                )
+            except zlib.error as e:
+                raise IngestError(f"invalid gzip body: {e}")
+            if decompressor.unconsumed_tail or len(data) > MAX_DECOMPRESSED_BYTES:
+                raise IngestError(
+                    f"batch exceeds {MAX_DECOMPRESSED_BYTES} bytes once decompressed"
+                )
+            if not decompressor.eof:
+                raise IngestError("truncated gzip body")
+            remaining = decompressor.unused_data
+    else:
+        data = payload
+
+    events = []
+    for line_no, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError as e:
+            raise IngestError(f"line {line_no}: {e}")
+        if not isinstance(event, dict) or "eventid" not in event:
+            raise IngestError(f"line {line_no}: not a Cowrie event")
+        events.append(event)
+    return events
+
+
+class IngestSpool:
+    """
+    Append-only directory of accepted batches. A batch is written to tmp/,
+    fsynced and renamed into place, so anything visible in the spool has
+    survived a crash; names sort in arrival order.
+    """
+
+    def __init__(self, directory=DEFAULT_SPOOL_DIR):
+        self.directory = directory
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.failed_dir = os.path.join(directory, "failed")
+        for path in (self.directory, self.tmp_dir, self.failed_dir):
+            os.makedirs(path, exist_ok=True)
+        self._counter = itertools.count()
+        self._lock_file = None
+
+    def enqueue(self, payload, compressed=True):
+        """Durably store a batch and return its id"""
+        if not compressed:
+            payload = gzip.compress(payload, compresslevel=1)
+
+        batch_id = f"{time.time_ns():020d}-{os.getpid()}-{next(self._counter):06d}"
+        tmp_path = os.path.join(self.tmp_dir, batch_id + SPOOL_SUFFIX)
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, batch_id + SPOOL_SUFFIX))
+        self._fsync_dir()
+        return batch_id
+
+    def pending(self, limit=None):
+        """Spooled batch file names, oldest first"""
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(SPOOL_SUFFIX)
+        )
+        return names[:limit] if limit is not None else names
+
+    def load(self, name):
+        with open(os.path.join(self.directory, name), "rb") as f:
+            return decode_batch(f.read())
+
+    def remove(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        self._fsync_dir()
+
+    def quarantine(self, name):
+        """Move an undecodable or unloadable batch aside so it stops blocking the queue"""
+        os.replace(
+            os.path.join(self.directory, name), os.path.join(self.failed_dir, name)
+        )
+
+    def acquire_drain_lock(self):
+        """Take the spool's exclusive drain lock; False if another process holds it"""
+        if self._lock_file is not None:
+            return True
+        lock_file = open(os.path.join(self.directory, ".drain.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _fsync_dir(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class IngestDrainer:
+    """
+    Background thread that merges spooled batches into one EventBatch and
+    loads it through the ETL adapter in a single transaction. Spool files
+    are removed only after the commit; a crash in between replays them,
+    which the adapter's deduplication makes harmless.
+    """
+
+    def __init__(self, spool, dest_config=INGEST_DB_CONFIG, interval=DRAIN_INTERVAL_SECONDS):
+        self.spool = spool
+        self.interval = interval
+        self.adapter = CowrieETLAdapter(None, dest_config)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start draining; returns False if another drainer owns the spool"""
+        if not self.spool.acquire_drain_lock():
+            logger.info(f"📭 Spool {self.spool.directory} is drained by another process")
+            return False
+        self._thread = threading.Thread(target=self._run, name="ingest-drainer", daemon=True)
+        self._thread.start()
+        logger.info(f"📥 Draining ingestion spool {self.spool.directory}")
+        return True
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.adapter.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.adapter.dest_conn or not self.adapter.dest_conn.is_connected():
+                    if not self.adapter.connect_databases():
+                        self._stop.wait(self.interval)
+                        continue
+
+                if self.drain_once():
+                    continue
+            except Exception as e:
+                logger.error(f"❌ Error draining ingestion spool: {e}", exc_info=True)
+
+            self._stop.wait(self.interval)
+
+    def drain_once(self):
+        """Load the oldest spooled batches; returns how many files were drained"""
+        events = []
+        taken = []
+        for name in self.spool.pending(DRAIN_MAX_FILES):
+            try:
+                batch_events = self.spool.load(name)
+            except (IngestError, OSError) as e:
+                logger.error(f"❌ Quarantining spooled batch {name}: {e}")
+                self.spool.quarantine(name)
+                continue
+            taken.append((name, batch_events))
+            events.extend(batch_events)
+            if len(events) >= DRAIN_MAX_EVENTS:
+                break
+
+        if not taken:
+            return 0
+
+        try:
+            self.adapter.load_batch(events_to_batch(events))
+        except DATA_ERRORS as e:
+            logger.warning(f"⚠️  Loading {len(taken)} merged batches failed ({e}); loading them one by one")
+            return self._drain_each(taken)
+
+        self._drained([name for name, _ in taken], len(events))
+        return len(taken)
+
+    def _drain_each(self, taken):
+        """Load batches in their own transactions, quarantining those the database rejects"""
+        for name, events in taken:
+            try:
+                self.adapter.load_batch(events_to_batch(events))
+            except DATA_ERRORS as e:
+                logger.error(f"❌ Quarantining spooled batch {name}: {e}")
+                self.spool.quarantine(name)
+                continue
+            self._drained([name], len(events))
+        return len(taken)
+
+    def _drained(self, names, event_count):
+        self.spool.remove(names)
+        INGEST_EVENTS.inc(event_count)
+        INGEST_SPOOL_DEPTH.set(len(self.spool.pending()))
+        logger.info(f"📥 Drained {len(names)} batches ({event_count} events)")
+
+
+def main():
+    """Run the drainer as its own process instead of inside app.py"""
+    spool = IngestSpool(os.environ.get("INGEST_SPOOL_DIR", DEFAULT_SPOOL_DIR))
+    drainer = IngestDrainer(spool)
+    if not drainer.start():
+        return
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("\n⏸️  Stopping ingestion drainer...")
+    finally:
+        drainer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Live Dashboard Feed for the Flask Dashboard
+One background poller follows the ETL data version and the changes
+published to DASHBOARD_FEED, and fans them out to every /api/stream client,
+so live dashboards cost one indexed lookup per second however many are open.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from cowrie_etl_adapter import DATA_VERSION_KEY
+
+FEED_POLL_SECONDS = 1
+
+# Events kept in memory for clients that fall slightly behind
+FEED_BACKLOG = 256
+
+# How long a new stream waits for the poller's first look at the database
+FEED_START_TIMEOUT = 10
+
+
+class LiveFeed:
+    """
+    Buffer of stream events (from_version, version, event, data). Each event
+    covers the versions in (from_version, version]: a "delta" carries the
+    change published for one version, a "resync" covers versions bumped
+    without one (or no longer in the feed) and tells clients to reload.
+    The poller only runs while someone is subscribed.
+    """
+
+    def __init__(self, poll_interval=FEED_POLL_SECONDS, backlog=FEED_BACKLOG):
+        self.poll_interval = poll_interval
+        self.version = None
+        self._events = deque(maxlen=backlog)
+        self._connect = None
+        self._subscribers = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def subscribe(self, connect):
+        """
+        Register a stream client; connect() returns a database connection
+        for the poller. Returns the current data version, or None if the
+        database could not be read.
+        """
+        deadline = time.monotonic() + FEED_START_TIMEOUT
+        with self._cond:
+            self._connect = connect
+            if not self._subscribers:
+                # Versions passed while nobody listened are unknown
+                self.version = None
+                self._events.clear()
+            self._subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            while self.version is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self.version
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def wait(self, after, timeout):
+        """
+        Events after version `after`, waiting up to timeout for one; an
+        empty list on timeout. A client behind the buffer gets a resync.
+        """
+        with self._cond:
+            if self.version is None or self.version == after:
+                self._cond.wait(timeout)
+            if self.version is None or self.version == after:
+                return []
+            if self.version < after or not self._events or self._events[0][0] > after:
+                return [(self.version, "resync", json.dumps({"version": self.version}))]
+            return [
+                (version, event, data)
+                for _, version, event, data in self._events
+                if version > after
+            ]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._subscribers:
+                    self._cond.wait()
+                connect = self._connect
+            try:
+                self._poll(connect)
+            except Exception as e:
+                print(f"[!] Live feed poll failed: {e}")
+            time.sleep(self.poll_interval)
+
+    def _poll(self, connect):
+        previous = self.version
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT value FROM ETL_CHECKPOINT WHERE name = %s", (DATA_VERSION_KEY,)
+            )
+            row = cursor.fetchone()
+            current = int(row[0]) if row else 0
+            changes = []
+            if previous is not None and current > previous:
+                cursor.execute(
+                    """
+                    SELECT version, payload FROM DASHBOARD_FEED
+                    WHERE version > %s AND version <= %s
+                    ORDER BY version
+                    """,
+                    (previous, current),
+                )
+                changes = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+
+        with self._cond:
+            if previous is not None and current < previous:
+                # The version went back (database restored); everyone reloads
+                self._events.clear()
+            elif previous is not None and current > previous:
+                if len(changes) == current - previous:
+                    for version, payload in changes:
+                        if not isinstance(payload, str):
+                            payload = payload.decode("utf-8")
+                        self._events.append((version - 1, version, "delta", payload))
+                else:
+                    self._events.append(
+                        (previous, current, "resync", json.dumps({"version": current}))
+                    )
+            self.version = current
+            self._cond.notify_all()
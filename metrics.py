@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Process-wide counters, gauges and histograms for the ETL adapter, GeoIP
+enricher and ingestion drainer, rendered in the Prometheus text format by
+app.py's /metrics and by the adapter's own --metrics-port listener.
+"""
+
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LAG_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """A named metric with optional labels; values are kept per label tuple"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {value}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts, then the +Inf count and the sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def totals(self):
+        """{label values: (count, sum)}, e.g. for benchmark reports"""
+        with self._lock:
+            return {key: (sum(state[:-1]), state[-1]) for key, state in self._values.items()}
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+            cumulative += count
+            labels = _labels(self.label_names, key, (("le", bound),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {state[-1]}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- ETL adapter ---
+
+ETL_CYCLES = REGISTRY.add(
+    Counter("etl_cycles_total", "ETL transfer cycles by outcome", ("result",))
+)
+ETL_CYCLE_SECONDS = REGISTRY.add(
+    Histogram("etl_cycle_seconds", "Duration of an ETL transfer cycle")
+)
+ETL_STAGE_SECONDS = REGISTRY.add(
+    Histogram("etl_stage_seconds", "Time spent per ETL stage", ("stage",))
+)
+ETL_ROWS = REGISTRY.add(
+    Counter("etl_rows_total", "Rows committed to honeypot_data per table", ("table",))
+)
+ETL_EVENT_LAG = REGISTRY.add(
+    Histogram(
+        "etl_event_lag_seconds",
+        "Delay between a Cowrie event's timestamp and its commit to honeypot_data",
+        buckets=LAG_BUCKETS,
+    )
+)
+ETL_LAST_EVENT_LAG = REGISTRY.add(
+    Gauge("etl_last_event_lag_seconds", "Lag of the newest event in the last commit")
+)
+ETL_LAST_COMMIT = REGISTRY.add(
+    Gauge("etl_last_commit_timestamp_seconds", "Unix time of the last ETL commit")
+)
+
+# --- GeoIP enricher ---
+
+GEOIP_LOOKUPS = REGISTRY.add(
+    Counter(
+        "geoip_cache_lookups_total",
+        "GeoIP prefix lookups by where they were answered (memory, prefix table or miss)",
+        ("result",),
+    )
+)
+GEOIP_RESOLVE_SECONDS = REGISTRY.add(
+    Histogram("geoip_resolve_seconds", "Latency of resolving an uncached prefix")
+)
+GEOIP_QUEUE_DEPTH = REGISTRY.add(
+    Gauge("geoip_queue_depth", "Attacker IPs waiting for GeoIP enrichment")
+)
+GEOIP_LOCATED = REGISTRY.add(
+    Counter("geoip_located_total", "Attackers given a location")
+)
+
+# --- Ingestion spool ---
+
+INGEST_SPOOL_DEPTH = REGISTRY.add(
+    Gauge("ingest_spool_pending_batches", "Pushed batches waiting in the ingestion spool")
+)
+INGEST_EVENTS = REGISTRY.add(
+    Counter("ingest_events_drained_total", "Pushed events loaded by the drainer")
+)
+
+
+def timed(stage):
+    """Decorator recording a method's duration under etl_stage_seconds{stage}"""
+
+    def decorate(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+        return wrapper
+
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host=""):
+    """Serve /metrics from a background thread, for processes without app.py"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
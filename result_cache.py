@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Result Cache for the Flask Dashboard
+Shared, memory-bounded cache of serialized query results. Entries are tagged
+with the ETL data version they were computed at and expire after a TTL, so
+a result is reused until new data arrives or the TTL runs out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+RESULT_CACHE_TTL_SECONDS = 60
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# How long a request waits for another request computing the same entry
+INFLIGHT_WAIT_SECONDS = 30
+
+
+class ResultCache:
+    """
+    LRU map of key -> (data version, expiry, body bytes), bounded by the
+    total size of the stored bodies. Concurrent misses on one key are
+    collapsed: the first request computes, the others wait for its result.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL_SECONDS, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            body = self._get_locked(key, version)
+            if body is None:
+                self.misses += 1
+            return body
+
+    def put(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard_locked(key)
+            self._entries[key] = (version, time.monotonic() + self.ttl, body)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_compute(self, key, version, compute):
+        """
+        Return the cached body for key at version, else compute() it once.
+        compute() returns body bytes to cache, or None for a result that
+        must not be cached (e.g. an error response).
+        """
+        while True:
+            with self._lock:
+                body = self._get_locked(key, version)
+                if body is not None:
+                    return body
+                pending = self._inflight.get(key)
+                if pending is None:
+                    self.misses += 1
+                    pending = self._inflight[key] = threading.Event()
+                    break
+            # Someone else is computing this entry; wait and look again
+            pending.wait(INFLIGHT_WAIT_SECONDS)
+            with self._lock:
+                body = self._get_locked(key, version)
+                if body is None:
+                    self.misses += 1
+            if body is not None:
+                return body
+            return compute()
+
+        try:
+            body = compute()
+            if body is not None:
+                self.put(key, version, body)
+            return body
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _get_locked(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry_version, expires_at, body = entry
+            if entry_version == version and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self._discard_locked(key)
+        return None
+
+    def _discard_locked(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
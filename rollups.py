@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Incrementally Maintained Rollups
+Hourly, daily, per-country, per-auth-status, per-credential and
+per-malware-hash aggregates plus the per-attacker summary that back the
+dashboard views. The ETL adds
+each batch's deltas in the same transaction as the rows;
+`python3 rollups.py verify|rebuild` checks them against (or recomputes them
+from) the raw tables.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from collections import defaultdict
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+def admin_db_config():
+    """
+    Connection settings for the admin account rebuild/verify run as (DELETE
+    on the rollup tables), from ADMIN_DB_USER and ADMIN_DB_PASSWORD; the
+    password has no default, so a missing one is an error, not a guess
+    """
+    password = os.environ.get("ADMIN_DB_PASSWORD")
+    if not password:
+        raise RuntimeError(
+            "ADMIN_DB_PASSWORD is not set: export the admin account's password "
+            "(ADMIN_DB_USER selects the account, default honeypot_admin)"
+        )
+    return {
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": int(os.environ.get("DB_PORT", 3306)),
+        "user": os.environ.get("ADMIN_DB_USER", "honeypot_admin"),
+        "password": password,
+        "database": os.environ.get("DB_NAME", "honeypot_data"),
+    }
+
+# Hour bucket of a DATETIME column, without DATE_FORMAT's % placeholders
+HOUR_SLOT_SQL = "DATE({col}) + INTERVAL HOUR({col}) HOUR"
+
+# table -> (key column(s), value columns); deltas are applied in this order
+# and in key order, so concurrent writers lock rollup rows consistently.
+# A tuple of key columns makes a composite key, given as a tuple of values.
+ROLLUP_TABLES = {
+    "HOURLY_ROLLUP": ("hour_slot", ("total_sessions", "total_auth_attempts")),
+    "DAILY_ROLLUP": ("day", ("total_sessions", "total_auth_attempts")),
+    "COUNTRY_ROLLUP": ("country", ("total_sessions", "ended_sessions", "total_duration_sec")),
+    "AUTH_STATUS_ROLLUP": ("status", ("total",)),
+    "USERNAME_ROLLUP": ("username_id", ("total_attempts",)),
+    "CREDENTIAL_ROLLUP": (("username_id", "password_id"), ("total_attempts",)),
+    "MALWARE_ROLLUP": ("filehash", ("times_downloaded",)),
+}
+
+# Per-attacker summary: counters plus first/last seen times, written after
+# the rollups. last_seen is the latest session start; last_activity also
+# covers session ends, auth attempts, commands and downloads.
+SUMMARY_TABLE = "ATTACKER_SUMMARY"
+SUMMARY_COLUMNS = (
+    "country",
+    "total_sessions",
+    "open_sessions",
+    "first_seen",
+    "last_seen",
+    "last_activity",
+)
+SUMMARY_UPDATES = """
+    country = COALESCE(VALUES(country), country),
+    total_sessions = total_sessions + VALUES(total_sessions),
+    open_sessions = open_sessions + VALUES(open_sessions),
+    first_seen = LEAST(COALESCE(first_seen, VALUES(first_seen)), COALESCE(VALUES(first_seen), first_seen)),
+    last_seen = GREATEST(COALESCE(last_seen, VALUES(last_seen)), COALESCE(VALUES(last_seen), last_seen)),
+    last_activity = GREATEST(COALESCE(last_activity, VALUES(last_activity)), COALESCE(VALUES(last_activity), last_activity))
+"""
+
+# Every maintained table: key column and value columns
+MAINTAINED_TABLES = dict(ROLLUP_TABLES, **{SUMMARY_TABLE: ("attacker_id", SUMMARY_COLUMNS)})
+
+# Each rollup recomputed from the raw tables, in ROLLUP_TABLES column order
+REBUILD_QUERIES = {
+    "HOURLY_ROLLUP": f"""
+        SELECT hour_slot, SUM(sessions), SUM(attempts)
+        FROM (
+            SELECT {HOUR_SLOT_SQL.format(col="start_time")} AS hour_slot,
+                   COUNT(*) AS sessions, 0 AS attempts
+            FROM SESSION WHERE start_time IS NOT NULL
+            GROUP BY hour_slot
+            UNION ALL
+            SELECT {HOUR_SLOT_SQL.format(col="timestamp")} AS hour_slot,
+                   0 AS sessions, COUNT(*) AS attempts
+            FROM AUTH_ATTEMPT WHERE timestamp IS NOT NULL
+            GROUP BY hour_slot
+        ) t
+        GROUP BY hour_slot
+    """,
+    "DAILY_ROLLUP": """
+        SELECT day, SUM(sessions), SUM(attempts)
+        FROM (
+            SELECT DATE(start_time) AS day, COUNT(*) AS sessions, 0 AS attempts
+            FROM SESSION WHERE start_time IS NOT NULL
+            GROUP BY day
+            UNION ALL
+            SELECT DATE(timestamp) AS day, 0 AS sessions, COUNT(*) AS attempts
+            FROM AUTH_ATTEMPT WHERE timestamp IS NOT NULL
+            GROUP BY day
+        ) t
+        GROUP BY day
+    """,
+    "COUNTRY_ROLLUP": """
+        SELECT g.country, COUNT(*), SUM(s.end_time IS NOT NULL),
+               COALESCE(SUM(TIMESTAMPDIFF(SECOND, s.start_time, s.end_time)), 0)
+        FROM SESSION s
+        JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+        JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+        WHERE g.country IS NOT NULL
+        GROUP BY g.country
+    """,
+    "AUTH_STATUS_ROLLUP": """
+        SELECT status, COUNT(*) FROM AUTH_ATTEMPT
+        WHERE status IS NOT NULL
+        GROUP BY status
+    """,
+    "USERNAME_ROLLUP": """
+        SELECT username_id, COUNT(*) FROM AUTH_ATTEMPT
+        WHERE username_id IS NOT NULL
+        GROUP BY username_id
+    """,
+    "CREDENTIAL_ROLLUP": """
+        SELECT username_id, password_id, COUNT(*) FROM AUTH_ATTEMPT
+        WHERE username_id IS NOT NULL AND password_id IS NOT NULL
+        GROUP BY username_id, password_id
+    """,
+    "MALWARE_ROLLUP": """
+        SELECT filehash, COUNT(*) FROM DOWNLOAD
+        WHERE filehash IS NOT NULL
+        GROUP BY filehash
+    """,
+    SUMMARY_TABLE: """
+        SELECT t.attacker_id, g.country, t.total_sessions, t.open_sessions,
+               t.first_seen, t.last_seen, t.last_activity
+        FROM (
+            SELECT attacker_id, SUM(sessions) AS total_sessions,
+                   SUM(open_sessions) AS open_sessions, MIN(first_seen) AS first_seen,
+                   MAX(first_seen) AS last_seen, MAX(activity) AS last_activity
+            FROM (
+                SELECT attacker_id, 1 AS sessions, end_time IS NULL AS open_sessions,
+                       start_time AS first_seen,
+                       GREATEST(COALESCE(start_time, end_time), COALESCE(end_time, start_time)) AS activity
+                FROM SESSION
+                UNION ALL
+                SELECT s.attacker_id, 0, 0, NULL, c.activity
+                FROM (
+                    SELECT session_id, MAX(timestamp) AS activity FROM AUTH_ATTEMPT GROUP BY session_id
+                    UNION ALL
+                    SELECT session_id, MAX(timestamp) FROM COMMAND GROUP BY session_id
+                    UNION ALL
+                    SELECT session_id, MAX(timestamp) FROM DOWNLOAD GROUP BY session_id
+                ) c
+                JOIN SESSION s ON s.session_id = c.session_id
+            ) events
+            WHERE attacker_id IS NOT NULL
+            GROUP BY attacker_id
+        ) t
+        JOIN ATTACKER a ON a.attacker_id = t.attacker_id
+        LEFT JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+    """,
+}
+
+
+def key_columns(key_column):
+    """Key column(s) of a maintained table as a tuple"""
+    return key_column if isinstance(key_column, tuple) else (key_column,)
+
+
+def hour_slot(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def session_duration(start_time, end_time):
+    """Seconds between start and end, truncated like TIMESTAMPDIFF(SECOND, ...)"""
+    return int((end_time - start_time).total_seconds())
+
+
+def _earliest(current, candidate):
+    if current is None or (candidate is not None and candidate < current):
+        return candidate
+    return current
+
+
+def _latest(current, candidate):
+    if current is None or (candidate is not None and candidate > current):
+        return candidate
+    return current
+
+
+class RollupDeltas:
+    """Per-transaction rollup increments, written just before the commit"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._deltas = {
+            table: defaultdict(lambda n=len(columns): [0] * n)
+            for table, (_, columns) in ROLLUP_TABLES.items()
+        }
+        # attacker_id -> values in SUMMARY_COLUMNS order
+        self._attackers = {}
+        self._sessions = 0
+
+    def __bool__(self):
+        return any(self._deltas.values()) or bool(self._attackers)
+
+    def _add(self, table, key, column, amount=1):
+        if key is None:
+            return
+        _, columns = ROLLUP_TABLES[table]
+        self._deltas[table][key][columns.index(column)] += amount
+
+    def _attacker(self, attacker_id, country=None):
+        summary = self._attackers.get(attacker_id)
+        if summary is None:
+            summary = self._attackers[attacker_id] = [None, 0, 0, None, None, None]
+        if country is not None:
+            summary[0] = country
+        return summary
+
+    def add_session(self, start_time, end_time, country, attacker_id=None):
+        """A new session; country is None while its attacker awaits GeoIP"""
+        self._sessions += 1
+        if start_time is not None:
+            self._add("HOURLY_ROLLUP", hour_slot(start_time), "total_sessions")
+            self._add("DAILY_ROLLUP", start_time.date(), "total_sessions")
+        self._add("COUNTRY_ROLLUP", country, "total_sessions")
+        if attacker_id is not None:
+            summary = self._attacker(attacker_id, country)
+            summary[1] += 1
+            summary[2] += 1
+            summary[3] = _earliest(summary[3], start_time)
+            summary[4] = _latest(summary[4], start_time)
+            summary[5] = _latest(summary[5], start_time)
+        if end_time is not None:
+            self.add_session_end(start_time, end_time, country, attacker_id)
+
+    def add_session_end(self, start_time, end_time, country, attacker_id=None):
+        """A session that gained its end time"""
+        self._add("COUNTRY_ROLLUP", country, "ended_sessions")
+        if start_time is not None:
+            self._add(
+                "COUNTRY_ROLLUP",
+                country,
+                "total_duration_sec",
+                session_duration(start_time, end_time),
+            )
+        if attacker_id is not None:
+            summary = self._attacker(attacker_id, country)
+            summary[2] -= 1
+            summary[5] = _latest(summary[5], end_time)
+
+    def add_activity(self, attacker_id, timestamp):
+        """An auth attempt, command or download by an attacker"""
+        if attacker_id is not None and timestamp is not None:
+            summary = self._attacker(attacker_id)
+            summary[5] = _latest(summary[5], timestamp)
+
+    def add_auth_attempt(self, timestamp, status, username_id=None, password_id=None):
+        if timestamp is not None:
+            self._add("HOURLY_ROLLUP", hour_slot(timestamp), "total_auth_attempts")
+            self._add("DAILY_ROLLUP", timestamp.date(), "total_auth_attempts")
+        self._add("AUTH_STATUS_ROLLUP", status, "total")
+        self._add("USERNAME_ROLLUP", username_id, "total_attempts")
+        if username_id is not None and password_id is not None:
+            self._add("CREDENTIAL_ROLLUP", (username_id, password_id), "total_attempts")
+
+    def add_download(self, filehash):
+        self._add("MALWARE_ROLLUP", filehash, "times_downloaded")
+
+    def negate(self):
+        """
+        Turn the accumulated rollup increments into decrements. Attacker
+        summaries are not negated; they are deleted with their attacker.
+        """
+        self._attackers = {}
+        for deltas in self._deltas.values():
+            for values in deltas.values():
+                values[:] = [-value for value in values]
+
+    def feed(self):
+        """
+        JSON-ready copy of the pending increments the dashboard can apply
+        in place (the /api/stream feed). Credential rollups are keyed by
+        dictionary ids the dashboard never sees, so they are left out.
+        """
+        deltas = self._deltas
+        return {
+            "sessions": self._sessions,
+            "attackers": len(self._attackers),
+            "hourly": {
+                hour.strftime("%Y-%m-%d %H:00:00"): values
+                for hour, values in deltas["HOURLY_ROLLUP"].items()
+            },
+            "daily": {day.isoformat(): values for day, values in deltas["DAILY_ROLLUP"].items()},
+            "countries": dict(deltas["COUNTRY_ROLLUP"]),
+            "auth_status": {status: values[0] for status, values in deltas["AUTH_STATUS_ROLLUP"].items()},
+            "malware": {filehash: values[0] for filehash, values in deltas["MALWARE_ROLLUP"].items()},
+        }
+
+    def apply(self, cursor):
+        """Add the accumulated deltas to the rollup tables and reset"""
+        for table, (key_column, columns) in ROLLUP_TABLES.items():
+            deltas = self._deltas[table]
+            if not deltas:
+                continue
+            keys = key_columns(key_column)
+            rows = [
+                (key if len(keys) > 1 else (key,)) + tuple(deltas[key])
+                for key in sorted(deltas)
+            ]
+            row_placeholder = "(" + ", ".join(["%s"] * (len(keys) + len(columns))) + ")"
+            updates = ", ".join(f"{c} = {c} + VALUES({c})" for c in columns)
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(keys + columns)}) VALUES "
+                + ", ".join([row_placeholder] * len(rows))
+                + f" ON DUPLICATE KEY UPDATE {updates}",
+                [value for row in rows for value in row],
+            )
+
+        if self._attackers:
+            rows = [
+                (attacker_id,) + tuple(self._attackers[attacker_id])
+                for attacker_id in sorted(self._attackers)
+            ]
+            row_placeholder = "(" + ", ".join(["%s"] * (len(SUMMARY_COLUMNS) + 1)) + ")"
+            cursor.execute(
+                f"INSERT INTO {SUMMARY_TABLE} (attacker_id, {', '.join(SUMMARY_COLUMNS)}) VALUES "
+                + ", ".join([row_placeholder] * len(rows))
+                + f" ON DUPLICATE KEY UPDATE {SUMMARY_UPDATES}",
+                [value for row in rows for value in row],
+            )
+        self.clear()
+
+
+def add_located_attackers(cursor, attacker_ids):
+    """
+    Count the sessions of attackers that just received a location into
+    COUNTRY_ROLLUP and set their summary's country. Runs in the enricher's
+    transaction after its UPDATE of ATTACKER, whose row locks make ETL
+    writers that saw these attackers as pending commit first; the locking
+    read then includes their sessions.
+    """
+    if not attacker_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(attacker_ids))
+    cursor.execute(
+        f"""
+        INSERT INTO COUNTRY_ROLLUP (country, total_sessions, ended_sessions, total_duration_sec)
+        SELECT g.country, COUNT(*), SUM(s.end_time IS NOT NULL),
+               COALESCE(SUM(TIMESTAMPDIFF(SECOND, s.start_time, s.end_time)), 0)
+        FROM SESSION s
+        JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+        JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+        WHERE s.attacker_id IN ({placeholders}) AND g.country IS NOT NULL
+        GROUP BY g.country
+        ON DUPLICATE KEY UPDATE
+            total_sessions = total_sessions + VALUES(total_sessions),
+            ended_sessions = ended_sessions + VALUES(ended_sessions),
+            total_duration_sec = total_duration_sec + VALUES(total_duration_sec)
+        """,
+        list(attacker_ids),
+    )
+    cursor.execute(
+        f"""
+        UPDATE {SUMMARY_TABLE} s
+        JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+        JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+        SET s.country = g.country
+        WHERE s.attacker_id IN ({placeholders})
+        """,
+        list(attacker_ids),
+    )
+
+
+def subtract_attacker(cursor, ip_address):
+    """
+    Remove an attacker's sessions, auth attempts and downloads from every
+    rollup; call in the same transaction, before deleting the attacker
+    (which also deletes its ATTACKER_SUMMARY row)
+    """
+    deltas = RollupDeltas()
+
+    cursor.execute(
+        """
+        SELECT s.session_id, s.start_time, s.end_time, g.country
+        FROM ATTACKER a
+        JOIN SESSION s ON s.attacker_id = a.attacker_id
+        LEFT JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+        WHERE a.ip_address = %s
+        FOR UPDATE
+        """,
+        (ip_address,),
+    )
+    sessions = cursor.fetchall()
+    for _, start_time, end_time, country in sessions:
+        deltas.add_session(start_time, end_time, country)
+
+    session_ids = [row[0] for row in sessions]
+    if session_ids:
+        placeholders = ", ".join(["%s"] * len(session_ids))
+        cursor.execute(
+            f"""
+            SELECT timestamp, status, username_id, password_id
+            FROM AUTH_ATTEMPT WHERE session_id IN ({placeholders})
+            """,
+            session_ids,
+        )
+        for timestamp, status, username_id, password_id in cursor.fetchall():
+            deltas.add_auth_attempt(timestamp, status, username_id, password_id)
+        cursor.execute(
+            f"SELECT filehash FROM DOWNLOAD WHERE session_id IN ({placeholders})",
+            session_ids,
+        )
+        for (filehash,) in cursor.fetchall():
+            deltas.add_download(filehash)
+
+    deltas.negate()
+    deltas.apply(cursor)
+
+
+def _split_row(table, row):
+    """(key, comparable values) of a maintained-table row; SUM() gives Decimal"""
+    n = len(key_columns(MAINTAINED_TABLES[table][0]))
+    key = tuple(row[:n]) if n > 1 else row[0]
+    return key, tuple(int(v) if isinstance(v, Decimal) else v for v in row[n:])
+
+
+def expected_rollups(cursor):
+    """Recompute every rollup from the raw tables: {table: {key: values}}"""
+    expected = {}
+    for table, query in REBUILD_QUERIES.items():
+        cursor.execute(query)
+        expected[table] = dict(_split_row(table, row) for row in cursor.fetchall())
+    return expected
+
+
+def stored_rollups(cursor):
+    stored = {}
+    for table, (key_column, columns) in MAINTAINED_TABLES.items():
+        cursor.execute(
+            f"SELECT {', '.join(key_columns(key_column) + columns)} FROM {table}"
+        )
+        stored[table] = {
+            key: values
+            for key, values in (_split_row(table, row) for row in cursor.fetchall())
+            # Buckets whose rows were all deleted are left at zero
+            if any(values)
+        }
+    return stored
+
+
+def verify(conn):
+    """Compare rollups with the raw tables; returns a list of mismatches"""
+    # One snapshot for both reads
+    conn.start_transaction(consistent_snapshot=True, readonly=True)
+    cursor = conn.cursor()
+    expected = expected_rollups(cursor)
+    stored = stored_rollups(cursor)
+    conn.rollback()
+    cursor.close()
+
+    mismatches = []
+    for table in MAINTAINED_TABLES:
+        for key in sorted(set(expected[table]) | set(stored[table]), key=str):
+            want = expected[table].get(key)
+            have = stored[table].get(key)
+            if want != have:
+                mismatches.append((table, key, want, have))
+    return mismatches
+
+
+def rebuild(conn):
+    """
+    Recompute every rollup from the raw tables in one transaction and return
+    {table: row count}. The INSERT ... SELECT reads take shared locks, so ETL
+    writes wait for it.
+    """
+    counts = {}
+    cursor = conn.cursor()
+    try:
+        for table, (key_column, columns) in MAINTAINED_TABLES.items():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(key_columns(key_column) + columns)}) "
+                + REBUILD_QUERIES[table]
+            )
+            counts[table] = cursor.rowcount
+            logger.info(f"  - Rebuilt {table}: {cursor.rowcount} rows")
+        conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify or rebuild the dashboard rollups")
+    parser.add_argument("command", choices=("verify", "rebuild"))
+    args = parser.parse_args()
+
+    try:
+        admin_config = admin_db_config()
+        conn = mysql.connector.connect(**admin_config)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    except Error as e:
+        print(f"✗ Could not connect as {admin_config['user']}: {e}")
+        return 1
+
+    try:
+        if args.command == "rebuild":
+            for table, rows in rebuild(conn).items():
+                print(f"  - Rebuilt {table}: {rows} rows")
+            print("✓ Rollups rebuilt")
+
+        mismatches = verify(conn)
+        if not mismatches:
+            print("✓ Rollups match the raw tables")
+            return 0
+
+        print(f"✗ {len(mismatches)} rollup rows differ from the raw tables:")
+        for table, key, want, have in mismatches[:50]:
+            print(f"    {table}[{key}]: expected {want}, stored {have}")
+        print("Run `python3 rollups.py rebuild` to recompute them.")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,10 +35,8 @@ echo "✅ Database ready."
 
 # 2️⃣ Execute all SQL scripts in proper order
 run_sql "sql/table_creation.sql"
-run_sql "sql/triggers.sql"
 run_sql "sql/functions.sql"
 run_sql "sql/procedures.sql"
-run_sql "sql/events.sql"
 run_sql "sql/views.sql"
 run_sql "sql/roles.sql"
 
@@ -1,20 +1,20 @@
--- 1️⃣ Top Attacker Countries (uses trigger-updated COUNTRY_STATS)
+-- 1️⃣ Top Attacker Countries (uses ETL-maintained COUNTRY_ROLLUP)
 SELECT country, total_sessions
-FROM COUNTRY_STATS
+FROM COUNTRY_ROLLUP
 ORDER BY total_sessions DESC
 LIMIT 10;
 
 -- 2️⃣ Most Common Usernames/Passwords (uses stored procedure GetTopCredentials)
 CALL GetTopCredentials(10);
 
--- 3️⃣ Attack Frequency Over Time (relies on event-triggered ATTACK_TRENDS table)
+-- 3️⃣ Attack Frequency Over Time (uses ETL-maintained DAILY_ROLLUP)
 SELECT day, total_sessions, total_auth_attempts
-FROM ATTACK_TRENDS
+FROM DAILY_ROLLUP
 ORDER BY day DESC;
 
--- 4️⃣ Success vs Failed Authentication Attempts (uses trigger-updated AUTH_STATS)
+-- 4️⃣ Success vs Failed Authentication Attempts (uses ETL-maintained AUTH_STATUS_ROLLUP)
 SELECT status, total
-FROM AUTH_STATS
+FROM AUTH_STATUS_ROLLUP
 ORDER BY total DESC;
 
 -- 5️⃣ Top Downloaded Malware Hashes (uses TopMalware view)
@@ -30,11 +30,11 @@ SELECT country, ROUND(avg_duration_sec / 60, 2) AS avg_duration_mins
 FROM AvgSessionDurationByCountry
 ORDER BY avg_duration_mins DESC;
 
--- 8️⃣ Correlated Subquery for Active Attackers (uses ActiveAttackers view + function)
-SELECT a.ip_address, GetCountryFromAttackerID(a.attacker_id) AS country
+-- 8️⃣ Active Attackers with more than 5 sessions (uses ActiveAttackers view)
+SELECT a.ip_address, a.country
 FROM ActiveAttackers a
-WHERE (SELECT COUNT(*) FROM SESSION s WHERE s.attacker_id = a.attacker_id) > 5
-ORDER BY (SELECT COUNT(*) FROM SESSION s WHERE s.attacker_id = a.attacker_id) DESC;
+WHERE a.total_sessions > 5
+ORDER BY a.total_sessions DESC;
 
 -- 9️⃣ Window Function Analysis (uses AttackerRankings view)
 SELECT *
@@ -44,4 +44,5 @@ WHERE rank_by_sessions <= 5;
 -- 🔟 Time-Based Analysis (uses AttackFrequencyHourly view)
 SELECT *
 FROM AttackFrequencyHourly
-ORDER BY hour_slot DESC;
+WHERE hour_start >= UTC_TIMESTAMP() - INTERVAL 1 DAY
+ORDER BY hour_start DESC;
@@ -8,35 +8,33 @@ DROP VIEW IF EXISTS COUNTRY_STATS_VIEW;
 DROP VIEW IF EXISTS AUTH_STATS_VIEW;
 DROP PROCEDURE IF EXISTS GetDailyTrends;
 
--- Create corrected COUNTRY_STATS_VIEW
+-- Create corrected COUNTRY_STATS_VIEW (reads the ETL-maintained rollup)
 CREATE VIEW COUNTRY_STATS_VIEW AS
-SELECT
-    g.country,
-    COUNT(DISTINCT s.session_id) AS total_sessions
-FROM SESSION s
-JOIN ATTACKER a ON s.attacker_id = a.attacker_id
-JOIN GEOIP_CACHE g ON a.geoip_id = g.geoip_id
-GROUP BY g.country;
+SELECT country, total_sessions
+FROM COUNTRY_ROLLUP
+WHERE total_sessions > 0;
 
 -- Create corrected AUTH_STATS_VIEW
 CREATE VIEW AUTH_STATS_VIEW AS
-SELECT
-    status,
-    COUNT(*) AS total
-FROM AUTH_ATTEMPT
-GROUP BY status;
+SELECT status, total
+FROM AUTH_STATUS_ROLLUP
+WHERE total > 0;
 
 -- Create corrected GetDailyTrends procedure
 DELIMITER //
-CREATE PROCEDURE GetDailyTrends()
+CREATE PROCEDURE GetDailyTrends(IN p_from DATETIME, IN p_to DATETIME)
 BEGIN
-    SELECT
-        DATE(s.start_time) AS day,
-        COUNT(DISTINCT s.session_id) AS total_sessions,
-        COUNT(a.auth_id) AS total_auth_attempts
-    FROM SESSION s
-    LEFT JOIN AUTH_ATTEMPT a ON s.session_id = a.session_id AND DATE(a.timestamp) = DATE(s.start_time)
-    GROUP BY DATE(s.start_time)
+    -- Days overlapping [p_from, p_to); a NULL bound leaves that side open.
+    -- Plain range bounds on the primary key, so only those days are read.
+    -- A day with auth attempts but no new session (one that spans midnight)
+    -- is still a day of activity.
+    DECLARE first_day DATE DEFAULT DATE(COALESCE(p_from, '1000-01-01'));
+    DECLARE last_day DATE DEFAULT DATE(COALESCE(p_to, '9999-12-31 23:59:59') - INTERVAL 1 SECOND);
+
+    SELECT day, total_sessions, total_auth_attempts
+    FROM DAILY_ROLLUP
+    WHERE day BETWEEN first_day AND last_day
+      AND (total_sessions > 0 OR total_auth_attempts > 0)
     ORDER BY day ASC;
 END;
 //
@@ -1,13 +1,24 @@
 DELIMITER //
 CREATE PROCEDURE GetTopCredentials(IN limit_n INT)
 BEGIN
-    SELECT
-        SUBSTRING_INDEX(creds, ':', 1) AS username,
-        SUBSTRING_INDEX(creds, ':', -1) AS password,
-        COUNT(*) AS attempts
-    FROM AUTH_ATTEMPT
-    GROUP BY username, password
-    ORDER BY attempts DESC
+    -- Reads the top limit_n entries of the CREDENTIAL_ROLLUP attempts index
+    SELECT u.username, p.password, r.total_attempts AS attempts
+    FROM CREDENTIAL_ROLLUP r
+    JOIN CRED_USERNAME u ON u.username_id = r.username_id
+    JOIN CRED_PASSWORD p ON p.password_id = r.password_id
+    ORDER BY r.total_attempts DESC
+    LIMIT limit_n;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE GetTopUsernames(IN limit_n INT)
+BEGIN
+    SELECT u.username, r.total_attempts AS attempts
+    FROM USERNAME_ROLLUP r
+    JOIN CRED_USERNAME u ON u.username_id = r.username_id
+    ORDER BY r.total_attempts DESC
     LIMIT limit_n;
 END;
 //
@@ -16,27 +27,56 @@ DELIMITER ;
 DELIMITER //
 CREATE PROCEDURE GetCommandFrequency(IN attacker_ip VARCHAR(45))
 BEGIN
-    SELECT c.command_text, COUNT(*) AS frequency
-    FROM COMMAND c
-    JOIN SESSION s ON s.session_id = c.session_id
-    JOIN ATTACKER a ON a.attacker_id = s.attacker_id
-    WHERE a.ip_address = attacker_ip
-    GROUP BY c.command_text
-    ORDER BY frequency DESC;
+    -- Group on the interned text id; the text is only joined for the result
+    SELECT t.command_text, f.frequency
+    FROM (
+        SELECT c.text_id, COUNT(*) AS frequency
+        FROM ATTACKER a
+        JOIN SESSION s ON s.attacker_id = a.attacker_id
+        JOIN COMMAND c ON c.session_id = s.session_id
+        WHERE a.ip_address = attacker_ip
+        GROUP BY c.text_id
+    ) f
+    JOIN COMMAND_TEXT t ON t.text_id = f.text_id
+    ORDER BY f.frequency DESC;
 END;
 //
 DELIMITER ;
 
 DELIMITER //
-CREATE PROCEDURE GetDailyTrends()
+CREATE PROCEDURE GetTopCommandFingerprints(IN limit_n INT)
 BEGIN
-    SELECT
-        DATE(s.start_time) AS day,
-        COUNT(DISTINCT s.session_id) AS total_sessions,
-        COUNT(a.auth_id) AS total_auth_attempts
-    FROM SESSION s
-    LEFT JOIN AUTH_ATTEMPT a ON s.session_id = a.session_id AND DATE(a.timestamp) = DATE(s.start_time)
-    GROUP BY DATE(s.start_time)
+    -- Most frequent command patterns across all attackers
+    SELECT fp.fingerprint, f.frequency, f.variants
+    FROM (
+        SELECT t.fingerprint_id, COUNT(*) AS frequency,
+               COUNT(DISTINCT c.text_id) AS variants
+        FROM COMMAND c
+        JOIN COMMAND_TEXT t ON t.text_id = c.text_id
+        GROUP BY t.fingerprint_id
+        ORDER BY frequency DESC
+        LIMIT limit_n
+    ) f
+    JOIN COMMAND_FINGERPRINT fp ON fp.fingerprint_id = f.fingerprint_id
+    ORDER BY f.frequency DESC;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE GetDailyTrends(IN p_from DATETIME, IN p_to DATETIME)
+BEGIN
+    -- Days overlapping [p_from, p_to); a NULL bound leaves that side open.
+    -- Plain range bounds on the primary key, so only those days are read.
+    -- A day with auth attempts but no new session (one that spans midnight)
+    -- is still a day of activity.
+    DECLARE first_day DATE DEFAULT DATE(COALESCE(p_from, '1000-01-01'));
+    DECLARE last_day DATE DEFAULT DATE(COALESCE(p_to, '9999-12-31 23:59:59') - INTERVAL 1 SECOND);
+
+    SELECT day, total_sessions, total_auth_attempts
+    FROM DAILY_ROLLUP
+    WHERE day BETWEEN first_day AND last_day
+      AND (total_sessions > 0 OR total_auth_attempts > 0)
     ORDER BY day ASC;
 END;
 //
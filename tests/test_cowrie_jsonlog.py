@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from cowrie_jsonlog import FILE_NAME_MAX_LENGTH, event_source_id, events_to_batch
+
+SESSION = "a1b2c3d4"
+SHASUM = "ab" * 32
+
+
+def event(eventid, timestamp="2025-01-01T00:00:05.123456Z", **fields):
+    return dict(eventid=eventid, session=SESSION, timestamp=timestamp, **fields)
+
+
+def test_source_id_is_stable_and_order_independent():
+    first = event("cowrie.command.input", input="uname -a")
+    reordered = dict(reversed(list(first.items())))
+    assert event_source_id(first) == event_source_id(reordered)
+    assert event_source_id(first) == event_source_id(dict(first))
+
+
+def test_source_id_fits_a_signed_bigint():
+    for n in range(200):
+        source_id = event_source_id(event("cowrie.command.input", input=f"echo {n}"))
+        assert 0 <= source_id < 2**63
+
+
+def test_source_id_differs_per_event():
+    ids = {event_source_id(event("cowrie.command.input", input=f"echo {n}")) for n in range(200)}
+    assert len(ids) == 200
+
+
+def test_events_map_onto_source_row_tuples():
+    events = [
+        event("cowrie.session.connect", "2025-01-01T00:00:00Z", src_ip="203.0.113.7"),
+        event("cowrie.login.success", username="root", password="admin"),
+        event("cowrie.login.failed", username="admin", password=None),
+        event("cowrie.command.input", input="uname -a"),
+        event("cowrie.session.file_download", shasum=SHASUM, outfile="var/lib/x"),
+        event("cowrie.session.closed", "2025-01-01T00:01:00Z"),
+    ]
+    batch = events_to_batch(events)
+
+    start = datetime(2025, 1, 1, 0, 0, 0)
+    end = datetime(2025, 1, 1, 0, 1, 0)
+    at = datetime(2025, 1, 1, 0, 0, 5)
+    assert batch.sessions == {SESSION: (SESSION, "203.0.113.7", start, end)}
+    assert batch.closed_sessions == {SESSION: end}
+    assert batch.auth_attempts == [
+        (event_source_id(events[1]), SESSION, at, 1, "root", "admin"),
+        (event_source_id(events[2]), SESSION, at, 0, "admin", None),
+    ]
+    assert batch.commands == [(event_source_id(events[3]), SESSION, at, "uname -a")]
+    assert batch.downloads == [(event_source_id(events[4]), SESSION, at, SHASUM, "var/lib/x")]
+    assert len(batch) == 6
+
+
+def test_numeric_timestamps_are_accepted():
+    batch = events_to_batch([event("cowrie.command.input", timestamp=1735689600, input="id")])
+    assert batch.commands[0][2] == datetime(2025, 1, 1)
+
+
+def test_events_that_cannot_be_stored_are_skipped():
+    events = [
+        {"eventid": "cowrie.command.input", "input": "no session"},
+        ["not", "an", "event"],
+        dict(event("cowrie.command.input", input="id"), session="x" * 51),
+        event("cowrie.session.connect", src_ip="not an ip"),
+        event("cowrie.login.failed", username=123, password="x"),
+        event("cowrie.command.input", input={"nested": True}),
+        event("cowrie.session.file_download", shasum="not-a-sha256"),
+        event("cowrie.command.input", timestamp="yesterday", input="id"),
+        event("cowrie.command.input", timestamp=["2025"], input="id"),
+        event("cowrie.command.input", timestamp="0999-01-01T00:00:00", input="id"),
+    ]
+    assert len(events_to_batch(events)) == 0
+
+
+def test_long_file_names_are_cut_to_the_column():
+    batch = events_to_batch(
+        [event("cowrie.session.file_download", shasum=SHASUM, outfile="f" * 1000)]
+    )
+    assert batch.downloads[0][4] == "f" * FILE_NAME_MAX_LENGTH
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+
+from ingest import IngestError, decode_batch
+
+CONNECT = {
+    "eventid": "cowrie.session.connect",
+    "session": "a1b2c3d4",
+    "src_ip": "203.0.113.7",
+    "timestamp": "2025-01-01T00:00:00.000000Z",
+}
+LOGIN = dict(CONNECT, eventid="cowrie.login.failed", username="root", password="admin")
+
+
+def ndjson(*events):
+    return b"".join(json.dumps(event).encode() + b"\n" for event in events)
+
+
+def test_plain_batch():
+    assert decode_batch(ndjson(CONNECT, LOGIN), compressed=False) == [CONNECT, LOGIN]
+
+
+def test_gzip_batch_skips_blank_lines():
+    payload = gzip.compress(ndjson(CONNECT) + b"\n  \n" + ndjson(LOGIN))
+    assert decode_batch(payload) == [CONNECT, LOGIN]
+
+
+def test_every_gzip_member_is_decoded():
+    payload = gzip.compress(ndjson(CONNECT)) + gzip.compress(ndjson(LOGIN))
+    assert decode_batch(payload) == [CONNECT, LOGIN]
+
+
+def test_truncated_gzip_is_rejected():
+    payload = gzip.compress(ndjson(CONNECT, LOGIN))
+    with pytest.raises(IngestError, match="truncated"):
+        decode_batch(payload[:-8])
+
+
+def test_truncated_second_member_is_rejected():
+    second = gzip.compress(ndjson(LOGIN))
+    payload = gzip.compress(ndjson(CONNECT)) + second[: len(second) // 2]
+    with pytest.raises(IngestError):
+        decode_batch(payload)
+
+
+def test_invalid_gzip_is_rejected():
+    with pytest.raises(IngestError, match="invalid gzip"):
+        decode_batch(b"not gzip at all")
+
+
+def test_oversized_batch_is_rejected(monkeypatch):
+    monkeypatch.setattr("ingest.MAX_DECOMPRESSED_BYTES", 64)
+    with pytest.raises(IngestError, match="exceeds"):
+        decode_batch(gzip.compress(ndjson(CONNECT, LOGIN)))
+
+
+@pytest.mark.parametrize("line", [b"{not json}\n", b"[1, 2]\n", b'{"session": "x"}\n'])
+def test_lines_that_are_not_events_are_rejected(line):
+    with pytest.raises(IngestError, match="line 2"):
+        decode_batch(ndjson(CONNECT) + line, compressed=False)
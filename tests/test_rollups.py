@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from rollups import SUMMARY_TABLE, RollupDeltas
+
+START = datetime(2025, 1, 1, 10, 15, 30)
+END = datetime(2025, 1, 1, 10, 17, 0)
+LATER = datetime(2025, 1, 1, 11, 5, 0)
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+
+
+def test_empty_deltas_are_falsy():
+    deltas = RollupDeltas()
+    assert not deltas
+    deltas.add_download(None)
+    assert not deltas
+    deltas.add_download("ab" * 32)
+    assert deltas
+
+
+def test_sessions_attempts_and_downloads_feed():
+    deltas = RollupDeltas()
+    deltas.add_session(START, END, "NL", attacker_id=7)
+    deltas.add_session(LATER, None, None, attacker_id=8)
+    deltas.add_auth_attempt(START, "failed", username_id=1, password_id=2)
+    deltas.add_auth_attempt(LATER, "success", username_id=1, password_id=3)
+    deltas.add_download("ab" * 32)
+    deltas.add_download("ab" * 32)
+
+    assert deltas.feed() == {
+        "sessions": 2,
+        "attackers": 2,
+        "hourly": {"2025-01-01 10:00:00": [1, 1], "2025-01-01 11:00:00": [1, 1]},
+        "daily": {"2025-01-01": [2, 2]},
+        "countries": {"NL": [1, 1, 90]},
+        "auth_status": {"failed": 1, "success": 1},
+        "malware": {"ab" * 32: 2},
+    }
+
+
+def test_session_end_closes_the_attacker_session():
+    deltas = RollupDeltas()
+    deltas.add_session(START, None, "NL", attacker_id=7)
+    deltas.add_session_end(START, END, "NL", attacker_id=7)
+    deltas.add_activity(7, LATER)
+
+    cursor = RecordingCursor()
+    deltas.apply(cursor)
+    query, params = cursor.statements[-1]
+    assert query.startswith(f"INSERT INTO {SUMMARY_TABLE}")
+    assert params == [7, "NL", 1, 0, START, START, LATER]
+
+
+def test_negate_turns_increments_into_decrements():
+    deltas = RollupDeltas()
+    deltas.add_session(START, END, "NL", attacker_id=7)
+    deltas.add_auth_attempt(START, "failed")
+    deltas.negate()
+
+    feed = deltas.feed()
+    assert feed["attackers"] == 0
+    assert feed["hourly"] == {"2025-01-01 10:00:00": [-1, -1]}
+    assert feed["countries"] == {"NL": [-1, -1, -90]}
+    assert feed["auth_status"] == {"failed": -1}
+
+
+def test_apply_upserts_sorted_rows_and_clears():
+    deltas = RollupDeltas()
+    deltas.add_auth_attempt(LATER, "success", username_id=2, password_id=5)
+    deltas.add_auth_attempt(START, "failed", username_id=1, password_id=9)
+
+    cursor = RecordingCursor()
+    deltas.apply(cursor)
+    tables = [query.split()[2] for query, _ in cursor.statements]
+    assert tables == [
+        "HOURLY_ROLLUP",
+        "DAILY_ROLLUP",
+        "AUTH_STATUS_ROLLUP",
+        "USERNAME_ROLLUP",
+        "CREDENTIAL_ROLLUP",
+    ]
+
+    queries = dict((query.split()[2], (query, params)) for query, params in cursor.statements)
+    query, params = queries["HOURLY_ROLLUP"]
+    assert "ON DUPLICATE KEY UPDATE total_sessions = total_sessions + VALUES(total_sessions)" in query
+    assert params == [datetime(2025, 1, 1, 10), 0, 1, datetime(2025, 1, 1, 11), 0, 1]
+    query, params = queries["CREDENTIAL_ROLLUP"]
+    assert "(username_id, password_id, total_attempts)" in query
+    assert params == [1, 9, 1, 2, 5, 1]
+
+    assert not deltas
+    deltas.apply(cursor)
+    assert len(cursor.statements) == len(tables)